@@ -131,6 +131,7 @@ class ProductionConfig(BaseSettings):
     enable_tracing: bool = Field(default=False, description="Habilitar tracing")
     max_request_size: int = Field(default=16777216, description="Tamanho máximo de requisição")  # 16MB
     request_timeout: int = Field(default=300, ge=1, description="Timeout de requisição em segundos")
+    single_flight_enabled: bool = Field(default=True, description="Coalescer consultas idênticas em andamento")
     
     # Timeouts adicionais
     redis_timeout: int = Field(default=5, ge=1, description="Timeout Redis em segundos")
@@ -14,6 +14,13 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 from contextlib import asynccontextmanager
 
+from src.utils.single_flight import SingleFlight
+from src.utils.prometheus import register_flight_stats
+from src.utils.latency_histogram import LogHistogram, RollingLatency
+from src.utils.tracing import get_tracer
+from src.utils.llm_usage import usage_ledger
+from src.utils.profiling import get_request_profiler
+
 from .config import config
 from ..utils.errors import APIError, ServiceUnavailableError
 
@@ -21,41 +28,69 @@ logger = logging.getLogger(__name__)
 
 
 class RequestMetrics:
-    """Métricas de requisições"""
-    
+    """
+    Métricas de requisições
+
+    Latências em histogramas logarítmicos de memória fixa (global e por rota),
+    com percentis p50/p90/p99 em janelas deslizantes. Atualização O(1) e sem
+    lock: cada worker acumula no próprio event loop.
+    """
+
+    WINDOWS = {"1m": 60, "5m": 300}
+    QUANTILES = (0.5, 0.9, 0.99)
+    MAX_ROUTES = 200
+
     def __init__(self):
         self.total_requests = 0
         self.successful_requests = 0
         self.failed_requests = 0
-        self.average_response_time = 0.0
-        self.response_times = []
-        self._lock = asyncio.Lock()
-    
-    async def record_request(self, response_time: float, success: bool = True):
-        """Registra uma requisição"""
-        async with self._lock:
-            self.total_requests += 1
-            self.response_times.append(response_time)
-            
-            if success:
-                self.successful_requests += 1
-            else:
-                self.failed_requests += 1
-            
-            # Manter apenas as últimas 1000 requisições para cálculo da média
-            if len(self.response_times) > 1000:
-                self.response_times = self.response_times[-1000:]
-            
-            self.average_response_time = sum(self.response_times) / len(self.response_times)
-    
+        self._histogram = LogHistogram(min_value=1e-3, max_value=3600.0, growth=1.05)
+        self._latency = self._new_window()
+        self._routes: Dict[str, RollingLatency] = {}
+
+    def _new_window(self) -> RollingLatency:
+        return RollingLatency(self._histogram, slot_seconds=10, slots=max(self.WINDOWS.values()) // 10)
+
+    @property
+    def average_response_time(self) -> float:
+        """Média da janela mais longa (0.0 sem requisições recentes)"""
+        return self._latency.window(max(self.WINDOWS.values()), ())["mean"] or 0.0
+
+    async def record_request(self, response_time: float, success: bool = True, route: Optional[str] = None):
+        """Registra uma requisição (opcionalmente associada a uma rota)"""
+        now = time.time()
+        self.total_requests += 1
+        if success:
+            self.successful_requests += 1
+        else:
+            self.failed_requests += 1
+
+        self._latency.record(response_time, now)
+        if route is not None:
+            window = self._routes.get(route)
+            if window is None:
+                if len(self._routes) >= self.MAX_ROUTES:
+                    route = "other"
+                window = self._routes.setdefault(route, self._new_window())
+            window.record(response_time, now)
+
+    def _windows(self, latency: RollingLatency, now: float) -> Dict[str, Dict[str, Any]]:
+        return {name: latency.window(seconds, self.QUANTILES, now) for name, seconds in self.WINDOWS.items()}
+
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas atuais"""
+        now = time.time()
+        latency = self._windows(self._latency, now)
         return {
             "total_requests": self.total_requests,
             "successful_requests": self.successful_requests,
             "failed_requests": self.failed_requests,
             "success_rate": (self.successful_requests / max(self.total_requests, 1)) * 100,
-            "average_response_time": self.average_response_time
+            "average_response_time": latency["5m"]["mean"] or 0.0,
+            "latency": latency,
+            "latency_by_route": {
+                route: self._windows(window, now) for route, window in list(self._routes.items())
+            }
         }
 
 
@@ -70,6 +105,12 @@ class APIStateManager:
         self._research_memory: Optional[Any] = None
         self._simple_rag: Optional[Any] = None
         self._metrics = RequestMetrics()
+        self._research_flight = SingleFlight(
+            "research",
+            wait_timeout=config.production.request_timeout,
+            enabled=config.production.single_flight_enabled
+        )
+        register_flight_stats("research", self._research_flight.stats)
         self._lock = asyncio.Lock()
         self._components_initialized = {}
         
@@ -103,6 +144,10 @@ class APIStateManager:
     def metrics(self) -> RequestMetrics:
         return self._metrics
     
+    @property
+    def research_flight(self) -> SingleFlight:
+        return self._research_flight
+    
     def get_uptime(self) -> float:
         """Retorna tempo de atividade em segundos"""
         return time.time() - self._start_time
@@ -327,6 +372,9 @@ class APIStateManager:
             self._is_ready = False
             self._components_initialized.clear()
             
+            # Exporta os spans pendentes antes de encerrar
+            get_tracer().flush()
+            
             logger.info("✅ Sistema finalizado")
     
     def get_health_status(self) -> Dict[str, Any]:
@@ -336,6 +384,8 @@ class APIStateManager:
             "uptime_seconds": self.get_uptime(),
             "components": self._components_initialized.copy(),
             "metrics": self._metrics.get_stats(),
+            "single_flight": self._research_flight.stats(),
+            "tracing": get_tracer().stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
     
@@ -346,7 +396,9 @@ class APIStateManager:
             "configuration": config.get_environment_summary(),
             "memory_initialized": self._research_memory is not None,
             "lead_researcher_initialized": self._lead_researcher is not None,
-            "simple_rag_initialized": self._simple_rag is not None
+            "simple_rag_initialized": self._simple_rag is not None,
+            "llm_usage": usage_ledger.summary(),
+            "profiling": get_request_profiler().stats()
         }
 
 
@@ -25,7 +25,7 @@ Estrutura:
 import logging
 import uvicorn
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Importações da nova estrutura modular
 from .core.config import config
@@ -34,15 +34,27 @@ from .utils.middleware import setup_middlewares
 from .utils.errors import ErrorHandler
 from .routers import research_router, indexing_router, management_router
 from .dependencies import get_rate_limiter
+from src.utils.prometheus import registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.utils.async_logging import create_log_handlers
+from src.core.config import SystemConfig
+
+# Configuração de logging (com ASYNC_LOGGING, console e arquivo rodam na
+# thread do QueueListener e o event loop apenas enfileira os registros)
+_log_formatter = logging.Formatter(
+    "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
+)
+
+
+def _build_log_handlers():
+    handlers = [logging.StreamHandler(), logging.FileHandler(config.paths.log_dir / "api_multiagent.log")]
+    for handler in handlers:
+        handler.setFormatter(_log_formatter)
+    return handlers
+
 
-# Configuração de logging
 logging.basicConfig(
     level=getattr(logging, config.server.log_level),
-    format="%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(config.paths.log_dir / "api_multiagent.log")
-    ]
+    handlers=create_log_handlers("api", _build_log_handlers, SystemConfig().production.async_logging)
 )
 
 logger = logging.getLogger(__name__)
@@ -189,6 +201,17 @@ async def root():
         ]
     }
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# MÉTRICAS PROMETHEUS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas do worker no formato de texto do Prometheus (sem autenticação, como /health)"""
+    if not config.production.enable_metrics:
+        return JSONResponse(status_code=404, content={"error": True, "message": "Métricas desabilitadas"})
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # EXECUÇÃO PRINCIPAL
 # ═══════════════════════════════════════════════════════════════════════════════
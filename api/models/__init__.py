@@ -7,6 +7,7 @@ Schemas Pydantic para validação de requisições e respostas.
 
 from .schemas import (
     ResearchQuery,
+    BatchSearchRequest,
     ResearchResponse,
     IndexRequest,
     IndexResponse,
@@ -19,6 +20,7 @@ from .schemas import (
 
 __all__ = [
     "ResearchQuery",
+    "BatchSearchRequest",
     "ResearchResponse",
     "IndexRequest", 
     "IndexResponse",
@@ -8,8 +8,9 @@ Atualizado para Pydantic V2 com field_validator.
 
 from typing import Dict, List, Any, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator, ConfigDict
-from src.core.constants import VALIDATION_CONFIG, TOKEN_LIMITS
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict
+from src.core.constants import VALIDATION_CONFIG, TOKEN_LIMITS, BATCH_SEARCH_CONFIG, DYNAMIC_MAX_CANDIDATES
+from src.core.search_filters import SearchFilters
 
 
 class ResearchQuery(BaseModel):
@@ -34,6 +35,49 @@ class ResearchQuery(BaseModel):
         max_length=VALIDATION_CONFIG['MAX_OBJECTIVE_LENGTH'],
         description="Objetivo específico da pesquisa"
     )
+    session_id: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=128,
+        pattern=r"^[A-Za-z0-9_.:-]+$",
+        description="Identificador da sessão de conversa (histórico isolado por cliente)"
+    )
+    doc_sources: Optional[List[str]] = Field(
+        default=None,
+        max_length=100,
+        description="Restringe a busca a estes documentos (doc_source)"
+    )
+    exclude_doc_sources: Optional[List[str]] = Field(
+        default=None,
+        max_length=100,
+        description="Exclui estes documentos (doc_source) da busca"
+    )
+    indexed_after: Optional[datetime] = Field(
+        default=None,
+        description="Apenas páginas indexadas a partir desta data"
+    )
+    indexed_before: Optional[datetime] = Field(
+        default=None,
+        description="Apenas páginas indexadas até esta data"
+    )
+    
+    @model_validator(mode='after')
+    def validate_indexed_range(self):
+        """Valida a faixa de datas de indexação"""
+        # SearchFilters normaliza as datas para UTC sem fuso antes de comparar
+        # (datas com e sem fuso não são comparáveis diretamente) e levanta
+        # ValueError para faixa invertida
+        self.to_search_filters()
+        return self
+    
+    def to_search_filters(self) -> Optional[SearchFilters]:
+        """Filtros de busca a partir dos campos de escopo (None se nenhum informado)"""
+        return SearchFilters.create(
+            include_sources=self.doc_sources,
+            exclude_sources=self.exclude_doc_sources,
+            indexed_after=self.indexed_after,
+            indexed_before=self.indexed_before
+        )
     
     @field_validator('query')
     @classmethod
@@ -54,6 +98,57 @@ class ResearchQuery(BaseModel):
         return v
 
 
+class BatchSearchRequest(BaseModel):
+    """Modelo para busca em lote"""
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "queries": [
+                    "O que é o Zep?",
+                    "Quais os resultados no LongMemEval?"
+                ],
+                "limit": 5,
+                "include_text": False
+            }
+        }
+    )
+    
+    queries: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_SEARCH_CONFIG['MAX_QUERIES'],
+        description="Lista de consultas para busca"
+    )
+    limit: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=DYNAMIC_MAX_CANDIDATES['MAXIMUM'] * 4,
+        description="Candidatos por consulta (padrão: dinâmico pela complexidade)"
+    )
+    include_text: bool = Field(
+        default=False,
+        description="Incluir markdown das páginas nos resultados"
+    )
+    
+    @field_validator('queries')
+    @classmethod
+    def validate_queries_content(cls, v):
+        """Valida cada query com as mesmas regras de ResearchQuery"""
+        dangerous_chars = VALIDATION_CONFIG['DANGEROUS_PATTERNS']
+        cleaned = []
+        for query in v:
+            query = (query or "").strip()
+            if len(query) < VALIDATION_CONFIG['MIN_QUERY_LENGTH'] or len(query) > VALIDATION_CONFIG['MAX_QUERY_LENGTH']:
+                raise ValueError(
+                    f"Cada query deve ter entre {VALIDATION_CONFIG['MIN_QUERY_LENGTH']} e "
+                    f"{VALIDATION_CONFIG['MAX_QUERY_LENGTH']} caracteres"
+                )
+            if any(char in query.lower() for char in dangerous_chars):
+                raise ValueError("Query contém conteúdo potencialmente perigoso")
+            cleaned.append(query)
+        return cleaned
+
+
 class ResearchResponse(BaseModel):
     """Modelo para resposta de pesquisa"""
     model_config = ConfigDict(
@@ -83,6 +178,7 @@ class ResearchResponse(BaseModel):
     confidence_score: Optional[float] = Field(default=None, description="Score de confiança (0-1)")
     sources: List[Dict[str, Any]] = Field(default_factory=list, description="Fontes utilizadas")
     reasoning_trace: str = Field(description="Trace completo do ReAct reasoning (sempre presente no sistema enhanced)")
+    usage: Optional[Dict[str, Any]] = Field(default=None, description="Tokens, latência e custo estimado das chamadas de LLM/embedding (total, por etapa e por modelo)")
     error: Optional[str] = Field(default=None, description="Mensagem de erro se aplicável")
 
 
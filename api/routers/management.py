@@ -7,8 +7,10 @@ Endpoints para administração, health checks e operações de gerenciamento.
 
 import logging
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, Path as PathParam
+from fastapi import APIRouter, Depends, Path as PathParam, Query
+from fastapi.responses import PlainTextResponse
 
 from ..models.schemas import (
     HealthResponse, 
@@ -20,10 +22,12 @@ from ..core.state import APIStateManager
 from ..dependencies import (
     get_api_state,
     get_authenticated_state,
+    verify_authentication,
     basic_health_check,
     detailed_health_check
 )
-from ..utils.errors import ProcessingError
+from ..utils.errors import ProcessingError, ResourceNotFoundError
+from src.utils.profiling import get_request_profiler
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +89,8 @@ def safe_delete_documents(doc_prefix: str = None) -> dict:
         return {
             "success": True,
             "deleted": deleted_count,
+            "lexical_index_removed": remove_from_lexical_index(doc_prefix),
+            "index_generation": invalidate_cached_answers(),
             "message": f"Deletados {deleted_count} documentos"
         }
         
@@ -92,6 +98,50 @@ def safe_delete_documents(doc_prefix: str = None) -> dict:
         logger.error(f"❌ Erro ao deletar documentos: {e}")
         return {"success": False, "error": str(e)}
 
+def remove_from_lexical_index(doc_source: str = None) -> int:
+    """
+    Remove do índice BM25 as páginas deletadas do Astra DB, para a busca
+    híbrida não ranquear páginas inexistentes até o próximo rebuild.
+    
+    Args:
+        doc_source: Documento removido; se None, esvazia o índice
+    
+    Returns:
+        Páginas removidas do índice (-1 quando o índice foi esvaziado)
+    """
+    try:
+        from src.core.config import SystemConfig
+        from src.core.lexical_index import LexicalIndexStore
+        
+        rag_config = SystemConfig().rag
+        if not rag_config.hybrid_search_enabled:
+            return 0
+        
+        lexical_store = LexicalIndexStore(rag_config.bm25_index_path, k1=rag_config.bm25_k1, b=rag_config.bm25_b)
+        if doc_source:
+            return lexical_store.remove_doc_source(doc_source)
+        lexical_store.clear()
+        return -1
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao atualizar índice BM25 após deleção: {e}")
+        return 0
+
+def invalidate_cached_answers() -> Optional[str]:
+    """
+    Invalida as respostas em cache (todos os workers, inclusive o L2
+    persistido), que podem citar páginas deletadas.
+    
+    Returns:
+        Nova geração do índice (None em caso de falha)
+    """
+    try:
+        from src.utils.tiered_cache import bump_index_generation
+        
+        return bump_index_generation()
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao invalidar respostas em cache após deleção: {e}")
+        return None
+
 def safe_delete_images(all_images: bool = False, doc_prefix: str = None) -> dict:
     """
     Deleta imagens da pasta correta (pdf_images na raiz) por prefixo ou todas
@@ -457,6 +507,55 @@ async def delete_images_endpoint(
         raise ProcessingError("deleção de imagens", str(e))
 
 
+@router.post("/profiling/arm", summary="Perfilar Próximas Requisições")
+async def arm_profiling(
+    count: int = Query(1, ge=0, le=100, description="Requisições a perfilar (0 desarma)"),
+    token: str = Depends(verify_authentication)
+):
+    """
+    Arma o profiler para as próximas `count` requisições.
+    
+    **Requer:** Autenticação
+    
+    Cada requisição perfilada retorna o header `X-Profile-ID`. Para perfilar
+    uma requisição específica, envie `X-Profile: 1` junto com o Bearer token.
+    """
+    armed = get_request_profiler().arm(count)
+    logger.info(f"🔬 Profiler armado para {armed} requisição(ões)")
+    return {"armed": armed, "timestamp": datetime.utcnow().isoformat()}
+
+
+@router.get("/profiling/profiles", summary="Perfis Capturados")
+async def list_profiles(token: str = Depends(verify_authentication)):
+    """
+    Lista os perfis em memória (mais recentes primeiro), sem as pilhas.
+    
+    **Requer:** Autenticação
+    """
+    profiler = get_request_profiler()
+    return {"profiler": profiler.stats(), "profiles": profiler.list()}
+
+
+@router.get("/profiling/profiles/{profile_id}", summary="Baixar Perfil")
+async def download_profile(
+    profile_id: str = PathParam(..., description="ID retornado em X-Profile-ID"),
+    token: str = Depends(verify_authentication)
+):
+    """
+    Retorna o perfil em collapsed stacks (uma pilha por linha + amostras),
+    pronto para flamegraph.pl, speedscope ou inferno.
+    
+    **Requer:** Autenticação
+    """
+    profile = get_request_profiler().get(profile_id)
+    if profile is None:
+        raise ResourceNotFoundError("Perfil", profile_id)
+    return PlainTextResponse(
+        profile["collapsed"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
+
+
 @router.get("/version", summary="Versão da API")
 async def get_api_version():
     """
@@ -6,21 +6,26 @@ Endpoints relacionados à pesquisa e consultas RAG.
 """
 
 import time
+import json
+import asyncio
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from ..models.schemas import ResearchQuery, ResearchResponse
+from ..models.schemas import ResearchQuery, ResearchResponse, BatchSearchRequest
 from ..core.state import APIStateManager
 from ..dependencies import (
     get_authenticated_state,
     get_lead_researcher,
+    get_simple_rag,
     track_request_metrics
 )
 from ..utils.errors import ErrorHandler, ValidationError, ProcessingError
+from src.utils.single_flight import make_flight_key
+from src.utils.llm_usage import track_usage
 
 logger = logging.getLogger(__name__)
 
@@ -97,20 +102,34 @@ async def research_query(
             logger.error(f"❌ Erro ao importar AgentContext: {e}")
             raise ProcessingError("pesquisa", "Módulos do sistema multi-agente não disponíveis")
         
+        # Escopo opcional da busca (doc_source / indexed_at)
+        search_filters = query.to_search_filters()
+        
         # Criar contexto usando modelo nativo
         context = AgentContext(
             query=query.query,
             objective=query.objective or f"Pesquisar informações sobre: {query.query}",
             metadata={
                 "api_request": True,
+                "search_filters": search_filters.to_dict() if search_filters else None,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
                 "request_id": getattr(request_context, 'get', lambda x, y: 'unknown')('request_id', 'unknown')
             }
         )
         
         # Executar pesquisa usando o lead researcher nativo
+        # (consultas idênticas em andamento compartilham a mesma execução)
         logger.info(f"🤖 Executando pesquisa com Lead Researcher...")
-        agent_result = await lead_researcher.run(context)
+        flight_key = make_flight_key(
+            query.query, objective=query.objective,
+            filters=search_filters.to_dict() if search_filters else None
+        )
+        # Tokens e custo das chamadas feitas por esta execução (duplicatas
+        # coalescidas não geram chamadas e retornam uso vazio)
+        with track_usage() as usage:
+            agent_result = await state_manager.research_flight.ado(
+                flight_key, lambda: lead_researcher.run(context)
+            )
         
         # Calcular tempo de processamento
         processing_time = time.time() - start_time
@@ -135,6 +154,7 @@ async def research_query(
             confidence_score=confidence_score,
             sources=sources,
             reasoning_trace=agent_result.reasoning_trace,  # Sempre presente no sistema enhanced
+            usage=usage.summary(),
             error=agent_result.error if agent_result.status.name == "FAILED" else None
         )
         
@@ -185,6 +205,7 @@ async def research_status(
             "research_system_ready": True,
             "lead_researcher": researcher_info,
             "system_metrics": state_manager.metrics.get_stats(),
+            "single_flight": state_manager.research_flight.stats(),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
         
@@ -223,7 +244,7 @@ async def simple_search(
         logger.info("🔍 Executando busca direta com SimpleRAG...")
         
         # Usar o método search_and_answer do RAG interno para obter sources
-        rag_result = simple_rag.rag.search_and_answer(query.query)
+        rag_result = simple_rag.rag.search_and_answer(query.query, filters=query.to_search_filters())
         
         # Calcular tempo de processamento
         processing_time = time.time() - start_time
@@ -276,6 +297,37 @@ async def simple_search(
         }
 
 
+@router.post("/batch", summary="Busca Vetorial em Lote (NDJSON)")
+async def batch_search(
+    request: BatchSearchRequest,
+    simple_rag = Depends(get_simple_rag),
+    request_context = Depends(track_request_metrics)
+):
+    """
+    Busca candidatos para várias consultas de uma vez.
+    
+    Os embeddings são gerados em chamadas agrupadas ao Voyage e as buscas
+    vetoriais rodam concorrentemente. A resposta é transmitida em NDJSON:
+    uma linha por consulta, na ordem de conclusão (use o campo `index`
+    para reordenar).
+    
+    **Parâmetros:**
+    - **queries**: Lista de consultas
+    - **limit**: Candidatos por consulta (opcional)
+    - **include_text**: Incluir markdown das páginas (padrão: false)
+    """
+    logger.info(f"📦 Busca em lote: {len(request.queries)} consultas")
+    
+    def ndjson_lines():
+        for result in simple_rag.rag.batch_search(
+            request.queries, limit=request.limit, include_text=request.include_text
+        ):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+    
+    # Gerador síncrono: o Starlette o consome em threadpool, sem bloquear o event loop
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @router.get("/debug", summary="Diagnóstico do Sistema Multi-Agente")
 async def debug_research_system(
     state_manager: APIStateManager = Depends(get_authenticated_state)
@@ -363,9 +415,17 @@ async def direct_research(
         if not hasattr(lead_researcher, 'rag_system') or not lead_researcher.rag_system:
             raise ProcessingError("rag_system", "Sistema RAG não disponível no Lead Researcher")
         
-        # Executar busca direta no RAG
+        # Executar busca direta no RAG (conversacional, com histórico por sessão)
         logger.info("🔍 Executando busca direta com SimpleRAG...")
-        rag_result = lead_researcher.rag_system.search(query.query)
+        rag_system = lead_researcher.rag_system
+        with track_usage() as usage:
+            if hasattr(rag_system, 'ask'):
+                rag_result = await asyncio.to_thread(
+                    rag_system.ask, query.query,
+                    session_id=query.session_id, filters=query.to_search_filters()
+                )
+            else:
+                rag_result = await asyncio.to_thread(rag_system.search, query.query)
         
         # Calcular tempo de processamento
         processing_time = time.time() - start_time
@@ -385,6 +445,7 @@ async def direct_research(
             "confidence_score": 0.8 if success else 0.0,
             "sources": ["SimpleRAG"] if success else [],
             "reasoning_trace": "Direct RAG search without subagents",
+            "usage": usage.summary(),
             "error": None if success else "No relevant documents found"
         }
         
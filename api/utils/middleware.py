@@ -16,11 +16,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
+from src.utils.prometheus import http_request_duration, http_requests_in_flight
+from src.utils.tracing import get_tracer, start_span, collect_spans, stage_breakdown, SPAN_KIND_SERVER
+from src.utils.profiling import get_request_profiler
+from src.core.config import SystemConfig
+
 from ..core.config import config
 from .errors import ErrorHandler, RateLimitError
 
 logger = logging.getLogger(__name__)
 
+_system_production = SystemConfig().production
+
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """Middleware para adicionar headers de segurança"""
@@ -76,7 +83,22 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         request.state.request_id = request_id
         
         try:
-            response = await call_next(request)
+            # Span raiz da requisição: etapas, subagentes e chamadas externas
+            # abertos durante o processamento viram filhos dele
+            with collect_spans() as spans, start_span(
+                f"{request.method} {request.url.path}", kind=SPAN_KIND_SERVER, request_id=request_id,
+                traceparent=request.headers.get("traceparent"),
+                **{"http.method": request.method, "http.target": request.url.path}
+            ) as span:
+                response = await call_next(request)
+                if span is not None:
+                    route = getattr(request.scope.get("route"), "path", None)
+                    if route:
+                        span.set_name(f"{request.method} {route}")
+                        span.set_attribute("http.route", route)
+                    span.set_attribute("http.status_code", response.status_code)
+                    if get_tracer().enabled:
+                        response.headers["X-Trace-ID"] = span.trace_id
             processing_time = time.time() - start_time
             
             # Log da resposta
@@ -85,6 +107,11 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
                 f"- {processing_time:.3f}s - {response.headers.get('content-length', '?')} bytes"
             )
             
+            # Requisição lenta: tempo por etapa (spans filhos do span raiz)
+            threshold = _system_production.slow_request_threshold
+            if threshold and processing_time > threshold:
+                self._log_slow_request(request_id, request, processing_time, spans)
+            
             # Adicionar headers de rastreamento
             response.headers["X-Request-ID"] = request_id
             response.headers["X-Processing-Time"] = f"{processing_time:.3f}"
@@ -107,33 +134,117 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             return error_response
 
 
+    @staticmethod
+    def _log_slow_request(request_id: str, request: Request, processing_time: float, spans) -> None:
+        stages = stage_breakdown([s for s in spans if s.kind != SPAN_KIND_SERVER])
+        breakdown = ", ".join(
+            f"{stage['stage']}={stage['total_seconds']:.2f}s"
+            + (f" ({stage['calls']}x, máx {stage['max_seconds']:.2f}s)" if stage['calls'] > 1 else "")
+            for stage in stages
+        ) or "sem etapas instrumentadas"
+        logger.warning(
+            f"🐢 [{request_id}] Requisição lenta: {request.method} {request.url.path} "
+            f"- {processing_time:.2f}s - etapas: {breakdown}"
+        )
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    Perfil de requisições sob demanda (collapsed stacks para flamegraph).
+    
+    Perfila a requisição quando o header de profiling (padrão `X-Profile: 1`)
+    vem com o Bearer token da API, ou quando o profiler foi armado em
+    POST /api/v1/profiling/arm. O ID do perfil volta em `X-Profile-ID` e o
+    arquivo é obtido em GET /api/v1/profiling/profiles/{profile_id}.
+    """
+    
+    # Endpoints que nunca consomem um perfil armado
+    EXEMPT_PREFIXES = ("/api/v1/profiling", "/api/v1/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+    
+    @staticmethod
+    def _is_privileged(request: Request) -> bool:
+        """Mesma regra do verify_authentication: Bearer token da API (ou dev sem token)"""
+        if not config.security.bearer_token:
+            return not config.production.production_mode
+        return request.headers.get("authorization", "") == f"Bearer {config.security.bearer_token}"
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        header_value = request.headers.get(_system_production.profiling_header, "")
+        requested = header_value.lower() in ("1", "true", "yes")
+        if requested and not self._is_privileged(request):
+            logger.warning(f"🚫 Header de profiling ignorado (sem autorização): {request.url.path}")
+            requested = False
+        
+        profiler = None
+        if requested or not request.url.path.startswith(self.EXEMPT_PREFIXES):
+            profiler = get_request_profiler().begin(requested)
+        if profiler is None:
+            response = await call_next(request)
+            if requested:
+                response.headers["X-Profile-Status"] = "busy"
+            return response
+        
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            profile_id = get_request_profiler().finish(
+                profiler,
+                request_id=getattr(request.state, "request_id", None),
+                method=request.method,
+                path=request.url.path,
+                status_code=status_code,
+            )
+        response.headers["X-Profile-ID"] = profile_id
+        return response
+
+
 class MetricsMiddleware(BaseHTTPMiddleware):
     """Middleware para coleta de métricas"""
     
+    @staticmethod
+    def _route_label(request: Request) -> str:
+        """Template da rota (ex.: /api/v1/documents/{collection_name}), nunca o path bruto"""
+        route = request.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+    
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         start_time = time.time()
+        http_requests_in_flight.inc(method=request.method)
         
         try:
             response = await call_next(request)
             processing_time = time.time() - start_time
             success = 200 <= response.status_code < 400
+            route = self._route_label(request)
+            http_request_duration.observe(
+                processing_time, method=request.method,
+                route=route, status=str(response.status_code)
+            )
             
             # Registrar métricas (evita importação circular)
             if hasattr(request.app.state, 'api_state_manager'):
                 state_manager = request.app.state.api_state_manager
-                await state_manager.metrics.record_request(processing_time, success)
+                await state_manager.metrics.record_request(processing_time, success, route=route)
             
             return response
             
         except Exception as e:
             processing_time = time.time() - start_time
+            route = self._route_label(request)
+            http_request_duration.observe(
+                processing_time, method=request.method, route=route, status="500"
+            )
             
             # Registrar métrica de falha
             if hasattr(request.app.state, 'api_state_manager'):
                 state_manager = request.app.state.api_state_manager
-                await state_manager.metrics.record_request(processing_time, False)
+                await state_manager.metrics.record_request(processing_time, False, route=route)
             
             raise
+        finally:
+            http_requests_in_flight.dec(method=request.method)
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
@@ -191,7 +302,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
         
         # Endpoints que não são limitados
-        if request.url.path in ["/health", "/docs", "/redoc", "/openapi.json"]:
+        if request.url.path in ["/health", "/metrics", "/docs", "/redoc", "/openapi.json"]:
             return await call_next(request)
         
         client_key = self._get_client_key(request)
@@ -300,10 +411,15 @@ def setup_middlewares(app):
         app.add_middleware(MetricsMiddleware)
         logger.info("✅ Middleware de métricas habilitado")
     
-    # 5. Logging (antes dos headers de segurança)
+    # 5. Profiling sob demanda (dentro do logging, para ter o request_id)
+    if _system_production.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
+        logger.info("✅ Profiling sob demanda habilitado")
+    
+    # 6. Logging (antes dos headers de segurança)
     app.add_middleware(RequestLoggingMiddleware)
     
-    # 6. Headers de segurança (último)
+    # 7. Headers de segurança (último)
     app.add_middleware(SecurityHeadersMiddleware)
     
     logger.info("✅ Todos os middlewares configurados")
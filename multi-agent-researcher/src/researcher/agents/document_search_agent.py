@@ -66,6 +66,8 @@ class RAGResearchSubagent(Agent[str]):
         objective = action_plan["objective"]
         # Get focus_area from context metadata (passed from lead researcher)
         focus_area = getattr(self, '_context', {}).metadata.get("focus_area", "general") if hasattr(self, '_context') else "general"
+        # Escopo da busca (doc_source / indexed_at) repassado pela API
+        search_filters = self._context.metadata.get("search_filters") if getattr(self, '_context', None) else None
         
         self.add_thinking(f"Executing optimized RAG search for: {query}")
         self.add_thinking(f"Focus area: {focus_area}")
@@ -75,7 +77,8 @@ class RAGResearchSubagent(Agent[str]):
             # top_k is now calculated dynamically based on query complexity
             search_result = await self.rag_tool._execute(
                 query=query,
-                focus_area=focus_area
+                focus_area=focus_area,
+                search_filters=search_filters
             )
             
             if search_result.get("success", False):
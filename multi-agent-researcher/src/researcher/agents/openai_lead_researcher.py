@@ -11,6 +11,11 @@ from pathlib import Path
 # Adiciona o diretório raiz ao path para importar config
 sys.path.append(os.path.join(os.path.dirname(__file__), "../../../.."))
 from src.core.config import SystemConfig
+from src.utils.prometheus import track_dependency
+from src.utils.llm_usage import instrument_openai
+from src.utils.tracing import traced, start_span
+from src.utils.cache import acached
+from src.utils.tiered_cache import get_global_cache
 
 # Load environment variables from project root
 from dotenv import load_dotenv, find_dotenv
@@ -100,7 +105,7 @@ class OpenAILeadResearcher(Agent[str]):
             api_key = self.config.api_key
             if api_key:
                 try:
-                    base_client = AsyncOpenAI(api_key=api_key)
+                    base_client = instrument_openai(AsyncOpenAI(api_key=api_key))
                     self.client = instructor.from_openai(base_client)
                     self.reasoner.add_reasoning_step(
                         "initialization",
@@ -132,9 +137,18 @@ class OpenAILeadResearcher(Agent[str]):
             )
             self.logger.warning("⚠️ OpenAI não disponível - usando modo heurístico")
         
+        # Decomposições memoizadas no cache global compartilhado: a mesma query
+        # (e a mesma análise ReAct) reaproveita o plano, com stale-while-revalidate
+        self._decompose = self._request_decomposition
+        if system_config.multiagent.plan_cache_enabled:
+            self._decompose = acached(
+                get_global_cache(), stale_ttl=system_config.multiagent.plan_cache_stale_ttl
+            )(self._request_decomposition)
+        
         self.logger.info(f"🤖 OpenAI Lead Researcher inicializado - ID: {self.agent_id}")
         self.logger.info(f"⚙️ Config: max_subagents={self.config.max_subagents}, parallel={self.config.parallel_execution}, model={self.config.model}")
 
+    @traced("lead_researcher.plan")
     async def plan(self, context: AgentContext) -> List[Dict[str, Any]]:
         """Create research plan using ReAct reasoning pattern."""
         # Fact gathering phase
@@ -197,6 +211,23 @@ RAG Research Subagents: Can search and analyze documents for specific topics
             # Use heuristic decomposition (but client will still be available for synthesis)
             return await self._plan_heuristic(context, facts, plan)
     
+    async def _request_decomposition(self, model: str, max_tokens: int,
+                                     system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        """Decomposição via LLM (resultado serializável, memoizado por `_decompose`)."""
+        # Instruções estáticas no system prompt (prefixo reaproveitável pelo
+        # cache de prompts); apenas a query e a análise variam
+        with track_dependency("openai", "plan_decomposition"):
+            decomposition, completion = await self.client.chat.completions.create_with_completion(
+                model=model,
+                max_tokens=max_tokens,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_model=QueryDecomposition
+            )
+        return decomposition.model_dump()
+    
     async def _plan_with_llm(self, context: AgentContext, facts, plan) -> List[Dict[str, Any]]:
         """Plan using OpenAI GPT-4o mini with ReAct reasoning."""
         
@@ -255,7 +286,13 @@ Required JSON structure:
   ]
 }
 
-IMPORTANT: The number of items in subagent_tasks MUST match number_of_subagents. Create diverse, complementary search tasks using different focus areas."""
+IMPORTANT: The number of items in subagent_tasks MUST match number_of_subagents. Create diverse, complementary search tasks using different focus areas.
+
+The user message contains the query and a ReAct reasoning analysis. Based on that analysis, decompose the query into specific research tasks for document search agents. Each task should focus on a different aspect or angle of the query, taking into account the facts, assumptions, and planned approach identified.
+
+Choose focus areas that complement the reasoning analysis and provide comprehensive coverage.
+
+Return the decomposition in the exact JSON format specified above."""
 
         # Integrate ReAct reasoning with LLM prompt
         reasoning_context = f"""
@@ -273,12 +310,6 @@ Objective: {context.objective}
 Constraints: {', '.join(context.constraints) if context.constraints else 'None'}
 
 {reasoning_context}
-
-Based on the ReAct reasoning analysis above, decompose this into specific research tasks for document search agents. Each task should focus on a different aspect or angle of the query, taking into account the facts, assumptions, and planned approach identified.
-
-Choose focus areas that complement the reasoning analysis and provide comprehensive coverage.
-
-Return the decomposition in the exact JSON format specified in the system prompt.
 """
 
         try:
@@ -291,15 +322,9 @@ Return the decomposition in the exact JSON format specified in the system prompt
             )
             
             self.logger.debug(f"Chamando OpenAI com modelo: {self.config.model}")
-            decomposition = await self.client.chat.completions.create(
-                model=self.config.model,
-                max_tokens=self.config.max_tokens,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_model=QueryDecomposition
-            )
+            decomposition = QueryDecomposition(**await self._decompose(
+                self.config.model, self.config.max_tokens, system_prompt, user_prompt
+            ))
             self.logger.planning(f"Resposta LLM recebida: {len(str(decomposition))} caracteres")
             
             self.reasoner.add_reasoning_step(
@@ -363,6 +388,7 @@ Return the decomposition in the exact JSON format specified in the system prompt
         self.logger.planning(f"Plano heurístico retornando {len(tasks)} tasks", {"tasks": [task.get('focus', 'general') for task in tasks]})
         return tasks
     
+    @traced("lead_researcher.execute")
     async def execute(self, plan: List[Dict[str, Any]]) -> str:
         """Execute research plan with RAG subagents."""
         self.logger.coordination(f"Execute chamado com plano de {len(plan)} tasks", {"plan_summary": plan})
@@ -409,13 +435,16 @@ Return the decomposition in the exact JSON format specified in the system prompt
             context = AgentContext(
                 query=task["query"],
                 objective=task["objective"],
-                metadata={"focus": task.get("focus", "general")}
+                metadata={
+                    "focus": task.get("focus", "general"),
+                    "search_filters": self._context.metadata.get("search_filters") if self._context else None
+                }
             )
             
             # Add to parallel execution
             coroutines.append(
                 asyncio.wait_for(
-                    subagent.run(context),
+                    self._run_subagent(subagent, context),
                     timeout=self.config.subagent_timeout
                 )
             )
@@ -453,6 +482,17 @@ Return the decomposition in the exact JSON format specified in the system prompt
             )
             return []
     
+    async def _run_subagent(self, subagent: RAGResearchSubagent, context: AgentContext) -> AgentResult:
+        """Executa um subagente dentro do seu próprio span."""
+        with start_span("subagent.run", **{
+            "agent.id": subagent.agent_id, "agent.name": subagent.name,
+            "agent.focus": context.metadata.get("focus"), "research.query": context.query[:200]
+        }) as span:
+            result = await subagent.run(context)
+            if span is not None:
+                span.set_attribute("agent.status", result.status.name)
+            return result
+    
     async def _execute_sequential(self, tasks: List[Dict[str, Any]]) -> List[AgentResult]:
         """Execute subagents sequentially."""
         results = []
@@ -486,13 +526,16 @@ Return the decomposition in the exact JSON format specified in the system prompt
             context = AgentContext(
                 query=task["query"],
                 objective=task["objective"],
-                metadata={"focus": task.get("focus", "general")}
+                metadata={
+                    "focus": task.get("focus", "general"),
+                    "search_filters": self._context.metadata.get("search_filters") if self._context else None
+                }
             )
             
             # Execute
             try:
                 result = await asyncio.wait_for(
-                    subagent.run(context),
+                    self._run_subagent(subagent, context),
                     timeout=self.config.subagent_timeout
                 )
                 results.append(result)
@@ -531,6 +574,7 @@ Return the decomposition in the exact JSON format specified in the system prompt
         
         return results
     
+    @traced("lead_researcher.synthesize")
     def _synthesize_results(self, tasks: List[Dict[str, Any]], results: List[AgentResult]) -> str:
         """Synthesize results from multiple RAG subagents using advanced coordinator model."""
         successful_results = [r for r in results if r.status == AgentState.COMPLETED and r.output]
@@ -612,13 +656,14 @@ Produza uma síntese que demonstre continuidade e evolução do reasoning inicia
             
             # Create a separate OpenAI client for synthesis (synchronous)
             from openai import OpenAI
-            sync_client = OpenAI(api_key=self.api_key)
-            response = sync_client.chat.completions.create(
-                model=coordinator_model,
-                messages=[{"role": "user", "content": synthesis_prompt}],
-                max_tokens=system_config.rag.max_tokens,
-                temperature=system_config.rag.temperature
-            )
+            sync_client = instrument_openai(OpenAI(api_key=self.api_key))
+            with track_dependency("openai", "synthesis"):
+                response = sync_client.chat.completions.create(
+                    model=coordinator_model,
+                    messages=[{"role": "user", "content": synthesis_prompt}],
+                    max_tokens=system_config.rag.max_tokens,
+                    temperature=system_config.rag.temperature
+                )
             
             synthesized_content = response.choices[0].message.content.strip()
             
@@ -719,6 +764,15 @@ Produza uma síntese que demonstre continuidade e evolução do reasoning inicia
     
     async def run(self, context: AgentContext) -> AgentResult:
         """Execute the complete OpenAI-coordinated research process."""
+        request_id = (context.metadata or {}).get("request_id")
+        with start_span("lead_researcher.run", request_id=request_id if request_id != "unknown" else None,
+                        **{"agent.id": self.agent_id, "research.query": context.query[:200]}) as span:
+            result = await self._run(context)
+            if span is not None:
+                span.set_attribute("agent.status", result.status.name)
+            return result
+
+    async def _run(self, context: AgentContext) -> AgentResult:
         self.state = AgentState.PLANNING
         start_time = datetime.utcnow()
         
@@ -17,12 +17,14 @@ from .enhanced_models import (
 # Import config do sistema principal
 try:
     from src.core.config import SystemConfig
+    from src.utils.prometheus import track_dependency
 except ImportError:
     import sys
     from pathlib import Path
     # Adicionar caminho relativo apenas se necessário
     sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent))
     from src.core.config import SystemConfig
+    from src.utils.prometheus import track_dependency
 
 # Import configurações enhanced unificadas
 from .enhanced_unified_config import get_config_for_task, unified_config
@@ -111,12 +113,13 @@ Classifique como:
 Responda apenas com: SIMPLE, MODERATE, COMPLEX ou VERY_COMPLEX
 """
             
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_score,
-                temperature=config.rag.temperature_precise
-            )
+            with track_dependency("openai", "analyze_complexity"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=config.rag.max_tokens_score,
+                    temperature=config.rag.temperature_precise
+                )
             
             result = response.choices[0].message.content.strip().upper()
             return QueryComplexity(result.lower())
@@ -164,12 +167,13 @@ Cada aspecto deve ser específico e focado em informações que podem ser encont
 Formato: lista simples, um aspecto por linha.
 """
             
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_decomposition_item,
-                temperature=system_config.rag.temperature
-            )
+            with track_dependency("openai", "extract_key_aspects"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=config.rag.max_tokens_decomposition_item,
+                    temperature=system_config.rag.temperature
+                )
             
             aspects_text = response.choices[0].message.content.strip()
             aspects = [aspect.strip("- •") for aspect in aspects_text.split('\n') if aspect.strip()]
@@ -251,12 +255,13 @@ Objetivos do refinamento:
 Retorne apenas a query refinada, sem explicações.
 """
             
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_subquery,
-                temperature=system_config.rag.temperature
-            )
+            with track_dependency("openai", "refine_query"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=config.rag.max_tokens_subquery,
+                    temperature=system_config.rag.temperature
+                )
             
             refined = response.choices[0].message.content.strip()
             return refined if refined else query
@@ -16,17 +16,51 @@ from .enhanced_models import (
 # Import config do sistema principal
 try:
     from src.core.config import SystemConfig
+    from src.core.prompt_layout import build_cached_messages
+    from src.utils.prometheus import track_dependency
+    from src.utils.tracing import traced
 except ImportError:
     import sys
     from pathlib import Path
     # Adicionar caminho relativo apenas se necessário
     sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent))
     from src.core.config import SystemConfig
+    from src.core.prompt_layout import build_cached_messages
+    from src.utils.prometheus import track_dependency
+    from src.utils.tracing import traced
 
 # Configuração
 config = SystemConfig()
 logger = logging.getLogger(__name__)
 
+# Instruções estáticas: ficam no início do prompt (prefixo estável para o
+# cache de prompts do provedor); documento e query vêm depois
+RELEVANCE_EVALUATION_INSTRUCTIONS = """
+Evaluate document relevance for the query given after the document. RESPOND ONLY WITH ONE WORD.
+
+Classification options:
+- HIGHLY_RELEVANT: Directly answers the query
+- RELEVANT: Contains useful related information  
+- SOMEWHAT_RELEVANT: Mentions topic but not central
+- NOT_RELEVANT: Unrelated or irrelevant
+
+RESPOND WITH ONLY ONE OF THESE EXACT WORDS:
+HIGHLY_RELEVANT
+RELEVANT  
+SOMEWHAT_RELEVANT
+NOT_RELEVANT
+"""
+
+KEY_FINDINGS_INSTRUCTIONS = """
+Extraia as descobertas-chave do documento fornecido que respondem à query informada ao final.
+
+Extraia 3-5 descobertas específicas e factuais.
+Cada descoberta deve ser uma frase concisa e informativa.
+Foque no que é mais relevante para a query.
+
+Formato: lista simples, uma descoberta por linha.
+"""
+
 
 class DocumentAnalyzer:
     """Analisa documentos individuais para relevância e qualidade"""
@@ -84,35 +118,20 @@ class DocumentAnalyzer:
         try:
             focus_context = ", ".join(focus_areas) if focus_areas else "general"
             
-            prompt = f"""
-Evaluate document relevance for this specific query. RESPOND ONLY WITH ONE WORD.
-
-QUERY: "{query}"
-FOCUS AREAS: {focus_context}
-
-DOCUMENT CONTENT:
-{content[:2000]}...
-
-Classification options:
-- HIGHLY_RELEVANT: Directly answers the query
-- RELEVANT: Contains useful related information  
-- SOMEWHAT_RELEVANT: Mentions topic but not central
-- NOT_RELEVANT: Unrelated or irrelevant
-
-RESPOND WITH ONLY ONE OF THESE EXACT WORDS:
-HIGHLY_RELEVANT
-RELEVANT  
-SOMEWHAT_RELEVANT
-NOT_RELEVANT
-"""
-            
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_score,  # Reduzir tokens para forçar resposta curta
-                temperature=config.rag.temperature_precise
+            messages = build_cached_messages(
+                RELEVANCE_EVALUATION_INSTRUCTIONS,
+                f"DOCUMENT CONTENT:\n{content[:2000]}...",
+                f'QUERY: "{query}"\nFOCUS AREAS: {focus_context}'
             )
             
+            with track_dependency("openai", "evaluate_relevance"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=messages,
+                    max_tokens=config.rag.max_tokens_score,  # Reduzir tokens para forçar resposta curta
+                    temperature=config.rag.temperature_precise
+                )
+            
             relevance_str = response.choices[0].message.content.strip().upper()
             
             # Validação mais robusta - mapear possíveis variações
@@ -166,50 +185,34 @@ NOT_RELEVANT
         try:
             focus_context = ", ".join(focus_areas) if focus_areas else "any relevant information"
             
-            prompt = f"""
-Extraia as descobertas-chave deste documento que respondem à query:
-
-QUERY: "{query}"
-FOCO EM: {focus_context}
-
-DOCUMENTO:
-{content[:1500]}...
-
-Extraia 3-5 descobertas específicas e factuais.
-Cada descoberta deve ser uma frase concisa e informativa.
-Foque no que é mais relevante para a query.
-
-Formato: lista simples, uma descoberta por linha.
-"""
-            
-            # Preparar mensagens (texto + imagem se disponível)
-            messages = []
+            document = f"DOCUMENTO:\n{content[:1500]}..."
+            variable = f'QUERY: "{query}"\nFOCO EM: {focus_context}'
             
+            # Documento (texto + imagem se disponível) antes da query
             if image_base64:
                 # Análise multimodal: texto + imagem
-                messages.append({
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{image_base64}",
-                                "detail": "high"
-                            }
+                context = [
+                    {"type": "text", "text": document},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/png;base64,{image_base64}",
+                            "detail": "high"
                         }
-                    ]
-                })
+                    }
+                ]
             else:
                 # Análise apenas de texto
-                messages.append({"role": "user", "content": prompt})
+                context = document
+            messages = build_cached_messages(KEY_FINDINGS_INSTRUCTIONS, context, variable)
             
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=messages,
-                max_tokens=config.rag.max_tokens_rating,
-                temperature=config.rag.temperature
-            )
+            with track_dependency("openai", "extract_key_findings"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=messages,
+                    max_tokens=config.rag.max_tokens_rating,
+                    temperature=config.rag.temperature
+                )
             
             findings_text = response.choices[0].message.content.strip()
             findings = [finding.strip("- •") for finding in findings_text.split('\n') if finding.strip()]
@@ -592,9 +595,10 @@ class SubagentExecutor:
         self, 
         task_spec: RAGSubagentTaskSpec, 
         refined_query: str,
-        max_iterations: int = 2  # Otimizado: 2 iterações são suficientes na maioria dos casos
+        max_iterations: int = 2,  # Otimizado: 2 iterações são suficientes na maioria dos casos
+        filters=None
     ) -> SubagentResult:
-        """Executa tarefa com avaliação iterativa"""
+        """Executa tarefa com avaliação iterativa (filters: SearchFilters opcional)"""
         
         logger.info(f"Executando tarefa {task_spec.specialist_type} com {max_iterations} iterações máximas")
         
@@ -609,7 +613,7 @@ class SubagentExecutor:
             logger.debug(f"Iteração {iteration + 1}/{max_iterations}")
             
             # 1. Executar busca RAG
-            search_results = self._perform_rag_search(task_spec, refined_query)
+            search_results = self._perform_rag_search(task_spec, refined_query, filters)
             
             # 2. Avaliar resultados
             evaluation = self.evaluator.evaluate_search_results(
@@ -645,7 +649,8 @@ class SubagentExecutor:
             iterations_performed=iterations_performed
         )
     
-    def _perform_rag_search(self, task_spec: RAGSubagentTaskSpec, query: str) -> List[Dict[str, Any]]:
+    @traced("tool.perform_rag_search")
+    def _perform_rag_search(self, task_spec: RAGSubagentTaskSpec, query: str, filters=None) -> List[Dict[str, Any]]:
         """Executa busca RAG usando configurações enhanced (SEM RERANKING)"""
         
         logger.debug(f"Buscando com {task_spec.max_candidates} candidatos diretos, threshold {task_spec.similarity_threshold}")
@@ -657,7 +662,9 @@ class SubagentExecutor:
             # ETAPA 2: Buscar candidatos com limite enhanced (DIRETO, SEM RERANKING)
             candidates = self.rag_system.search_candidates(
                 embedding, 
-                limit=task_spec.max_candidates  # ← Usar max_candidates do enhanced (2-5 páginas)
+                limit=task_spec.max_candidates,  # ← Usar max_candidates do enhanced (2-5 páginas)
+                include_text=False,  # Texto carregado só para os candidatos acima do threshold
+                filters=filters
             )
             
             if not candidates:
@@ -676,6 +683,10 @@ class SubagentExecutor:
             # REMOVIDO: ETAPA 4 de reranking - usar diretamente os candidatos por similaridade
             enhanced_candidates = filtered_candidates[:task_spec.max_candidates]  # Garantir limite
             
+            # Segunda fase: markdown apenas das páginas que passaram no filtro
+            if hasattr(self.rag_system, 'hydrate_candidates'):
+                self.rag_system.hydrate_candidates(enhanced_candidates)
+            
             # ETAPA 4: Converter para formato de avaliação (COM MULTIMODAL: texto + imagem base64)
             search_results = []
             for i, candidate in enumerate(enhanced_candidates):
@@ -693,7 +704,7 @@ class SubagentExecutor:
         except Exception as e:
             logger.error(f"Erro na busca RAG enhanced: {e}")
             # Fallback para sistema atual
-            rag_result = self.rag_system.search_and_answer(query)
+            rag_result = self.rag_system.search_and_answer(query, filters=filters)
             
             search_results = []
             if "selected_pages_details" in rag_result:
@@ -21,6 +21,9 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent))
 from src.core.config import SystemConfig
+from src.core.search_filters import SearchFilters
+from src.utils.tracing import start_span, traced
+from src.utils.llm_usage import instrument_openai
 
 # Configuração
 config = SystemConfig()
@@ -42,7 +45,7 @@ class EnhancedRAGSystem:
             openai_client: Cliente OpenAI (se None, cria um novo)
         """
         self.rag_system = rag_system
-        self.openai_client = openai_client or OpenAI()
+        self.openai_client = instrument_openai(openai_client or OpenAI())
         
         # Componentes enhanced
         self.decomposer = RAGDecomposer(self.openai_client)
@@ -51,12 +54,14 @@ class EnhancedRAGSystem:
         
         logger.info("🚀 Enhanced RAG System inicializado")
     
-    async def enhanced_search(self, query: str) -> EnhancedRAGResult:
+    @traced("enhanced.search")
+    async def enhanced_search(self, query: str, filters: Optional[SearchFilters] = None) -> EnhancedRAGResult:
         """
         Executa busca enhanced completa
         
         Args:
             query: Query do usuário
+            filters: Escopo da busca (doc_source / indexed_at), opcional
             
         Returns:
             EnhancedRAGResult: Resultado enhanced completo
@@ -67,7 +72,10 @@ class EnhancedRAGSystem:
         try:
             # 1. Decomposição da query
             logger.info("📋 Executando decomposição...")
-            decomposition = self.decomposer.decompose(query)
+            with start_span("enhanced.decompose") as span:
+                decomposition = self.decomposer.decompose(query)
+                if span is not None:
+                    span.set_attribute("subagent_tasks", len(decomposition.subagent_tasks))
             
             # 2. Executar tarefas dos subagentes
             logger.info(f"🤖 Executando {len(decomposition.subagent_tasks)} subagentes...")
@@ -75,14 +83,16 @@ class EnhancedRAGSystem:
             
             for task_spec in decomposition.subagent_tasks:
                 logger.debug(f"Executando {task_spec.specialist_type.value}...")
-                result = self.executor.execute_task(task_spec, decomposition.refined_query)
+                with start_span("subagent.execute_task", **{"agent.specialist": task_spec.specialist_type.value}):
+                    result = self.executor.execute_task(task_spec, decomposition.refined_query, filters=filters)
                 subagent_results.append(result)
             
             # 3. Síntese coordenada
             logger.info("🧩 Executando síntese coordenada...")
-            enhanced_result = self.synthesizer.synthesize_results(
-                decomposition, subagent_results
-            )
+            with start_span("enhanced.synthesize"):
+                enhanced_result = self.synthesizer.synthesize_results(
+                    decomposition, subagent_results
+                )
             
             total_time = time.time() - start_time
             enhanced_result.total_processing_time = total_time
@@ -94,12 +104,13 @@ class EnhancedRAGSystem:
             logger.error(f"❌ Erro na busca enhanced: {e}")
             raise
     
-    def fallback_to_simple(self, query: str) -> Dict[str, Any]:
+    def fallback_to_simple(self, query: str, filters: Optional[SearchFilters] = None) -> Dict[str, Any]:
         """
         Fallback para busca simples em caso de erro
         
         Args:
             query: Query do usuário
+            filters: Escopo da busca, opcional
             
         Returns:
             Dict: Resultado simples formatado
@@ -108,7 +119,7 @@ class EnhancedRAGSystem:
         
         try:
             # Usar sistema RAG atual
-            result = self.rag_system.search_and_answer(query)
+            result = self.rag_system.search_and_answer(query, filters=filters)
             
             return {
                 "success": True,
@@ -141,7 +152,8 @@ class EnhancedAPIAdapter:
         self, 
         query: str, 
         objective: Optional[str] = None,
-        use_enhanced: bool = True
+        use_enhanced: bool = True,
+        filters: Optional[SearchFilters] = None
     ) -> Dict[str, Any]:
         """
         Processa query de pesquisa usando sistema enhanced
@@ -150,6 +162,7 @@ class EnhancedAPIAdapter:
             query: Query do usuário
             objective: Objetivo específico (opcional)
             use_enhanced: Se deve usar sistema enhanced
+            filters: Escopo da busca (doc_source / indexed_at), opcional
             
         Returns:
             Dict: Resultado formatado para API
@@ -159,7 +172,7 @@ class EnhancedAPIAdapter:
         try:
             if use_enhanced:
                 # Usar sistema enhanced
-                enhanced_result = await self.enhanced_system.enhanced_search(query)
+                enhanced_result = await self.enhanced_system.enhanced_search(query, filters)
                 
                 return {
                     "success": enhanced_result.confidence_score > SystemConfig().rag.confidence_threshold,
@@ -185,7 +198,7 @@ class EnhancedAPIAdapter:
                 }
             else:
                 # Fallback simples
-                result = self.enhanced_system.fallback_to_simple(query)
+                result = self.enhanced_system.fallback_to_simple(query, filters)
                 result["processing_time"] = time.time() - start_time
                 return result
                 
@@ -194,7 +207,7 @@ class EnhancedAPIAdapter:
             
             # Tentar fallback
             try:
-                fallback_result = self.enhanced_system.fallback_to_simple(query)
+                fallback_result = self.enhanced_system.fallback_to_simple(query, filters)
                 fallback_result["processing_time"] = time.time() - start_time
                 fallback_result["fallback_reason"] = f"Erro no enhanced: {str(e)}"
                 return fallback_result
@@ -227,6 +240,7 @@ class EnhancedLeadResearcher:
         
         logger.info("🎯 Enhanced Lead Researcher inicializado")
     
+    @traced("enhanced_lead_researcher.run")
     async def run(self, context) -> "AgentResult":
         """
         Executa pesquisa usando sistema enhanced
@@ -268,7 +282,8 @@ class EnhancedLeadResearcher:
             result = await self.api_adapter.process_research_query(
                 query=context.query,
                 objective=getattr(context, 'objective', None),
-                use_enhanced=True
+                use_enhanced=True,
+                filters=SearchFilters.from_dict((getattr(context, 'metadata', None) or {}).get("search_filters"))
             )
             
             if result["success"]:
@@ -16,15 +16,26 @@ from .enhanced_models import (
 # Import config do sistema principal
 try:
     from src.core.config import SystemConfig
+    from src.core.constants import MODEL_CONTEXT_LIMITS
+    from src.core.prompt_budget import PromptPacker, resolve_budget
+    from src.utils.prometheus import track_dependency
 except ImportError:
     import sys
     from pathlib import Path
     # Adicionar caminho relativo apenas se necessário
     sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent))
     from src.core.config import SystemConfig
+    from src.core.constants import MODEL_CONTEXT_LIMITS
+    from src.core.prompt_budget import PromptPacker, resolve_budget
+    from src.utils.prometheus import track_dependency
 
 # Configuração
 config = SystemConfig()
+prompt_packer = PromptPacker(
+    token_chars_ratio=config.processing.token_chars_ratio,
+    default_image_tokens=config.rag.default_image_tokens,
+    min_text_tokens=config.rag.min_text_tokens
+)
 logger = logging.getLogger(__name__)
 
 
@@ -82,12 +93,13 @@ DETAILS: [descrição breve do conflito]
 Se NÃO, responda apenas: NO_CONFLICT
 """
             
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_query_transform,
-                temperature=config.rag.temperature
-            )
+            with track_dependency("openai", "check_conflict"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=config.rag.max_tokens_query_transform,
+                    temperature=config.rag.temperature
+                )
             
             result = response.choices[0].message.content.strip()
             
@@ -224,12 +236,13 @@ Dê uma nota de 0.0 a 1.0 para relevância:
 Responda apenas com o número (ex: 0.8)
 """
             
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_score,
-                temperature=config.rag.temperature
-            )
+            with track_dependency("openai", "assess_relevance"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=config.rag.max_tokens_score,
+                    temperature=config.rag.temperature
+                )
             
             score_text = response.choices[0].message.content.strip()
             return float(score_text)
@@ -282,12 +295,13 @@ Nota de 0.0 a 1.0:
 Responda apenas com o número.
 """
             
-            response = self.openai_client.chat.completions.create(
-                model=config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_score,
-                temperature=config.rag.temperature
-            )
+            with track_dependency("openai", "assess_coherence"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.rag.llm_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=config.rag.max_tokens_score,
+                    temperature=config.rag.temperature
+                )
             
             return float(response.choices[0].message.content.strip())
             
@@ -466,13 +480,23 @@ class EnhancedSynthesizer:
     ) -> str:
         """Executa síntese coordenada usando LLM"""
         
-        # Preparar informações dos especialistas
+        # Preparar informações dos especialistas (maior confiança primeiro),
+        # dividindo o orçamento de tokens da síntese entre eles
+        ordered_results = sorted(subagent_results, key=lambda r: r.confidence_level, reverse=True)
+        budget = resolve_budget(
+            config.rag.synthesis_budget_tokens, config.multiagent.model,
+            MODEL_CONTEXT_LIMITS, config.rag.max_tokens_answer
+        )
+        packed_info = prompt_packer.pack_texts(
+            [r.extracted_information for r in ordered_results], budget
+        )
+        
         specialist_info = []
-        for result in subagent_results:
+        for result, information in zip(ordered_results, packed_info):
             specialist_info.append(f"""
 ESPECIALISTA {result.specialist_type.value.upper()}:
 Confiança: {result.confidence_level:.2f}
-Informações: {result.extracted_information}
+Informações: {information}
 Fontes: {len(result.sources_used)} documentos
 """)
         
@@ -512,12 +536,13 @@ RESPOSTA SINTETIZADA:
 """
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model=config.multiagent.model,  # Usar modelo coordinator
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=config.rag.max_tokens_answer,
-                temperature=config.rag.temperature_synthesis
-            )
+            with track_dependency("openai", "coordinated_synthesis"):
+                response = self.openai_client.chat.completions.create(
+                    model=config.multiagent.model,  # Usar modelo coordinator
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=config.rag.max_tokens_answer,
+                    temperature=config.rag.temperature_synthesis
+                )
             
             return response.choices[0].message.content.strip()
             
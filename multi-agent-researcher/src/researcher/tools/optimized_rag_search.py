@@ -6,6 +6,7 @@ Separa a busca+reranking da geração de resposta, permitindo maior flexibilidad
 import sys
 import os
 import time
+import asyncio
 from typing import Any, Dict, List, Optional
 from pathlib import Path
 
@@ -22,6 +23,7 @@ sys.path.insert(0, str(Path(__file__).parents[4]))
 
 from researcher.tools.base import Tool, ToolDescription, ToolStatus, ToolResult
 from researcher.utils.multiagent_logger import get_multiagent_logger
+from src.utils.tracing import traced, current_span
 
 
 class OptimizedRAGSearchTool(Tool):
@@ -91,6 +93,16 @@ class OptimizedRAGSearchTool(Tool):
                         "description": "Area of focus for document selection",
                         "enum": ["conceptual", "technical", "comparative", "examples", "overview", "applications", "general"],
                         "default": "general"
+                    },
+                    "search_filters": {
+                        "type": "object",
+                        "description": "Restrict search to a subset of the collection",
+                        "properties": {
+                            "include_sources": {"type": "array", "items": {"type": "string"}},
+                            "exclude_sources": {"type": "array", "items": {"type": "string"}},
+                            "indexed_after": {"type": "string", "format": "date-time"},
+                            "indexed_before": {"type": "string", "format": "date-time"}
+                        }
                     }
                 },
                 "required": ["query"]
@@ -103,11 +115,13 @@ class OptimizedRAGSearchTool(Tool):
             timeout=30.0
         )
     
+    @traced("tool.rag_search")
     async def _execute(
         self,
         query: str,
         top_k: Optional[int] = None,
         focus_area: str = "general",
+        search_filters: Optional[Dict[str, Any]] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -119,6 +133,10 @@ class OptimizedRAGSearchTool(Tool):
         
         start_time = time.time()
         search_top_k = top_k if top_k is not None else self.top_k
+        span = current_span()
+        if span is not None:
+            span.set_attribute("tool.name", self.name)
+            span.set_attribute("agent.focus", focus_area)
         
         # Validar input
         if not query or not query.strip():
@@ -133,9 +151,11 @@ class OptimizedRAGSearchTool(Tool):
                 return await self._generate_mock_results(query, search_top_k, focus_area)
             
             # Executar busca RAG otimizada
-            search_results = await self._perform_optimized_search(query, focus_area)
+            search_results = await self._perform_optimized_search(query, focus_area, search_filters)
             
             execution_time = time.time() - start_time
+            if span is not None:
+                span.set_attribute("documents_selected", len(search_results["documents"]))
             
             return {
                 "query": query,
@@ -146,6 +166,7 @@ class OptimizedRAGSearchTool(Tool):
                     "reranking_justification": search_results.get("justification", ""),
                     "execution_time": execution_time,
                     "focus_area": focus_area,
+                    "search_filters": search_filters,
                     "search_method": "rag_pipeline"
                 },
                 "success": True
@@ -153,6 +174,8 @@ class OptimizedRAGSearchTool(Tool):
             
         except Exception as e:
             execution_time = time.time() - start_time
+            if span is not None:
+                span.record_exception(e)
             return {
                 "query": query,
                 "documents": [],
@@ -164,7 +187,8 @@ class OptimizedRAGSearchTool(Tool):
                 "error": f"Optimized RAG search failed: {str(e)}"
             }
     
-    async def _perform_optimized_search(self, query: str, focus_area: str) -> Dict[str, Any]:
+    async def _perform_optimized_search(self, query: str, focus_area: str,
+                                        search_filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Executa busca otimizada usando o sistema RAG de produção.
         Modifica a query baseada no focus_area para melhor direcionamento.
@@ -174,7 +198,7 @@ class OptimizedRAGSearchTool(Tool):
         focused_query = self._adjust_query_for_focus(query, focus_area)
         
         # Executar busca simples por similaridade (sem reranking nem geração final)
-        rag_result = await self._execute_rag_pipeline_partial(focused_query)
+        rag_result = await self._execute_rag_pipeline_partial(focused_query, search_filters)
         
         if "error" in rag_result:
             raise Exception(rag_result["error"])
@@ -226,10 +250,12 @@ class OptimizedRAGSearchTool(Tool):
         
         return focus_adjustments.get(focus_area, query)
     
-    async def _execute_rag_pipeline_partial(self, query: str) -> Dict[str, Any]:
+    async def _execute_rag_pipeline_partial(self, query: str,
+                                            search_filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Executa pipeline RAG simples (similaridade vetorial apenas), retornando dados multimodais completos.
         Os subagentes recebem apenas os documentos mais similares sem reranking: markdown + imagem base64.
+        Com search_filters a busca fica restrita ao subconjunto (doc_source / indexed_at).
         """
         logger = get_multiagent_logger()
         
@@ -244,7 +270,11 @@ class OptimizedRAGSearchTool(Tool):
                 
                 # 2. Buscar candidatos brutos do Astra DB com MAX_CANDIDATES dinâmico
                 # Não passar limit para usar o sistema dinâmico baseado na complexidade
-                raw_candidates = self.rag_system.search_candidates(query_embedding, query=query)
+                from src.core.search_filters import SearchFilters
+                filters = SearchFilters.from_dict(search_filters)
+                raw_candidates = self.rag_system.search_candidates(
+                    query_embedding, query=query, filters=filters
+                )
                 logger.debug(f"Candidatos brutos encontrados: {len(raw_candidates)}")
                 
                 if not raw_candidates:
@@ -260,14 +290,15 @@ class OptimizedRAGSearchTool(Tool):
                 selected_candidates = raw_candidates  # Todos os candidatos por similaridade
                 logger.debug(f"Subagentes usando {len(selected_candidates)} candidatos por similaridade (sem reranking) - determinado por complexidade")
                 
-                # 4. Preparar dados multimodais completos para subagentes
+                # 4. Carregar imagens em base64 concorrentemente (cache + I/O fora do event loop)
+                images_base64 = await asyncio.gather(*[
+                    self._load_image_base64(candidate.get("file_path"))
+                    for candidate in selected_candidates
+                ])
+                
+                # 5. Preparar dados multimodais completos para subagentes
                 multimodal_documents = []
-                for candidate in selected_candidates:
-                    # Carregar imagem em base64
-                    image_base64 = None
-                    if candidate.get("file_path"):
-                        image_base64 = self.rag_system.encode_image_to_base64(candidate["file_path"])
-                    
+                for candidate, image_base64 in zip(selected_candidates, images_base64):
                     multimodal_doc = {
                         "page_number": candidate.get("page_num"),
                         "content": candidate.get("markdown_text", ""),  # Texto markdown completo
@@ -322,6 +353,14 @@ class OptimizedRAGSearchTool(Tool):
         except Exception as e:
             return {"error": str(e)}
     
+    async def _load_image_base64(self, file_path: Optional[str]) -> Optional[str]:
+        """Carrega imagem em base64 sem bloquear o event loop."""
+        if not file_path:
+            return None
+        if hasattr(self.rag_system, 'aencode_image_to_base64'):
+            return await self.rag_system.aencode_image_to_base64(file_path)
+        return await asyncio.to_thread(self.rag_system.encode_image_to_base64, file_path)
+    
     async def _generate_mock_results(self, query: str, top_k: int, focus_area: str) -> Dict[str, Any]:
         """Gera resultados mock para demo/testing."""
         
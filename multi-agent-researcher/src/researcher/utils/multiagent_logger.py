@@ -23,6 +23,7 @@ from logging.handlers import RotatingFileHandler
 # Adiciona o diretório raiz ao path para importar config
 sys.path.append(os.path.join(os.path.dirname(__file__), "../../../../../"))
 from src.core.config import SystemConfig
+from src.utils.async_logging import create_log_handlers
 
 class MultiAgentLogger:
     """Logger centralizado para o sistema multi-agente"""
@@ -72,32 +73,39 @@ class MultiAgentLogger:
         
         log_file = log_dir / self.config.production.multiagent_log_file
         
-        file_handler = RotatingFileHandler(
-            log_file,
-            maxBytes=self.config.production.max_log_file_size * 1024 * 1024,  # MB para bytes
-            backupCount=self.config.production.log_rotation_count
-        )
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(log_level)
-        
-        # Força flush imediato para garantir que logs sejam escritos
-        file_handler.flush = lambda: file_handler.stream.flush() if hasattr(file_handler, 'stream') else None
-        
-        # Handler para console (apenas se não estiver em produção)
-        if not self.config.production.production_mode:
-            console_handler = logging.StreamHandler()
-            console_handler.setFormatter(formatter)
-            console_handler.setLevel(log_level)
-            self._logger.addHandler(console_handler)
-        
-        self._logger.addHandler(file_handler)
+        def build_handlers():
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=self.config.production.max_log_file_size * 1024 * 1024,  # MB para bytes
+                backupCount=self.config.production.log_rotation_count
+            )
+            file_handler.setFormatter(formatter)
+            file_handler.setLevel(log_level)
+            handlers = [file_handler]
+            
+            # Handler para console (apenas se não estiver em produção)
+            if not self.config.production.production_mode:
+                console_handler = logging.StreamHandler()
+                console_handler.setFormatter(formatter)
+                console_handler.setLevel(log_level)
+                handlers.append(console_handler)
+            return handlers
+        
+        # Com ASYNC_LOGGING os loggers de todos os agentes compartilham uma fila:
+        # formatação, escrita e rotação ficam na thread do listener
+        for handler in create_log_handlers(
+            f"multiagent:{log_file}", build_handlers, self.config.production.async_logging
+        ):
+            self._logger.addHandler(handler)
         
         # Log inicial
         self._logger.info(f"🤖 Multi-Agent Logger iniciado para '{self.agent_name}' - Level: {self.config.production.multiagent_log_level}")
         self._force_flush()
     
     def _force_flush(self):
-        """Força flush de todos os handlers"""
+        """Força flush de todos os handlers (sem efeito com logging assíncrono)"""
+        if self.config.production.async_logging:
+            return
         for handler in self._logger.handlers:
             if hasattr(handler, 'flush'):
                 handler.flush()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Calibra os limites do gate de relevância a partir de um conjunto rotulado.
+
+Cada linha do arquivo JSONL deve ter `relevant` (bool) e `score` (maior
+$similarity do contexto) ou `query` (o score é obtido executando a busca).
+
+Uso:
+    python scripts/calibrate_relevance_gate.py dados/relevancia.jsonl
+    python scripts/calibrate_relevance_gate.py dados/relevancia.jsonl --precision 0.99 --output gate.json
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import List, Tuple
+
+# Adicionar diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+try:
+    from src.core.constants import RELEVANCE_GATE_CONFIG
+    from src.core.relevance_gate import calibrate_thresholds
+except ImportError as e:
+    print(f"❌ Erro ao importar módulos: {e}")
+    sys.exit(1)
+
+
+def load_samples(path: Path) -> List[Tuple[float, bool]]:
+    """Lê o conjunto rotulado, executando a busca para linhas sem score."""
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    rag = None
+    samples = []
+
+    for i, row in enumerate(rows, start=1):
+        if "relevant" not in row:
+            print(f"⚠️ Linha {i} sem 'relevant', ignorada")
+            continue
+
+        score = row.get("score")
+        if score is None:
+            if not row.get("query"):
+                print(f"⚠️ Linha {i} sem 'score' nem 'query', ignorada")
+                continue
+            if rag is None:
+                from src.core.search import ProductionConversationalRAG
+                rag = ProductionConversationalRAG()
+            embedding = rag.get_query_embedding(row["query"])
+            candidates = rag.search_candidates(embedding, query=row["query"], include_text=False)
+            selected, _ = rag.select_best_candidates(row["query"], candidates)
+            if not selected:
+                print(f"⚠️ Linha {i}: nenhum candidato para '{row['query'][:50]}', ignorada")
+                continue
+            score = max(c["similarity_score"] for c in selected)
+
+        samples.append((float(score), bool(row["relevant"])))
+
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibra limites do gate de relevância")
+    parser.add_argument("dataset", type=Path, help="Arquivo JSONL rotulado")
+    parser.add_argument("--precision", type=float, default=RELEVANCE_GATE_CONFIG['TARGET_PRECISION'],
+                        help="Precisão mínima na faixa aceita sem LLM")
+    parser.add_argument("--npv", type=float, default=RELEVANCE_GATE_CONFIG['TARGET_NPV'],
+                        help="Fração mínima de irrelevantes na faixa rejeitada sem LLM")
+    parser.add_argument("--min-support", type=int, default=10,
+                        help="Amostras mínimas em cada faixa")
+    parser.add_argument("--output", type=Path, help="Grava o resultado em JSON")
+    args = parser.parse_args()
+
+    if not args.dataset.exists():
+        print(f"❌ Arquivo não encontrado: {args.dataset}")
+        sys.exit(1)
+
+    samples = load_samples(args.dataset)
+    if not samples:
+        print("❌ Nenhuma amostra válida")
+        sys.exit(1)
+
+    result = calibrate_thresholds(samples, args.precision, args.npv, args.min_support)
+    positives = sum(1 for _, label in samples if label)
+
+    print("🎯 CALIBRAÇÃO DO GATE DE RELEVÂNCIA")
+    print("=" * 50)
+    print(f"Amostras: {result['samples']} ({positives} relevantes)")
+    print(f"Limite inferior: {result['lower_bound']:.4f} (rejeita {result['expected_reject_rate']:.1%})")
+    print(f"Limite superior: {result['upper_bound']:.4f} (aceita {result['expected_accept_rate']:.1%})")
+    print(f"Chamadas LLM evitadas (estimativa): {result['expected_skip_rate']:.1%}")
+    print()
+    print("Variáveis de ambiente:")
+    print(f"RELEVANCE_LOWER_BOUND={result['lower_bound']}")
+    print(f"RELEVANCE_UPPER_BOUND={result['upper_bound']}")
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"\n💾 Resultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
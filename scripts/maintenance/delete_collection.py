@@ -19,6 +19,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 from astrapy import DataAPIClient
 from src.core.config import SystemConfig
+from src.utils.tiered_cache import bump_index_generation
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -77,6 +78,9 @@ def delete_documents(all_docs: bool = False, doc_prefix: str = None) -> dict:
         
         logger.info(f"✅ Deletados {deleted_count} documentos com sucesso")
         
+        # Respostas em cache (L2 compartilhado) podem citar as páginas deletadas
+        bump_index_generation()
+        
         return {
             "success": True,
             "deleted": deleted_count,
@@ -34,7 +34,7 @@ logger = logging.getLogger(__name__)
 class MockRAGSystem:
     """Mock do sistema RAG para testes"""
     
-    def search_and_answer(self, query: str):
+    def search_and_answer(self, query: str, filters=None):
         """Mock da busca RAG"""
         return {
             "answer": f"Esta é uma resposta mock para: {query}. Contém informações detalhadas sobre o tópico solicitado.",
@@ -59,7 +59,7 @@ class MockRAGSystem:
         random.seed(hash(query))  # Embedding consistente para a mesma query
         return [random.random() for _ in range(1024)]
     
-    def search_candidates(self, embedding, limit=10):
+    def search_candidates(self, embedding, limit=10, query=None, include_text=True, filters=None):
         """Mock para busca de candidatos enhanced"""
         candidates = []
         for i in range(min(limit, 5)):  # Retorna no máximo 5 candidatos
@@ -11,7 +11,11 @@ from .constants import (
     PROCESSING_CONFIG, MULTIAGENT_CONFIG, SYSTEM_DEFAULTS,
     LOGGING_CONFIG, PRODUCTION_CONFIG, DEV_CONFIG, FALLBACK_CONFIG,
     NATIVE_MODELS_CONFIG, API_ENDPOINTS, DOCKER_CONFIG, SECURITY_CONFIG,
-    FILE_LIMITS, API_UNIFIED_CONFIG, validate_production_config, get_production_config
+    FILE_LIMITS, API_UNIFIED_CONFIG, HYBRID_SEARCH_CONFIG, BATCH_SEARCH_CONFIG,
+    SYSTEM_LIMITS, SESSION_CONFIG, EXTRACTION_CONFIG, PROMPT_BUDGET_CONFIG,
+    SINGLE_FLIGHT_CONFIG, SCOPED_SEARCH_CONFIG, RELEVANCE_GATE_CONFIG,
+    MMR_CONFIG, SPECULATION_CONFIG, TRACING_CONFIG, PROFILING_CONFIG,
+    validate_production_config, get_production_config
 )
 
 # Carregar variáveis de ambiente
@@ -60,11 +64,30 @@ class RAGConfig:
     voyage_embedding_dim: int = get_env_int('VOYAGE_EMBEDDING_DIM', TOKEN_LIMITS['VOYAGE_EMBEDDING_DIM'])
     max_tokens_per_input: int = get_env_int('MAX_TOKENS_PER_INPUT', TOKEN_LIMITS['MAX_TOKENS_PER_INPUT'])
     
+    # Orçamentos de prompt (tokens de entrada)
+    answer_budget_tokens: int = get_env_int('ANSWER_BUDGET_TOKENS', PROMPT_BUDGET_CONFIG['ANSWER_BUDGET_TOKENS'])
+    relevance_budget_tokens: int = get_env_int('RELEVANCE_BUDGET_TOKENS', PROMPT_BUDGET_CONFIG['RELEVANCE_BUDGET_TOKENS'])
+    synthesis_budget_tokens: int = get_env_int('SYNTHESIS_BUDGET_TOKENS', PROMPT_BUDGET_CONFIG['SYNTHESIS_BUDGET_TOKENS'])
+    default_image_tokens: int = get_env_int('DEFAULT_IMAGE_TOKENS', PROMPT_BUDGET_CONFIG['DEFAULT_IMAGE_TOKENS'])
+    min_text_tokens: int = get_env_int('MIN_TEXT_TOKENS', PROMPT_BUDGET_CONFIG['MIN_TEXT_TOKENS'])
+    
     # Cache
     embedding_cache_size: int = get_env_int('EMBEDDING_CACHE_SIZE', CACHE_CONFIG['EMBEDDING_CACHE_SIZE'])
     embedding_cache_ttl: int = get_env_int('EMBEDDING_CACHE_TTL', CACHE_CONFIG['EMBEDDING_CACHE_TTL'])
     response_cache_size: int = get_env_int('RESPONSE_CACHE_SIZE', CACHE_CONFIG['RESPONSE_CACHE_SIZE'])
     response_cache_ttl: int = get_env_int('RESPONSE_CACHE_TTL', CACHE_CONFIG['RESPONSE_CACHE_TTL'])
+    image_cache_max_bytes: int = get_env_int('IMAGE_CACHE_MAX_BYTES', CACHE_CONFIG['IMAGE_CACHE_MAX_BYTES'])
+    image_cache_use_encoded: bool = get_env_bool('IMAGE_CACHE_USE_ENCODED', CACHE_CONFIG['IMAGE_CACHE_USE_ENCODED'])
+    embedding_store_enabled: bool = get_env_bool('EMBEDDING_STORE_ENABLED', CACHE_CONFIG['EMBEDDING_STORE_ENABLED'])
+    embedding_store_path: str = os.getenv(
+        'EMBEDDING_STORE_PATH',
+        os.path.join(SYSTEM_DEFAULTS['DATA_DIR'], CACHE_CONFIG['EMBEDDING_STORE_FILE'])
+    )
+    embedding_store_flush_batch: int = get_env_int('EMBEDDING_STORE_FLUSH_BATCH', CACHE_CONFIG['EMBEDDING_STORE_FLUSH_BATCH'])
+    embedding_store_flush_interval: float = get_env_float('EMBEDDING_STORE_FLUSH_INTERVAL', CACHE_CONFIG['EMBEDDING_STORE_FLUSH_INTERVAL'])
+    embedding_store_snapshot_size: int = get_env_int('EMBEDDING_STORE_SNAPSHOT_SIZE', CACHE_CONFIG['EMBEDDING_STORE_SNAPSHOT_SIZE'])
+    transform_cache_size: int = get_env_int('TRANSFORM_CACHE_SIZE', CACHE_CONFIG['TRANSFORM_CACHE_SIZE'])
+    transform_cache_ttl: int = get_env_int('TRANSFORM_CACHE_TTL', CACHE_CONFIG['TRANSFORM_CACHE_TTL'])
     
     # Processing
     top_k: int = get_env_int('TOP_K', PROCESSING_CONFIG['TOP_K'])
@@ -75,6 +98,60 @@ class RAGConfig:
     temperature_precise: float = get_env_float('TEMPERATURE_PRECISE', PROCESSING_CONFIG['TEMPERATURE_PRECISE'])
     confidence_threshold: float = get_env_float('CONFIDENCE_THRESHOLD', PROCESSING_CONFIG['CONFIDENCE_THRESHOLD'])
     
+    # Busca híbrida (BM25 + vetorial)
+    hybrid_search_enabled: bool = get_env_bool('HYBRID_SEARCH_ENABLED', HYBRID_SEARCH_CONFIG['ENABLED'])
+    rrf_k: int = get_env_int('RRF_K', HYBRID_SEARCH_CONFIG['RRF_K'])
+    bm25_k1: float = get_env_float('BM25_K1', HYBRID_SEARCH_CONFIG['BM25_K1'])
+    bm25_b: float = get_env_float('BM25_B', HYBRID_SEARCH_CONFIG['BM25_B'])
+    bm25_index_path: str = os.getenv(
+        'BM25_INDEX_PATH',
+        os.path.join(SYSTEM_DEFAULTS['DATA_DIR'], HYBRID_SEARCH_CONFIG['BM25_INDEX_FILE'])
+    )
+    
+    # Busca em lote
+    batch_embed_chunk_size: int = get_env_int('BATCH_EMBED_CHUNK_SIZE', BATCH_SEARCH_CONFIG['EMBED_CHUNK_SIZE'])
+    batch_search_concurrency: int = get_env_int('BATCH_SEARCH_CONCURRENCY', BATCH_SEARCH_CONFIG['SEARCH_CONCURRENCY'])
+    batch_max_queries: int = get_env_int('BATCH_MAX_QUERIES', BATCH_SEARCH_CONFIG['MAX_QUERIES'])
+    
+    # Busca com filtros (doc_source / indexed_at)
+    scoped_candidates_per_source: int = get_env_int('SCOPED_CANDIDATES_PER_SOURCE', SCOPED_SEARCH_CONFIG['MAX_CANDIDATES_PER_SOURCE'])
+    
+    # Gate de verificação de relevância por similaridade
+    relevance_gate_enabled: bool = get_env_bool('RELEVANCE_GATE_ENABLED', RELEVANCE_GATE_CONFIG['ENABLED'])
+    relevance_lower_bound: float = get_env_float('RELEVANCE_LOWER_BOUND', RELEVANCE_GATE_CONFIG['LOWER_BOUND'])
+    relevance_upper_bound: float = get_env_float('RELEVANCE_UPPER_BOUND', RELEVANCE_GATE_CONFIG['UPPER_BOUND'])
+    relevance_shadow_rate: float = get_env_float('RELEVANCE_SHADOW_RATE', RELEVANCE_GATE_CONFIG['SHADOW_RATE'])
+    
+    # Seleção com diversidade (MMR)
+    mmr_enabled: bool = get_env_bool('MMR_ENABLED', MMR_CONFIG['ENABLED'])
+    mmr_lambda: float = get_env_float('MMR_LAMBDA', MMR_CONFIG['LAMBDA'])
+    mmr_duplicate_threshold: float = get_env_float('MMR_DUPLICATE_THRESHOLD', MMR_CONFIG['DUPLICATE_THRESHOLD'])
+    
+    # Embedding especulativo durante a transformação da query
+    speculation_enabled: bool = get_env_bool('SPECULATION_ENABLED', SPECULATION_CONFIG['ENABLED'])
+    speculative_search: bool = get_env_bool('SPECULATIVE_SEARCH', SPECULATION_CONFIG['SEARCH'])
+    speculation_similarity: float = get_env_float('SPECULATION_SIMILARITY', SPECULATION_CONFIG['SIMILARITY_THRESHOLD'])
+    speculation_workers: int = get_env_int('SPECULATION_WORKERS', SPECULATION_CONFIG['MAX_WORKERS'])
+    
+    # Coalescência de requisições idênticas em andamento
+    single_flight_enabled: bool = get_env_bool('SINGLE_FLIGHT_ENABLED', SINGLE_FLIGHT_CONFIG['ENABLED'])
+    single_flight_timeout: float = get_env_float('SINGLE_FLIGHT_TIMEOUT', SINGLE_FLIGHT_CONFIG['WAIT_TIMEOUT'])
+    
+    # Extração estruturada (map-reduce)
+    extraction_pages_per_batch: int = get_env_int('EXTRACTION_PAGES_PER_BATCH', EXTRACTION_CONFIG['PAGES_PER_BATCH'])
+    extraction_llm_concurrency: int = get_env_int('EXTRACTION_LLM_CONCURRENCY', EXTRACTION_CONFIG['LLM_CONCURRENCY'])
+    extraction_max_chars_per_page: int = get_env_int('EXTRACTION_MAX_CHARS_PER_PAGE', EXTRACTION_CONFIG['MAX_CHARS_PER_PAGE'])
+    extraction_max_pages: int = get_env_int('EXTRACTION_MAX_PAGES', EXTRACTION_CONFIG['MAX_PAGES'])
+    extraction_include_images: bool = get_env_bool('EXTRACTION_INCLUDE_IMAGES', EXTRACTION_CONFIG['INCLUDE_IMAGES'])
+    
+    # Sessões de conversa
+    max_sessions: int = get_env_int('MAX_SESSIONS', SESSION_CONFIG['MAX_SESSIONS'])
+    session_idle_ttl: int = get_env_int('SESSION_IDLE_TTL', SESSION_CONFIG['SESSION_IDLE_TTL'])
+    max_chat_history: int = get_env_int('MAX_CHAT_HISTORY', SYSTEM_LIMITS['MAX_CHAT_HISTORY'])
+    history_trim_to: int = get_env_int('HISTORY_TRIM_TO', SESSION_CONFIG['HISTORY_TRIM_TO'])
+    max_message_chars: int = get_env_int('MAX_MESSAGE_CHARS', SESSION_CONFIG['MAX_MESSAGE_CHARS'])
+    session_max_total_bytes: int = get_env_int('SESSION_MAX_TOTAL_BYTES', SESSION_CONFIG['MAX_TOTAL_BYTES'])
+    
     # Database
     collection_name: str = os.getenv('COLLECTION_NAME', SYSTEM_DEFAULTS['COLLECTION_NAME'])
     
@@ -151,6 +228,10 @@ class MultiAgentConfig:
     immediate_retry_delay: float = get_env_float('IMMEDIATE_RETRY_DELAY', TIMEOUT_CONFIG['IMMEDIATE_RETRY_DELAY'])
     similarity_threshold: float = get_env_float('SIMILARITY_THRESHOLD', MULTIAGENT_CONFIG['SIMILARITY_THRESHOLD'])
     
+    # Cache de decomposição (planejamento)
+    plan_cache_enabled: bool = get_env_bool('PLAN_CACHE_ENABLED', MULTIAGENT_CONFIG['PLAN_CACHE_ENABLED'])
+    plan_cache_stale_ttl: int = get_env_int('PLAN_CACHE_STALE_TTL', MULTIAGENT_CONFIG['PLAN_CACHE_STALE_TTL'])
+    
     # APIs
     openai_api_key: Optional[str] = None
     
@@ -192,6 +273,7 @@ class ProcessingConfig:
     download_timeout: int = get_env_int('DOWNLOAD_TIMEOUT', TIMEOUT_CONFIG['DOWNLOAD_TIMEOUT'])
     download_chunk_size: int = get_env_int('DOWNLOAD_CHUNK_SIZE', PROCESSING_CONFIG['DOWNLOAD_CHUNK_SIZE'])
     pixmap_scale: int = get_env_int('PIXMAP_SCALE', PROCESSING_CONFIG['PIXMAP_SCALE'])
+    persist_encoded_images: bool = get_env_bool('PERSIST_ENCODED_IMAGES', CACHE_CONFIG['PERSIST_ENCODED_IMAGES'])
     
     # Cálculos de tokens
     tokens_per_pixel: float = get_env_float('TOKENS_PER_PIXEL', PROCESSING_CONFIG['TOKENS_PER_PIXEL'])
@@ -209,6 +291,13 @@ class MemoryConfig:
     l2_cache_max_size: int = get_env_int('L2_CACHE_MAX_SIZE', CACHE_CONFIG['L2_CACHE_MAX_SIZE'])
     global_cache_size: int = get_env_int('GLOBAL_CACHE_SIZE', CACHE_CONFIG['GLOBAL_CACHE_SIZE'])
     global_cache_ttl: int = get_env_int('GLOBAL_CACHE_TTL', CACHE_CONFIG['GLOBAL_CACHE_TTL'])
+    l2_cache_backend: str = os.getenv('L2_CACHE_BACKEND', CACHE_CONFIG['L2_CACHE_BACKEND'])
+    l2_cache_path: str = os.getenv(
+        'L2_CACHE_PATH',
+        os.path.join(SYSTEM_DEFAULTS['DATA_DIR'], CACHE_CONFIG['L2_CACHE_FILE'])
+    )
+    l2_cache_url: str = os.getenv('L2_CACHE_URL', CACHE_CONFIG['L2_CACHE_URL'])
+    l2_cache_timeout: float = get_env_float('L2_CACHE_TIMEOUT', CACHE_CONFIG['L2_CACHE_TIMEOUT'])
     
     # Sharding
     memory_shards: int = get_env_int('MEMORY_SHARDS', 4)
@@ -262,6 +351,22 @@ class ProductionConfig:
     enable_subagent_logs: bool = get_env_bool('ENABLE_SUBAGENT_LOGS', LOGGING_CONFIG['ENABLE_SUBAGENT_LOGS'])
     multiagent_log_file: str = os.getenv('MULTIAGENT_LOG_FILE', LOGGING_CONFIG['MULTIAGENT_LOG_FILE'])
     
+    # Tracing (spans exportados em OTLP/JSON)
+    tracing_enabled: bool = get_env_bool('TRACING_ENABLED', TRACING_CONFIG['ENABLED'])
+    tracing_exporter: str = os.getenv('TRACING_EXPORTER', TRACING_CONFIG['EXPORTER'])
+    tracing_file: str = os.getenv('TRACING_FILE', TRACING_CONFIG['FILE'])
+    tracing_endpoint: str = os.getenv('TRACING_ENDPOINT', TRACING_CONFIG['ENDPOINT'])
+    tracing_timeout: float = get_env_float('TRACING_TIMEOUT', TRACING_CONFIG['TIMEOUT'])
+    tracing_service_name: str = os.getenv('TRACING_SERVICE_NAME', TRACING_CONFIG['SERVICE_NAME'])
+    
+    # Profiling sob demanda e breakdown de requisições lentas
+    profiling_enabled: bool = get_env_bool('PROFILING_ENABLED', PROFILING_CONFIG['ENABLED'])
+    profiling_header: str = os.getenv('PROFILING_HEADER', PROFILING_CONFIG['HEADER'])
+    profiling_sample_interval_ms: int = get_env_int('PROFILING_SAMPLE_INTERVAL_MS', PROFILING_CONFIG['SAMPLE_INTERVAL_MS'])
+    profiling_max_seconds: int = get_env_int('PROFILING_MAX_SECONDS', PROFILING_CONFIG['MAX_SECONDS'])
+    profiling_max_profiles: int = get_env_int('PROFILING_MAX_PROFILES', PROFILING_CONFIG['MAX_PROFILES'])
+    slow_request_threshold: float = get_env_float('SLOW_REQUEST_THRESHOLD', PROFILING_CONFIG['SLOW_REQUEST_THRESHOLD'])
+    
     # Segurança e Rate Limiting (removido hardcoding)
     # Agora usando SecurityConfig
     
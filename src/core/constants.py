@@ -48,6 +48,32 @@ TOKEN_LIMITS = {
     'MAX_TOKENS_PER_INPUT': 32000
 }
 
+# Orçamentos de entrada por uso (tokens), limitados pela janela do modelo
+PROMPT_BUDGET_CONFIG = {
+    'ANSWER_BUDGET_TOKENS': 16000,     # generate_conversational_answer
+    'RELEVANCE_BUDGET_TOKENS': 6000,   # verify_relevance (apenas texto)
+    'SYNTHESIS_BUDGET_TOKENS': 12000,  # Síntese enhanced dos especialistas
+    'DEFAULT_IMAGE_TOKENS': 3500,      # Quando a página não tem token_count
+    'MIN_TEXT_TOKENS': 200             # Menor trecho de texto que vale incluir
+}
+
+# Janela de contexto por prefixo de modelo
+MODEL_CONTEXT_LIMITS = {
+    'gpt-4.1': 1000000,
+    'gpt-4o': 128000,
+    'DEFAULT': 128000
+}
+
+# Preço por prefixo de modelo (USD por 1M de tokens) para a contabilidade de uso
+MODEL_PRICING = {
+    'gpt-4.1-nano': {'input': 0.10, 'cached_input': 0.025, 'output': 0.40},
+    'gpt-4.1-mini': {'input': 0.40, 'cached_input': 0.10, 'output': 1.60},
+    'gpt-4.1': {'input': 2.00, 'cached_input': 0.50, 'output': 8.00},
+    'gpt-4o-mini': {'input': 0.15, 'cached_input': 0.075, 'output': 0.60},
+    'gpt-4o': {'input': 2.50, 'cached_input': 1.25, 'output': 10.00},
+    'voyage-multimodal-3': {'input': 0.12, 'cached_input': 0.12, 'output': 0.0},
+}
+
 # =============================================================================
 # CONFIGURAÇÕES DE CACHE
 # =============================================================================
@@ -60,7 +86,21 @@ CACHE_CONFIG = {
     'GLOBAL_CACHE_SIZE': 2000,       
     'GLOBAL_CACHE_TTL': 3600,       
     'L1_CACHE_MAX_SIZE': 1000,
-    'L2_CACHE_MAX_SIZE': 5000
+    'L2_CACHE_MAX_SIZE': 5000,                   # Entradas por namespace no L2
+    'L2_CACHE_BACKEND': 'sqlite',                # 'sqlite' (arquivo local), 'redis' ou 'none'
+    'L2_CACHE_FILE': 'cache_l2.sqlite3',         # Arquivo dentro de DATA_DIR (backend sqlite)
+    'L2_CACHE_URL': 'redis://localhost:6379/0',  # URL do Redis (backend redis)
+    'L2_CACHE_TIMEOUT': 5.0,                     # Timeout de operações no L2 em segundos
+    'IMAGE_CACHE_MAX_BYTES': 256 * 1024 * 1024,  # Orçamento de bytes das imagens em base64
+    'IMAGE_CACHE_USE_ENCODED': True,             # Ler arquivos .b64 pré-codificados
+    'PERSIST_ENCODED_IMAGES': True,              # Gravar .b64 durante a indexação
+    'EMBEDDING_STORE_ENABLED': True,             # Cache persistente compartilhado entre workers
+    'EMBEDDING_STORE_FILE': 'embedding_cache.sqlite3',  # Arquivo dentro de DATA_DIR
+    'EMBEDDING_STORE_FLUSH_BATCH': 32,           # Escritas acumuladas por transação
+    'EMBEDDING_STORE_FLUSH_INTERVAL': 5.0,       # Segundos máximos entre gravações
+    'EMBEDDING_STORE_SNAPSHOT_SIZE': 5000,       # Entradas carregadas na inicialização
+    'TRANSFORM_CACHE_SIZE': 2000,                # Transformações de query em cache (LRU)
+    'TRANSFORM_CACHE_TTL': 3600                  # Validade de uma transformação em segundos
 }
 
 # =============================================================================
@@ -111,7 +151,9 @@ MULTIAGENT_CONFIG = {
     'PARALLEL_EXECUTION': True,
     'USE_LLM_DECOMPOSITION': True,
     'CONCURRENCY_LIMIT': 3,
-    'SIMILARITY_THRESHOLD': 0.7 
+    'SIMILARITY_THRESHOLD': 0.7,
+    'PLAN_CACHE_ENABLED': True,      # Decomposições memoizadas no cache global (GLOBAL_CACHE_TTL)
+    'PLAN_CACHE_STALE_TTL': 600      # Janela (s) em que o plano expirado é servido durante a atualização
 }
 
 # =============================================================================
@@ -161,6 +203,30 @@ SYSTEM_LIMITS = {
     'MAX_PAGES_PER_PDF': 1000
 }
 
+# =============================================================================
+# EXTRAÇÃO ESTRUTURADA (MAP-REDUCE)
+# =============================================================================
+
+EXTRACTION_CONFIG = {
+    'PAGES_PER_BATCH': 4,          # Páginas por chamada LLM na fase map
+    'LLM_CONCURRENCY': 4,          # Chamadas LLM simultâneas
+    'MAX_CHARS_PER_PAGE': 4000,    # Texto por página no prompt
+    'MAX_PAGES': SYSTEM_LIMITS['MAX_PAGES_PER_PDF'],  # Teto de páginas por extração (documento inteiro)
+    'INCLUDE_IMAGES': True         # Anexar imagem de cada página
+}
+
+# =============================================================================
+# SESSÕES DE CONVERSA
+# =============================================================================
+
+SESSION_CONFIG = {
+    'MAX_SESSIONS': 10000,                 # Sessões simultâneas em memória
+    'SESSION_IDLE_TTL': 1800,              # Segundos sem uso até expirar
+    'HISTORY_TRIM_TO': 16,                 # Mensagens mantidas ao exceder MAX_CHAT_HISTORY
+    'MAX_MESSAGE_CHARS': 8000,             # Limite por mensagem armazenada
+    'MAX_TOTAL_BYTES': 64 * 1024 * 1024    # Teto global de memória dos históricos
+}
+
 # =============================================================================
 # CONFIGURAÇÕES DE FALLBACK
 # =============================================================================
@@ -273,6 +339,83 @@ DYNAMIC_MAX_CANDIDATES = {
     'MAXIMUM': 6         # Limite máximo absoluto
 }
 
+# =============================================================================
+# BUSCA HÍBRIDA (BM25 + VETORIAL)
+# =============================================================================
+
+HYBRID_SEARCH_CONFIG = {
+    'ENABLED': True,                      # Combina BM25 com busca vetorial
+    'RRF_K': 60,                          # Constante do Reciprocal Rank Fusion
+    'BM25_K1': 1.2,                       # Saturação de frequência de termos
+    'BM25_B': 0.75,                       # Normalização por tamanho da página
+    'BM25_INDEX_FILE': 'bm25_index.json.gz'  # Arquivo dentro de DATA_DIR
+}
+
+# =============================================================================
+# BUSCA EM LOTE
+# =============================================================================
+
+BATCH_SEARCH_CONFIG = {
+    'EMBED_CHUNK_SIZE': 64,        # Queries por chamada multimodal_embed
+    'SEARCH_CONCURRENCY': 8,       # Buscas vetoriais simultâneas no Astra DB
+    'MAX_QUERIES': 500             # Máximo de queries por requisição
+}
+
+# =============================================================================
+# EMBEDDING ESPECULATIVO
+# =============================================================================
+
+SPECULATION_CONFIG = {
+    'ENABLED': True,               # Embeda a mensagem original durante a transformação por LLM
+    'SEARCH': True,                # Também executa a busca vetorial especulativa
+    'SIMILARITY_THRESHOLD': 0.9,   # Similaridade textual mínima para reaproveitar
+    'MAX_WORKERS': 4               # Threads dedicadas ao trabalho especulativo
+}
+
+# =============================================================================
+# DIVERSIDADE NA SELEÇÃO (MMR)
+# =============================================================================
+
+MMR_CONFIG = {
+    'ENABLED': True,               # Requer NumPy; sem ele a seleção é só por score
+    'LAMBDA': 0.7,                 # Peso da relevância vs. diversidade
+    'DUPLICATE_THRESHOLD': 0.97    # Cosseno a partir do qual páginas são quase-duplicatas
+}
+
+# =============================================================================
+# GATE DE VERIFICAÇÃO DE RELEVÂNCIA
+# =============================================================================
+
+RELEVANCE_GATE_CONFIG = {
+    'ENABLED': True,
+    # Limites de $similarity; calibre com scripts/calibrate_relevance_gate.py.
+    # Os padrões (0.0 / 1.0) nunca pulam o LLM até a calibração.
+    'LOWER_BOUND': 0.0,            # Abaixo: rejeita sem chamar o LLM
+    'UPPER_BOUND': 1.0,            # Acima: aceita sem chamar o LLM
+    'SHADOW_RATE': 0.05,           # Fração das decisões sem LLM conferidas em segundo plano
+    'TARGET_PRECISION': 0.98,      # Calibração: precisão mínima na faixa aceita
+    'TARGET_NPV': 0.98             # Calibração: fração mínima de irrelevantes na faixa rejeitada
+}
+
+# =============================================================================
+# BUSCA COM FILTROS DE METADADOS
+# =============================================================================
+
+SCOPED_SEARCH_CONFIG = {
+    # Com doc_sources explícitos o subconjunto é pequeno e a ordenação exata:
+    # poucos candidatos por documento bastam (limitado por DYNAMIC_MAX_CANDIDATES)
+    'MAX_CANDIDATES_PER_SOURCE': 3
+}
+
+# =============================================================================
+# COALESCÊNCIA DE REQUISIÇÕES (SINGLE-FLIGHT)
+# =============================================================================
+
+SINGLE_FLIGHT_CONFIG = {
+    'ENABLED': True,               # Duplicatas concorrentes aguardam a mesma execução
+    'WAIT_TIMEOUT': 300            # Espera máxima (s) de uma duplicata pela execução líder
+}
+
 # =============================================================================
 # PADRÕES DE QUERY PARA ESPECIALISTAS
 # =============================================================================
@@ -351,6 +494,24 @@ LOGGING_CONFIG = {
     'MULTIAGENT_LOG_FILE': 'multiagent.log',        # Arquivo específico para multi-agente
 }
 
+TRACING_CONFIG = {
+    'ENABLED': True,                                # Spans por etapa, subagente, ferramenta e chamada externa
+    'EXPORTER': 'file',                             # 'file' (OTLP/JSON local), 'otlp' (coletor HTTP) ou 'none'
+    'FILE': 'traces.jsonl',                         # Relativo a LOGS_DIR
+    'ENDPOINT': 'http://localhost:4318/v1/traces',  # Coletor OTLP/HTTP
+    'TIMEOUT': 5.0,                                 # Timeout (s) do envio ao coletor
+    'SERVICE_NAME': 'rag-multiagent',               # service.name no recurso OTLP
+}
+
+PROFILING_CONFIG = {
+    'ENABLED': True,                                # Perfil sob demanda (header X-Profile ou /profiling/arm)
+    'HEADER': 'X-Profile',                          # Header privilegiado (exige o Bearer token da API)
+    'SAMPLE_INTERVAL_MS': 5,                        # Intervalo de amostragem das pilhas
+    'MAX_SECONDS': 120,                             # Amostragem interrompida após este tempo
+    'MAX_PROFILES': 20,                             # Perfis mantidos em memória (os mais recentes)
+    'SLOW_REQUEST_THRESHOLD': 10.0,                 # Requisições acima disto (s) logam o tempo por etapa
+}
+
 # =============================================================================
 # CONFIGURAÇÕES DE VALIDAÇÃO
 # =============================================================================
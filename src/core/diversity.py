@@ -0,0 +1,89 @@
+"""
+Seleção com diversidade por Maximal Marginal Relevance (MMR).
+
+Páginas adjacentes ou cópias do mesmo artigo costumam ocupar várias posições
+do top-k; todas seriam enviadas ao LLM (texto + imagem). O MMR escolhe, a cada
+passo, o candidato que equilibra relevância e dissimilaridade com os já
+escolhidos, e descarta quase-duplicatas antes da montagem do prompt.
+"""
+
+import logging
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.7,
+    duplicate_threshold: float = 0.97
+) -> Tuple[List[int], List[int]]:
+    """
+    Seleção gulosa por MMR, vetorizada em NumPy.
+
+    A similaridade entre candidatos usa a mesma escala do $similarity do
+    Astra DB para métrica cosseno, (1 + cos) / 2, para ser comparável com a
+    relevância. Candidatos com cosseno >= duplicate_threshold em relação a um
+    já escolhido são descartados como quase-duplicatas.
+
+    Args:
+        relevance: Relevância de cada candidato (maior = melhor)
+        vectors: Embedding de cada candidato
+        k: Máximo de candidatos a selecionar
+        lambda_mult: Peso da relevância (1.0 = só relevância)
+        duplicate_threshold: Cosseno a partir do qual o candidato é duplicata
+
+    Returns:
+        (índices selecionados em ordem de escolha, índices descartados como duplicatas)
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy não disponível para seleção MMR")
+
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return [], []
+
+    rel = np.asarray(relevance, dtype=np.float32)
+    mat = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mat = mat / norms
+
+    cosine = mat @ mat.T
+    similarity = (1.0 + cosine) / 2.0
+
+    available = np.ones(n, dtype=bool)
+    duplicate = np.zeros(n, dtype=bool)
+    max_sim = np.zeros(n, dtype=np.float32)
+    selected: List[int] = []
+
+    while len(selected) < k and available.any():
+        if selected:
+            scores = lambda_mult * rel - (1.0 - lambda_mult) * max_sim
+        else:
+            scores = rel.copy()
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+
+        # Quase-duplicatas do escolhido saem da disputa
+        near = available & (cosine[chosen] >= duplicate_threshold)
+        duplicate |= near
+        available &= ~near
+
+        np.maximum(max_sim, similarity[chosen], out=max_sim)
+
+    return selected, np.flatnonzero(duplicate).tolist()
+
+
+__all__ = ['mmr_select', 'NUMPY_AVAILABLE']
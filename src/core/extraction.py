@@ -0,0 +1,202 @@
+"""
+Extração estruturada map-reduce sobre documentos inteiros.
+
+Fase map: o template é aplicado a lotes de páginas em paralelo, limitado por
+um teto de chamadas LLM simultâneas. Fase reduce: os JSONs parciais são
+combinados por um redutor determinístico (ordem das páginas), de forma que o
+mesmo documento sempre produz o mesmo resultado.
+"""
+
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.tracing import bind_context
+
+logger = logging.getLogger(__name__)
+
+
+def _is_empty(value: Any) -> bool:
+    """Valores considerados ausentes pelo redutor."""
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _dedup_key(value: Any) -> str:
+    """Chave estável para deduplicar itens de listas."""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def reduce_partial_results(template: Any, partials: List[Any]) -> Any:
+    """
+    Combina resultados parciais seguindo a forma do template.
+
+    - Listas: união na ordem das páginas, sem duplicatas
+    - Objetos: combinação campo a campo (recursiva)
+    - Escalares: primeiro valor não vazio na ordem das páginas (None se nenhum
+      lote encontrou o campo; o valor do template é só uma descrição)
+
+    Args:
+        template: Template de extração (define a forma esperada)
+        partials: Resultados parciais já ordenados por página
+
+    Returns:
+        Resultado combinado
+    """
+    if isinstance(template, dict):
+        merged = {}
+        keys = list(template.keys())
+        # Campos extras retornados pelo modelo entram depois, em ordem estável
+        for partial in partials:
+            if isinstance(partial, dict):
+                keys.extend(k for k in partial.keys() if k not in keys)
+        for key in keys:
+            values = [p.get(key) for p in partials if isinstance(p, dict) and key in p]
+            merged[key] = reduce_partial_results(template.get(key), values)
+        return merged
+
+    if isinstance(template, list):
+        item_template = template[0] if template else None
+        merged_list: List[Any] = []
+        seen = set()
+        for partial in partials:
+            items = partial if isinstance(partial, list) else ([] if _is_empty(partial) else [partial])
+            for item in items:
+                if _is_empty(item):
+                    continue
+                key = _dedup_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    merged_list.append(item)
+        # Listas de objetos: normaliza cada item pela forma do template
+        if isinstance(item_template, dict):
+            merged_list = [reduce_partial_results(item_template, [item]) for item in merged_list]
+        return merged_list
+
+    for partial in partials:
+        if not _is_empty(partial):
+            return partial
+    return None
+
+
+class MapReduceExtractor:
+    """
+    Executa extração estruturada em lotes de páginas com concorrência limitada.
+
+    Args:
+        llm_call: Função (content_parts) -> texto JSON; chamada uma vez por lote
+        image_loader: Função (file_path) -> base64 ou None
+        pages_per_batch: Páginas por chamada LLM
+        max_concurrency: Chamadas LLM simultâneas
+        max_chars_per_page: Limite de texto por página no prompt
+        include_images: Se deve anexar a imagem de cada página
+    """
+
+    def __init__(
+        self,
+        llm_call: Callable[[List[Dict[str, Any]]], str],
+        image_loader: Optional[Callable[[str], Optional[str]]] = None,
+        pages_per_batch: int = 4,
+        max_concurrency: int = 4,
+        max_chars_per_page: int = 4000,
+        include_images: bool = True
+    ):
+        self.llm_call = llm_call
+        self.image_loader = image_loader
+        self.pages_per_batch = max(1, pages_per_batch)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_chars_per_page = max_chars_per_page
+        self.include_images = include_images
+
+    def _build_content(self, template_str: str, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Monta o prompt de um lote: instruções estáticas primeiro, páginas depois."""
+        content = [{
+            "type": "text",
+            "text": f"""
+Extraia dados estruturados seguindo este template: {template_str}
+
+Use apenas as páginas abaixo. Se informação não disponível, deixe em branco.
+Para listas, inclua todos os itens encontrados nestas páginas.
+Responda APENAS com JSON válido.
+
+DOCUMENTOS:"""
+        }]
+
+        for page in batch:
+            doc_name = page.get("doc_source") or "documento"
+            page_num = page.get("page_num", 0)
+            content_text = (page.get("markdown_text") or "")[:self.max_chars_per_page]
+            content.append({
+                "type": "text",
+                "text": f"\n=== {doc_name.upper()} - PÁGINA {page_num} ===\n{content_text}\n"
+            })
+
+            if self.include_images and self.image_loader and page.get("file_path"):
+                img_b64 = self.image_loader(page["file_path"])
+                if img_b64:
+                    content.append({
+                        "type": "image_url",
+                        "image_url": {"url": f"data:image/png;base64,{img_b64}"}
+                    })
+        return content
+
+    def _map_batch(self, template_str: str, batch: List[Dict[str, Any]]) -> Optional[Any]:
+        """Fase map: extrai JSON parcial de um lote de páginas."""
+        try:
+            raw = self.llm_call(self._build_content(template_str, batch))
+            return json.loads(raw)
+        except Exception as e:
+            first, last = batch[0].get("page_num"), batch[-1].get("page_num")
+            logger.warning(f"[EXTRACT] ⚠️ Lote de páginas {first}-{last} falhou: {e}")
+            return None
+
+    def extract(self, template: Dict[str, Any], pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Extrai dados de todas as páginas.
+
+        Returns:
+            Dict com data, pages_analyzed, batches e failed_batches
+        """
+        start_time = time.time()
+
+        # Ordem determinística: documento e número da página
+        ordered = sorted(pages, key=lambda p: (str(p.get("doc_source") or ""), p.get("page_num") or 0))
+        batches = [
+            ordered[i:i + self.pages_per_batch]
+            for i in range(0, len(ordered), self.pages_per_batch)
+        ]
+        template_str = json.dumps(template, indent=2, ensure_ascii=False)
+
+        logger.info(f"[EXTRACT] 🗺️ Map: {len(ordered)} páginas em {len(batches)} lotes "
+                    f"(concorrência {self.max_concurrency})")
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="rag-extract") as executor:
+            # bind_context leva span, ledger de uso e coletor de spans às threads;
+            # os resultados são lidos na ordem dos lotes, independente da conclusão
+            futures = [
+                executor.submit(bind_context(self._map_batch), template_str, batch)
+                for batch in batches
+            ]
+            results: List[Optional[Any]] = [future.result() for future in futures]
+
+        partials = [r for r in results if r is not None]
+        failed = len(results) - len(partials)
+        if not partials:
+            raise RuntimeError("Todos os lotes de extração falharam")
+
+        data = reduce_partial_results(template, partials)
+        logger.info(f"[EXTRACT] 🧩 Reduce: {len(partials)} resultados parciais combinados "
+                    f"em {time.time() - start_time:.2f}s ({failed} lotes com falha)")
+
+        return {
+            "data": data,
+            "pages_analyzed": len(ordered),
+            "batches": len(batches),
+            "failed_batches": failed
+        }
+
+
+__all__ = ['MapReduceExtractor', 'reduce_partial_results']
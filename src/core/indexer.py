@@ -29,9 +29,15 @@ from astrapy.collection import Collection
 
 from .config import SystemConfig
 from .constants import NATIVE_MODELS_CONFIG, API_UNIFIED_CONFIG, VALIDATION_CONFIG
+from .lexical_index import LexicalIndexStore
 from ..utils.validation import validate_document, validate_embedding
+from ..utils.vectors import Embedding, to_float32, to_list
 from ..utils.resource_manager import ResourceManager
 from ..utils.metrics import ProcessingMetrics
+from ..utils.image_cache import write_encoded_sidecar
+from ..utils.llm_usage import instrument_voyage
+from ..utils.prometheus import track_dependency
+from ..utils.tiered_cache import bump_index_generation
 # from utils.metrics import measure_time  # Temporariamente removido
 
 # Configuração
@@ -76,7 +82,7 @@ class PageContent:
     markdown_text: str
     image_path: str
     doc_source: str
-    embedding: Optional[List[float]] = None
+    embedding: Optional[Embedding] = None  # float32 contíguo; lista só na inserção
     token_count: Optional[int] = None
     processing_time: Optional[float] = None
 
@@ -283,6 +289,10 @@ class NativeIndexingProcessor:
             img_path = os.path.join(img_dir, f"{doc_source}_page_{page_num+1}.png")
             pix.save(img_path)
             
+            # Pré-codificar imagem em base64 para o caminho de busca
+            if self.config.processing.persist_encoded_images:
+                write_encoded_sidecar(img_path)
+            
             # Criar objeto nativo
             content = PageContent(
                 id=f"{doc_source}_{page_num}",
@@ -313,13 +323,14 @@ class NativeIndexingProcessor:
                 multimodal_content = [content.markdown_text, pil_image]
                 
                 # Gerar embedding
-                result = await client.multimodal_embed(
-                    inputs=[multimodal_content], 
-                    model=self.config.rag.multimodal_model
-                )
+                with track_dependency("voyage", "embed_document"):
+                    result = await client.multimodal_embed(
+                        inputs=[multimodal_content], 
+                        model=self.config.rag.multimodal_model
+                    )
                 
                 if result and result.embeddings:
-                    content.embedding = result.embeddings[0]
+                    content.embedding = to_float32(result.embeddings[0])
                     
                     # Validar embedding
                     if validate_embedding(content.embedding, self.config.rag.voyage_embedding_dim):
@@ -373,7 +384,7 @@ class NativeIndexingProcessor:
                     "file_path": content.image_path,
                     "doc_source": content.doc_source,
                     "markdown_text": content.markdown_text,
-                    "$vector": content.embedding,
+                    "$vector": to_list(content.embedding),
                     "token_count": content.token_count,
                     "processing_time": content.processing_time,
                     "indexed_at": datetime.utcnow().isoformat(),
@@ -500,6 +511,24 @@ def process_pdf_from_url(url: str, doc_source: str = None) -> Tuple[bool, int, i
                     except Exception as individual_error:
                         logger.error(f"❌ Erro ao inserir {doc['_id']}: {individual_error}")
         
+        # 5. Atualizar índice BM25 (busca híbrida) com as páginas inseridas
+        if processor.config.rag.hybrid_search_enabled:
+            try:
+                lexical_store = LexicalIndexStore(
+                    processor.config.rag.bm25_index_path,
+                    k1=processor.config.rag.bm25_k1,
+                    b=processor.config.rag.bm25_b
+                )
+                lexical_store.update_doc_source(
+                    doc_source,
+                    [(doc["_id"], doc["page_num"], doc["markdown_text"]) for doc in documents]
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao atualizar índice BM25: {e}")
+        
+        # 6. Invalidar respostas em cache que citam as páginas substituídas
+        bump_index_generation()
+        
         processing_time = time.time() - start_time
         
         logger.info(f"✅ Indexação refatorada concluída!")
@@ -522,7 +551,7 @@ async def _generate_embeddings_native(processor: NativeIndexingProcessor, conten
         logger.info(f"🔄 Gerando embeddings com {processing_concurrency} workers...")
         
         semaphore = asyncio.Semaphore(processing_concurrency)
-        async_client = voyageai.AsyncClient()
+        async_client = instrument_voyage(voyageai.AsyncClient())
         
         try:
             tasks = [processor.generate_embedding(semaphore, async_client, content) for content in contents]
@@ -0,0 +1,356 @@
+"""
+Índice invertido BM25 sobre o markdown_text das páginas indexadas.
+
+Complementa a busca vetorial do Astra DB para termos exatos (nomes de
+tabelas, números arXiv, siglas) que a similaridade semântica ranqueia mal.
+O índice é construído pelo indexer e persistido em JSON compactado (gzip),
+com listas de postings codificadas por delta.
+"""
+
+import os
+import re
+import gzip
+import json
+import math
+import heapq
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: apenas o lock entre threads
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# Mantém identificadores como "2501.13956", "gpt-4o" e "table_2" como um único token
+_TOKEN_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokeniza texto para o BM25 (minúsculas, identificadores preservados)."""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 em memória.
+
+    Cada documento é uma página: (_id, doc_source, page_num, tamanho em tokens).
+    Postings são listas planas [doc_idx, tf, doc_idx, tf, ...] ordenadas por doc_idx.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: List[List[Any]] = []
+        self.postings: Dict[str, List[int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_document(self, doc_id: str, doc_source: str, page_num: int, text: str) -> None:
+        """Adiciona uma página ao índice."""
+        tokens = tokenize(text)
+        doc_idx = len(self.docs)
+        self.docs.append([doc_id, doc_source, page_num, len(tokens)])
+        self._total_length += len(tokens)
+
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        for term, tf in frequencies.items():
+            self.postings.setdefault(term, []).extend((doc_idx, tf))
+
+    def remove_doc_source(self, doc_source: str) -> int:
+        """Remove todas as páginas de um documento. Retorna quantas foram removidas."""
+        keep = [i for i, doc in enumerate(self.docs) if doc[1] != doc_source]
+        removed = len(self.docs) - len(keep)
+        if removed == 0:
+            return 0
+
+        remap = {old_idx: new_idx for new_idx, old_idx in enumerate(keep)}
+        self.docs = [self.docs[i] for i in keep]
+        self._total_length = sum(doc[3] for doc in self.docs)
+
+        new_postings: Dict[str, List[int]] = {}
+        for term, plist in self.postings.items():
+            filtered: List[int] = []
+            for pos in range(0, len(plist), 2):
+                new_idx = remap.get(plist[pos])
+                if new_idx is not None:
+                    filtered.extend((new_idx, plist[pos + 1]))
+            if filtered:
+                new_postings[term] = filtered
+        self.postings = new_postings
+        return removed
+
+    def search(self, query: str, top_k: int = 10,
+               doc_filter: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Retorna [(doc_id, score_bm25)] em ordem decrescente de score.
+
+        `doc_filter` recebe o doc_source e restringe as páginas antes do top-k.
+        """
+        n_docs = len(self.docs)
+        if n_docs == 0 or top_k <= 0:
+            return []
+
+        avg_length = self._total_length / n_docs if self._total_length else 1.0
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            df = len(plist) // 2
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for pos in range(0, len(plist), 2):
+                doc_idx = plist[pos]
+                tf = plist[pos + 1]
+                length_norm = 1.0 - self.b + self.b * self.docs[doc_idx][3] / avg_length
+                score = idf * tf * (self.k1 + 1.0) / (tf + self.k1 * length_norm)
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + score
+
+        if doc_filter is not None:
+            allowed: Dict[str, bool] = {}
+            for doc_idx in list(scores):
+                doc_source = self.docs[doc_idx][1]
+                if doc_source not in allowed:
+                    allowed[doc_source] = doc_filter(doc_source)
+                if not allowed[doc_source]:
+                    del scores[doc_idx]
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self.docs[doc_idx][0], score) for doc_idx, score in best]
+
+    # ─── Persistência ────────────────────────────────────────────────────────
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa com postings codificados por delta (doc_idx relativo)."""
+        encoded: Dict[str, List[int]] = {}
+        for term, plist in self.postings.items():
+            deltas: List[int] = []
+            previous = 0
+            for pos in range(0, len(plist), 2):
+                deltas.extend((plist[pos] - previous, plist[pos + 1]))
+                previous = plist[pos]
+            encoded[term] = deltas
+        return {"version": INDEX_FORMAT_VERSION, "docs": self.docs, "postings": encoded}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """Reconstrói o índice a partir do formato serializado."""
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Versão de índice BM25 não suportada: {data.get('version')}")
+
+        index = cls(k1=k1, b=b)
+        index.docs = data.get("docs", [])
+        index._total_length = sum(doc[3] for doc in index.docs)
+        for term, deltas in data.get("postings", {}).items():
+            plist: List[int] = []
+            current = 0
+            for pos in range(0, len(deltas), 2):
+                current += deltas[pos]
+                plist.extend((current, deltas[pos + 1]))
+            index.postings[term] = plist
+        return index
+
+    def save(self, path: str) -> None:
+        """Grava o índice de forma atômica (arquivo temporário exclusivo + rename)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory or None)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """Carrega o índice do disco."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), k1=k1, b=b)
+
+
+class LexicalIndexStore:
+    """
+    Acesso thread-safe ao índice BM25 persistido.
+
+    Recarrega automaticamente quando o arquivo é atualizado pelo indexer
+    (outro processo), comparando o mtime a cada busca. Escritas tomam um
+    lock de arquivo (`<path>.lock`) e releem o índice do disco antes de
+    aplicar a mudança, então indexers e workers da API concorrentes não
+    perdem as atualizações uns dos outros.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._index: Optional[BM25Index] = None
+        self._loaded_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _current_index(self) -> Optional[BM25Index]:
+        """Retorna o índice carregado, recarregando se o arquivo mudou."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+        if self._index is not None and mtime == self._loaded_mtime:
+            return self._index
+
+        with self._lock:
+            if self._index is None or mtime != self._loaded_mtime:
+                try:
+                    self._index = BM25Index.load(self.path, k1=self.k1, b=self.b)
+                    self._loaded_mtime = mtime
+                    logger.info(f"📚 Índice BM25 carregado: {len(self._index)} páginas ({self.path})")
+                except Exception as e:
+                    logger.warning(f"⚠️ Falha ao carregar índice BM25 {self.path}: {e}")
+                    return self._index
+        return self._index
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Lock entre threads e, com fcntl, entre processos."""
+        with self._lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _commit(self, index: BM25Index) -> None:
+        """Persiste e adota o índice (chamado com o lock de escrita)."""
+        index.save(self.path)
+        self._index = index
+        self._loaded_mtime = os.stat(self.path).st_mtime
+
+    def is_available(self) -> bool:
+        """Indica se existe índice com páginas para busca."""
+        index = self._current_index()
+        return index is not None and len(index) > 0
+
+    def search(self, query: str, top_k: int = 10,
+               doc_filter: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Busca BM25; retorna lista vazia se o índice não existir."""
+        index = self._current_index()
+        if index is None:
+            return []
+        return index.search(query, top_k, doc_filter=doc_filter)
+
+    def _replace_doc_source(self, doc_source: str, pages: Iterable[Tuple[str, int, str]]) -> Tuple[int, int]:
+        """Substitui as páginas de um documento; retorna (removidas, indexadas)."""
+        with self._write_lock():
+            # Relê o arquivo sob o lock: inclui escritas de outros processos
+            if os.path.exists(self.path):
+                try:
+                    index = BM25Index.load(self.path, k1=self.k1, b=self.b)
+                except Exception as e:
+                    logger.warning(f"⚠️ Índice BM25 ilegível, recriando: {e}")
+                    index = BM25Index(k1=self.k1, b=self.b)
+            else:
+                index = BM25Index(k1=self.k1, b=self.b)
+
+            removed = index.remove_doc_source(doc_source)
+            added = 0
+            for doc_id, page_num, text in pages:
+                index.add_document(doc_id, doc_source, page_num, text)
+                added += 1
+
+            self._commit(index)
+
+        logger.info(f"📚 Índice BM25 atualizado para '{doc_source}': -{removed} +{added} páginas")
+        return removed, added
+
+    def update_doc_source(self, doc_source: str, pages: Iterable[Tuple[str, int, str]]) -> int:
+        """
+        Substitui as páginas de um documento no índice e persiste.
+
+        Args:
+            doc_source: Identificador do documento
+            pages: Iterável de (_id, page_num, markdown_text)
+
+        Returns:
+            Número de páginas indexadas
+        """
+        return self._replace_doc_source(doc_source, pages)[1]
+
+    def remove_doc_source(self, doc_source: str) -> int:
+        """Remove um documento do índice persistido. Retorna quantas páginas foram removidas."""
+        return self._replace_doc_source(doc_source, [])[0]
+
+    def clear(self) -> None:
+        """Esvazia o índice persistido (ex.: coleção inteira deletada)."""
+        with self._write_lock():
+            self._commit(BM25Index(k1=self.k1, b=self.b))
+        logger.info("📚 Índice BM25 esvaziado")
+
+    def rebuild_from_collection(self, collection) -> int:
+        """Reconstrói o índice inteiro a partir das páginas já armazenadas no Astra DB."""
+        index = BM25Index(k1=self.k1, b=self.b)
+        cursor = collection.find(
+            {},
+            projection={"_id": True, "doc_source": True, "page_num": True, "markdown_text": True}
+        )
+        for doc in cursor:
+            index.add_document(
+                doc.get("_id"), doc.get("doc_source"), doc.get("page_num"), doc.get("markdown_text", "")
+            )
+
+        with self._write_lock():
+            self._commit(index)
+
+        logger.info(f"📚 Índice BM25 reconstruído: {len(index)} páginas")
+        return len(index)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Combina rankings com Reciprocal Rank Fusion: score = Σ 1 / (k + posição).
+
+    Args:
+        rankings: Listas de ids ordenadas da mais para a menos relevante
+        k: Constante de suavização (60 é o valor usual da literatura)
+
+    Returns:
+        [(id, score_rrf)] em ordem decrescente
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for position, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + position)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+__all__ = [
+    'tokenize',
+    'BM25Index',
+    'LexicalIndexStore',
+    'reciprocal_rank_fusion'
+]
@@ -0,0 +1,168 @@
+"""
+Montagem de prompts com orçamento de tokens.
+
+Usa o `token_count` gravado pelo indexer (texto + imagem) para decidir quais
+páginas, quanto texto e quais imagens cabem num orçamento alvo, tornando o
+tamanho do prompt (e a latência) previsível.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PackedPage:
+    """Página selecionada para o prompt, com o texto já ajustado ao orçamento."""
+    page: Dict[str, Any]
+    text: str
+    include_image: bool
+    text_tokens: int
+    image_tokens: int
+    truncated: bool = False
+
+    @property
+    def tokens(self) -> int:
+        return self.text_tokens + (self.image_tokens if self.include_image else 0)
+
+
+class PromptPacker:
+    """
+    Seleciona conteúdo dentro de um orçamento de tokens.
+
+    Estimativas seguem as mesmas regras do indexer: tokens de texto =
+    caracteres / token_chars_ratio; tokens de imagem = token_count armazenado
+    menos a parte de texto (ou `default_image_tokens` quando não há contagem).
+    """
+
+    def __init__(
+        self,
+        token_chars_ratio: int = 4,
+        default_image_tokens: int = 1500,
+        min_text_tokens: int = 200,
+        truncation_marker: str = "\n[...]"
+    ):
+        self.token_chars_ratio = max(1, token_chars_ratio)
+        self.default_image_tokens = default_image_tokens
+        self.min_text_tokens = min_text_tokens
+        self.truncation_marker = truncation_marker
+
+    def estimate_text_tokens(self, text: str) -> int:
+        """Estimativa de tokens de um texto."""
+        return len(text or "") // self.token_chars_ratio
+
+    def estimate_image_tokens(self, page: Dict[str, Any]) -> int:
+        """Tokens da imagem da página, derivados do token_count do indexer."""
+        stored = page.get("token_count")
+        if isinstance(stored, (int, float)) and stored > 0:
+            text_tokens = self.estimate_text_tokens(page.get("markdown_text", ""))
+            image_tokens = int(stored) - text_tokens
+            if image_tokens > 0:
+                return image_tokens
+        return self.default_image_tokens
+
+    def truncate_text(self, text: str, max_tokens: int) -> str:
+        """Corta o texto para caber em max_tokens (em fronteira de linha quando possível)."""
+        max_chars = max(0, max_tokens * self.token_chars_ratio - len(self.truncation_marker))
+        if len(text) <= max_chars:
+            return text
+        cut = text[:max_chars]
+        newline = cut.rfind("\n")
+        if newline > max_chars * 0.8:
+            cut = cut[:newline]
+        return cut + self.truncation_marker
+
+    def pack_pages(
+        self,
+        pages: List[Dict[str, Any]],
+        budget_tokens: int,
+        include_images: bool = True,
+        reserved_tokens: int = 0
+    ) -> List[PackedPage]:
+        """
+        Escolhe páginas (na ordem recebida, a mais relevante primeiro) até o orçamento.
+
+        Para cada página tenta, nesta ordem: texto completo + imagem, texto
+        completo sem imagem, texto truncado. A primeira página sempre entra
+        (truncada se necessário) para que o prompt nunca fique vazio.
+        """
+        remaining = max(0, budget_tokens - reserved_tokens)
+        packed: List[PackedPage] = []
+
+        for page in pages:
+            text = page.get("markdown_text", "") or ""
+            text_tokens = self.estimate_text_tokens(text)
+            image_tokens = self.estimate_image_tokens(page) if include_images and page.get("file_path") else 0
+
+            if image_tokens and text_tokens + image_tokens <= remaining:
+                entry = PackedPage(page, text, True, text_tokens, image_tokens)
+            elif text_tokens <= remaining:
+                entry = PackedPage(page, text, False, text_tokens, image_tokens)
+            elif remaining >= self.min_text_tokens or not packed:
+                allowed = max(remaining, self.min_text_tokens)
+                truncated = self.truncate_text(text, allowed)
+                entry = PackedPage(page, truncated, False, self.estimate_text_tokens(truncated),
+                                   image_tokens, truncated=True)
+            else:
+                break
+
+            packed.append(entry)
+            remaining -= entry.tokens
+            if remaining <= 0:
+                break
+
+        dropped = len(pages) - len(packed)
+        if dropped or any(p.truncated or (p.image_tokens and not p.include_image) for p in packed):
+            logger.debug(
+                f"[BUDGET] {len(packed)}/{len(pages)} páginas no orçamento de {budget_tokens} tokens "
+                f"(imagens: {sum(1 for p in packed if p.include_image)}, "
+                f"truncadas: {sum(1 for p in packed if p.truncated)})"
+            )
+        return packed
+
+    def pack_texts(self, texts: List[str], budget_tokens: int) -> List[str]:
+        """
+        Distribui o orçamento entre textos (em ordem de prioridade).
+
+        Textos que não cabem inteiros são truncados para a parte justa do
+        orçamento restante, garantindo espaço para os seguintes.
+        """
+        remaining = max(0, budget_tokens)
+        result: List[str] = []
+        for i, text in enumerate(texts):
+            fair_share = remaining // max(1, len(texts) - i)
+            tokens = self.estimate_text_tokens(text)
+            if tokens <= fair_share:
+                result.append(text)
+                remaining -= tokens
+            else:
+                truncated = self.truncate_text(text, max(fair_share, self.min_text_tokens))
+                result.append(truncated)
+                remaining -= self.estimate_text_tokens(truncated)
+        return result
+
+
+def resolve_budget(use_budget: int, model: Optional[str], model_limits: Dict[str, int],
+                   output_tokens: int = 0) -> int:
+    """
+    Orçamento efetivo de entrada: o orçamento do uso, limitado pelo contexto do modelo.
+
+    Args:
+        use_budget: Orçamento configurado para o uso (resposta, relevância, síntese)
+        model: Nome do modelo
+        model_limits: Janela de contexto por prefixo de modelo (chave 'DEFAULT' como fallback)
+        output_tokens: Tokens reservados para a saída
+    """
+    limit = model_limits.get('DEFAULT', use_budget + output_tokens)
+    if model:
+        # Prefixo mais longo primeiro (ex.: 'gpt-4.1-mini' antes de 'gpt-4.1')
+        for prefix in sorted(model_limits, key=len, reverse=True):
+            if prefix != 'DEFAULT' and model.startswith(prefix):
+                limit = model_limits[prefix]
+                break
+    return max(0, min(use_budget, limit - output_tokens))
+
+
+__all__ = ['PackedPage', 'PromptPacker', 'resolve_budget']
@@ -0,0 +1,56 @@
+"""
+Layout de prompts para o cache de prefixo do provedor.
+
+O cache automático de prompts da OpenAI reaproveita o maior prefixo idêntico
+entre chamadas (a partir de ~1024 tokens). Para que isso aconteça, o conteúdo
+estável vem primeiro e o variável por último, sempre na mesma ordem:
+
+    1. instruções estáticas (mensagem de sistema, nunca interpoladas)
+    2. contexto reutilizável (páginas, documento; texto e imagens)
+    3. parte variável (pergunta, foco, histórico)
+
+Os tokens reaproveitados (`usage.prompt_tokens_details.cached_tokens`) são
+contabilizados pelo `usage_ledger` por etapa; a taxa de aproveitamento por
+ponto de chamada está em `usage_ledger.prompt_cache()`.
+"""
+
+import logging
+from typing import Any, Dict, List, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+ContentPart = Dict[str, Any]
+Context = Union[str, Sequence[ContentPart], None]
+
+
+def build_cached_messages(
+    instructions: str,
+    context: Context = None,
+    query: str = ""
+) -> List[Dict[str, Any]]:
+    """
+    Monta as mensagens na ordem instruções -> contexto -> parte variável.
+
+    Args:
+        instructions: Instruções estáticas (idênticas entre chamadas)
+        context: Contexto reutilizável; texto ou partes de conteúdo (texto/imagem)
+        query: Parte variável, sempre no final do prompt
+
+    Returns:
+        Lista de mensagens no formato da API de chat
+    """
+    messages: List[Dict[str, Any]] = [{"role": "system", "content": instructions}]
+
+    if context is None or isinstance(context, str):
+        text = "\n\n".join(part for part in (context, query) if part)
+        messages.append({"role": "user", "content": text})
+        return messages
+
+    parts: List[ContentPart] = list(context)
+    if query:
+        parts.append({"type": "text", "text": query})
+    messages.append({"role": "user", "content": parts})
+    return messages
+
+
+__all__ = ['build_cached_messages']
@@ -0,0 +1,162 @@
+"""
+Gate de verificação de relevância por score de similaridade.
+
+A verificação por LLM só é útil na faixa incerta: acima de `upper_bound` a
+resposta está quase sempre no contexto (aceita sem LLM) e abaixo de
+`lower_bound` quase nunca está (rejeita sem LLM). Os limites são calibrados
+offline a partir de um conjunto rotulado (ver calibrate_thresholds e
+scripts/calibrate_relevance_gate.py).
+"""
+
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACCEPT = "accept"
+REJECT = "reject"
+VERIFY = "verify"
+
+
+class RelevanceGate:
+    """
+    Decide se a verificação de relevância precisa do LLM.
+
+    Args:
+        lower_bound: Abaixo deste score o contexto é rejeitado sem LLM
+        upper_bound: Acima deste score o contexto é aceito sem LLM
+        enabled: Se desabilitado, toda verificação usa o LLM
+        shadow_rate: Fração das decisões sem LLM que ainda chamam o LLM para
+            medir a concordância (0 desliga)
+    """
+
+    def __init__(
+        self,
+        lower_bound: float = 0.0,
+        upper_bound: float = 1.0,
+        enabled: bool = True,
+        shadow_rate: float = 0.0
+    ):
+        if lower_bound > upper_bound:
+            raise ValueError("lower_bound deve ser menor ou igual a upper_bound")
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+        self.enabled = enabled
+        self.shadow_rate = max(0.0, min(1.0, shadow_rate))
+        self._lock = threading.Lock()
+        self._counts = {ACCEPT: 0, REJECT: 0, VERIFY: 0}
+        self._shadow_checks = 0
+        self._shadow_agreements = 0
+
+    def decide(self, top_score: Optional[float]) -> str:
+        """Retorna ACCEPT, REJECT ou VERIFY para o maior score do contexto."""
+        if not self.enabled or top_score is None:
+            decision = VERIFY
+        elif top_score > self.upper_bound:
+            decision = ACCEPT
+        elif top_score < self.lower_bound:
+            decision = REJECT
+        else:
+            decision = VERIFY
+
+        with self._lock:
+            self._counts[decision] += 1
+        return decision
+
+    def should_shadow(self, decision: str) -> bool:
+        """Indica se uma decisão sem LLM deve ser conferida pelo LLM (amostragem)."""
+        return decision != VERIFY and self.shadow_rate > 0 and random.random() < self.shadow_rate
+
+    def record_shadow(self, decision: str, llm_relevant: bool) -> None:
+        """Registra se o LLM concordou com a decisão do gate."""
+        agreed = (decision == ACCEPT) == llm_relevant
+        with self._lock:
+            self._shadow_checks += 1
+            self._shadow_agreements += int(agreed)
+        if not agreed:
+            logger.info(f"[RELEVANCE] Gate discordou do LLM (decisão: {decision}, LLM: {llm_relevant})")
+
+    def stats(self) -> Dict[str, Any]:
+        """Taxas de skip (decisões sem LLM) e de concordância com o LLM."""
+        with self._lock:
+            total = sum(self._counts.values())
+            skipped = self._counts[ACCEPT] + self._counts[REJECT]
+            return {
+                "enabled": self.enabled,
+                "lower_bound": self.lower_bound,
+                "upper_bound": self.upper_bound,
+                "decisions": total,
+                "accepted_without_llm": self._counts[ACCEPT],
+                "rejected_without_llm": self._counts[REJECT],
+                "llm_verifications": self._counts[VERIFY],
+                "skip_rate": skipped / total if total else 0.0,
+                "shadow_checks": self._shadow_checks,
+                "shadow_agreements": self._shadow_agreements,
+                "agree_rate": self._shadow_agreements / self._shadow_checks if self._shadow_checks else None,
+            }
+
+
+def calibrate_thresholds(
+    samples: Iterable[Tuple[float, bool]],
+    target_precision: float = 0.98,
+    target_npv: float = 0.98,
+    min_support: int = 10
+) -> Dict[str, Any]:
+    """
+    Deriva os limites do gate a partir de pares (score, relevante) rotulados.
+
+    - upper_bound: menor score tal que, entre as amostras acima dele, a fração
+      de relevantes é >= target_precision
+    - lower_bound: maior score tal que, entre as amostras abaixo dele, a fração
+      de irrelevantes é >= target_npv
+
+    Cada lado exige ao menos `min_support` amostras; sem suporte suficiente o
+    limite fica no extremo (1.0 / 0.0), ou seja, o gate não pula nada.
+
+    Returns:
+        Dict com lower_bound, upper_bound e as taxas esperadas no conjunto
+    """
+    ordered: List[Tuple[float, bool]] = sorted((float(s), bool(l)) for s, l in samples)
+    n = len(ordered)
+    upper_bound, lower_bound = 1.0, 0.0
+    accept_count = reject_count = 0
+
+    # Acima do limite: varre do maior para o menor score acumulando precisão
+    positives = 0
+    for i in range(n - 1, -1, -1):
+        positives += ordered[i][1]
+        count = n - i
+        if count >= min_support and positives / count >= target_precision:
+            # O gate aceita scores estritamente maiores que o limite
+            upper_bound = ordered[i - 1][0] if i > 0 else ordered[i][0] - 1e-6
+            accept_count = count
+
+    # Abaixo do limite: varre do menor para o maior score acumulando NPV
+    negatives = 0
+    for i in range(n):
+        negatives += not ordered[i][1]
+        count = i + 1
+        if count >= min_support and negatives / count >= target_npv:
+            lower_bound = ordered[i + 1][0] if i + 1 < n else ordered[i][0] + 1e-6
+            reject_count = count
+
+    if lower_bound > upper_bound:
+        # Faixas sobrepostas: conjunto pequeno ou pouco separável; mantém só a aceitação
+        lower_bound = 0.0
+        reject_count = 0
+
+    # Sem arredondar: cada limite é o score de uma amostra de fronteira, e
+    # arredondá-lo a moveria para dentro da faixa aceita/rejeitada
+    return {
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "samples": n,
+        "expected_skip_rate": (accept_count + reject_count) / n if n else 0.0,
+        "expected_accept_rate": accept_count / n if n else 0.0,
+        "expected_reject_rate": reject_count / n if n else 0.0,
+    }
+
+
+__all__ = ['RelevanceGate', 'calibrate_thresholds', 'ACCEPT', 'REJECT', 'VERIFY']
@@ -3,24 +3,45 @@
 import os
 import re
 import base64
+import hashlib
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterator
 from dotenv import load_dotenv
 
 import voyageai
 from openai import OpenAI
-from PIL import Image
 from astrapy import DataAPIClient
 
 # Importa utilitários
 from ..utils.metrics import ProcessingMetrics, measure_time
 from ..utils.validation import validate_embedding
+from ..utils.vectors import Embedding, to_float32, to_list
 from ..utils.cache import SimpleCache
+from ..utils.tiered_cache import create_cache, get_index_generation
+from ..utils.image_cache import ImageCache
+from ..utils.embedding_store import PersistentEmbeddingCache, normalize_query
+from ..utils.single_flight import SingleFlight, make_flight_key
+from ..utils.tracing import traced, bind_context
+from ..utils.llm_usage import instrument_openai, instrument_voyage, usage_ledger
+from ..utils.prometheus import (
+    registry, pipeline_stage_duration, track_dependency, cache_collector, register_flight_stats,
+    relevance_gate_collector
+)
 from .config import SystemConfig
-from .constants import COMPLEXITY_PATTERNS, DYNAMIC_MAX_CANDIDATES
+from .constants import COMPLEXITY_PATTERNS, DYNAMIC_MAX_CANDIDATES, MODEL_CONTEXT_LIMITS
+from .lexical_index import LexicalIndexStore, reciprocal_rank_fusion
+from .session_store import SessionStore, ConversationSession, DEFAULT_SESSION_ID
+from .extraction import MapReduceExtractor
+from .prompt_budget import PromptPacker, resolve_budget
+from .search_filters import SearchFilters, to_astra_filter
+from .relevance_gate import RelevanceGate, ACCEPT, VERIFY
+from .diversity import mmr_select, NUMPY_AVAILABLE
+from .speculation import SpeculativeQuery, SpeculationStats
+from .prompt_layout import build_cached_messages
 
 # Importa configurações enhanced para complexidade (fallback)
 try:
@@ -35,6 +56,70 @@ except ImportError:
 # Configuração centralizada
 system_config = SystemConfig()
 
+# Cache de imagens em base64 compartilhado pelo processo (limitado por bytes)
+image_cache = ImageCache(
+    max_bytes=system_config.rag.image_cache_max_bytes,
+    use_encoded_sidecar=system_config.rag.image_cache_use_encoded
+)
+
+# Índice BM25 construído pelo indexer (recarregado quando o arquivo muda)
+lexical_index = LexicalIndexStore(
+    system_config.rag.bm25_index_path,
+    k1=system_config.rag.bm25_k1,
+    b=system_config.rag.bm25_b
+)
+
+# Montagem de prompts com orçamento de tokens (usa token_count do indexer)
+prompt_packer = PromptPacker(
+    token_chars_ratio=system_config.processing.token_chars_ratio,
+    default_image_tokens=system_config.rag.default_image_tokens,
+    min_text_tokens=system_config.rag.min_text_tokens
+)
+
+# Gate de relevância: LLM só na faixa incerta de similaridade
+relevance_gate = RelevanceGate(
+    lower_bound=system_config.rag.relevance_lower_bound,
+    upper_bound=system_config.rag.relevance_upper_bound,
+    enabled=system_config.rag.relevance_gate_enabled,
+    shadow_rate=system_config.rag.relevance_shadow_rate
+)
+
+# Instruções estáticas (prefixo estável para o cache de prompts do provedor)
+RELEVANCE_INSTRUCTIONS = (
+    "Você verifica se um conteúdo responde a uma pergunta. Analise as páginas "
+    "fornecidas e diga se contêm resposta factual para a pergunta ao final. "
+    "Responda apenas 'Sim' ou 'Não'."
+)
+
+ANSWER_INSTRUCTIONS = (
+    "Assistente especializado em documentos acadêmicos.\n"
+    "Use APENAS as páginas fornecidas (texto e imagens) para responder à pergunta ao final.\n"
+    "Instruções: resposta clara e direta. Integre informações de páginas diferentes "
+    "quando houver mais de uma. Cite as fontes (documento e página).\n"
+    "NÃO use formatação Markdown como **, _, #. Escreva texto corrido."
+)
+
+
+def _page_order(packed_page) -> Tuple[str, int]:
+    """Ordem estável das páginas no prompt (documento, página), independente do score"""
+    page = packed_page.page
+    return (page.get("doc_source") or page.get("file_path", ""), page.get("page_num", 0))
+
+# Executor para rodar buscas no Astra DB em paralelo com a busca BM25 local
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-search")
+
+# Executor separado para busca em lote (evita esperar no mesmo pool que a busca híbrida usa)
+_batch_executor = ThreadPoolExecutor(
+    max_workers=system_config.rag.batch_search_concurrency,
+    thread_name_prefix="rag-batch"
+)
+
+# Executor dedicado ao trabalho especulativo (a busca híbrida aninha tarefas no _search_executor)
+_speculation_executor = ThreadPoolExecutor(
+    max_workers=system_config.rag.speculation_workers,
+    thread_name_prefix="rag-speculative"
+)
+
 # Usar multiagent logger para integração completa
 try:
     sys.path.append(str(Path(__file__).parent.parent.parent / "multi-agent-researcher" / "src"))
@@ -86,16 +171,33 @@ def determine_query_complexity(query: str) -> str:
     else:
         return 'VERY_COMPLEX'
 
-def get_dynamic_max_candidates(query: str) -> int:
+def get_dynamic_max_candidates(query: str, filters: Optional[SearchFilters] = None) -> int:
     """
     Obtém número máximo de candidatos baseado na complexidade da query.
     
     Args:
         query: Query do usuário
+        filters: Escopo da busca; com doc_sources explícitos o limite é
+            reduzido para poucos candidatos por documento
         
     Returns:
         int: Número de candidatos para buscar
     """
+    max_candidates = _complexity_max_candidates(query)
+    
+    if filters and filters.include_sources:
+        scoped_limit = max(
+            DYNAMIC_MAX_CANDIDATES['MINIMUM'],
+            system_config.rag.scoped_candidates_per_source * len(filters.include_sources)
+        )
+        if scoped_limit < max_candidates:
+            logger.info(f"[DYNAMIC_CANDIDATES] Busca restrita a {len(filters.include_sources)} documento(s) "
+                        f"→ {scoped_limit} candidatos")
+            return scoped_limit
+    return max_candidates
+
+def _complexity_max_candidates(query: str) -> int:
+    """Número de candidatos pela complexidade da query (enhanced config ou constantes)"""
     complexity = determine_query_complexity(query)
     
     if ENHANCED_CONFIG_AVAILABLE:
@@ -122,7 +224,15 @@ class ProductionQueryTransformer:
     
     def __init__(self, openai_client: OpenAI):
         self.openai_client = openai_client
-        self.transformation_cache = {}  # Cache para transformações comuns
+        # Cache limitado (LRU + TTL) de transformações: chave = mensagem normalizada + hash do contexto
+        self.transformation_cache = create_cache(
+            "transform",
+            max_size=system_config.rag.transform_cache_size,
+            default_ttl=system_config.rag.transform_cache_ttl
+        )
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._llm_calls = 0
         self._init_patterns()
     
     def _init_patterns(self):
@@ -181,18 +291,20 @@ class ProductionQueryTransformer:
             
             # Cache para transformações já feitas
             cache_key = self._create_cache_key(last_message, chat_history)
-            if cache_key in self.transformation_cache:
-                cached_result = self.transformation_cache[cache_key]
+            cached_result = self.transformation_cache.get(cache_key)
+            if cached_result is not None:
+                self._cache_hits += 1
                 logger.info(f"[TRANSFORM] 💾 Cache hit: '{cached_result[:50]}...'")
                 return cached_result
             
+            self._cache_misses += 1
             logger.debug(f"[TRANSFORM] Cache miss, processando...")
             
             # 1. Verificações determinísticas (sem LLM)
             logger.debug(f"[TRANSFORM] Tentando classificação determinística...")
             deterministic_result = self._deterministic_classification(last_message, chat_history)
             if deterministic_result != "NEEDS_LLM":
-                self.transformation_cache[cache_key] = deterministic_result
+                self.transformation_cache.set(cache_key, deterministic_result)
                 transform_time = time.time() - transform_start
                 logger.info(f"[TRANSFORM] ✅ Determinística em {transform_time:.2f}s: '{deterministic_result[:50]}...'")
                 return deterministic_result
@@ -200,10 +312,11 @@ class ProductionQueryTransformer:
             # 2. Transformação com LLM (apenas quando necessário)
             logger.info(f"[TRANSFORM] 🤖 Usando LLM para transformação complexa...")
             llm_start = time.time()
+            self._llm_calls += 1
             llm_result = self._llm_transformation(last_message, chat_history)
             llm_time = time.time() - llm_start
             
-            self.transformation_cache[cache_key] = llm_result
+            self.transformation_cache.set(cache_key, llm_result)
             
             total_time = time.time() - transform_start
             logger.info(f"[TRANSFORM] ✅ LLM em {llm_time:.2f}s (total: {total_time:.2f}s): '{llm_result[:50]}...'")
@@ -321,12 +434,13 @@ MENSAGEM: {message}
 
 RESPONDA APENAS COM A PERGUNTA TRANSFORMADA:"""
 
-            response = self.openai_client.chat.completions.create(
-                model=system_config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=system_config.rag.max_tokens_query_transform,
-                temperature=system_config.rag.temperature
-            )
+            with track_dependency("openai", "transform_query"):
+                response = self.openai_client.chat.completions.create(
+                    model=system_config.rag.llm_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=system_config.rag.max_tokens_query_transform,
+                    temperature=system_config.rag.temperature
+                )
             
             transformed = response.choices[0].message.content.strip()
             
@@ -375,18 +489,20 @@ RESPONDA APENAS COM A PERGUNTA TRANSFORMADA:"""
             return f"Sobre o documento Zep: {message}"
     
     def _create_cache_key(self, message: str, chat_history: List[Dict[str, str]]) -> str:
-        """Cria chave de cache baseada na mensagem e contexto"""
-        # Contexto simplificado para cache
-        recent_topics = []
-        for msg in chat_history[-3:]:
-            content = msg.get('content', '').lower()
-            if 'zep' in content:
-                recent_topics.append('zep')
-            if 'graphiti' in content:
-                recent_topics.append('graphiti')
-        
-        context_key = '+'.join(set(recent_topics))
-        return f"{message.lower()[:50]}||{context_key}"
+        """
+        Cria chave de cache: mensagem completa normalizada + hash do contexto.
+        
+        O contexto inclui exatamente o que influencia a transformação: as
+        mensagens que o LLM recebe (_build_minimal_context) e o sinal de
+        contexto de documento usado pela classificação determinística.
+        """
+        normalized_message = normalize_query(message).lower()
+        context = (
+            f"{self._build_minimal_context(chat_history[-4:-1])}\x00"
+            f"{self._has_document_context(chat_history)}"
+        )
+        context_hash = hashlib.sha1(context.encode("utf-8")).hexdigest()[:16]
+        return f"{normalized_message}||{context_hash}"
     
     def _get_last_user_message(self, chat_history: List[Dict[str, str]]) -> str:
         """Pega última mensagem do usuário"""
@@ -395,6 +511,15 @@ RESPONDA APENAS COM A PERGUNTA TRANSFORMADA:"""
                 return msg.get("content", "")
         return ""
     
+    def will_use_llm(self, chat_history: List[Dict[str, str]]) -> bool:
+        """Indica se transform_query fará uma chamada LLM (sem cache nem regra determinística)"""
+        last_message = self._get_last_user_message(chat_history)
+        if not last_message:
+            return False
+        if self._create_cache_key(last_message, chat_history) in self.transformation_cache:
+            return False
+        return self._deterministic_classification(last_message, chat_history) == "NEEDS_LLM"
+    
     def needs_rag(self, transformed_query: str) -> bool:
         """Verifica se precisa fazer RAG"""
         return "not applicable" not in transformed_query.lower()
@@ -403,12 +528,16 @@ RESPONDA APENAS COM A PERGUNTA TRANSFORMADA:"""
         """Limpa query final"""
         return transformed_query.strip()
     
-    def get_cache_stats(self) -> Dict[str, int]:
+    def get_cache_stats(self) -> Dict[str, Any]:
         """Estatísticas do cache para monitoramento"""
+        lookups = self._cache_hits + self._cache_misses
         return {
             "cache_size": len(self.transformation_cache),
-            "cache_hits": getattr(self, '_cache_hits', 0),
-            "llm_calls": getattr(self, '_llm_calls', 0)
+            "cache_max_size": self.transformation_cache.max_size,
+            "cache_hits": self._cache_hits,
+            "cache_misses": self._cache_misses,
+            "hit_rate": self._cache_hits / lookups if lookups else 0.0,
+            "llm_calls": self._llm_calls
         }
 
 class ProductionConversationalRAG:
@@ -428,10 +557,31 @@ class ProductionConversationalRAG:
             max_size=system_config.rag.embedding_cache_size, 
             default_ttl=system_config.rag.embedding_cache_ttl
         )
-        self.response_cache = SimpleCache(
+        self.response_cache = create_cache(
+            "response",
             max_size=system_config.rag.response_cache_size, 
             default_ttl=system_config.rag.response_cache_ttl
         )
+        
+        # Cache persistente de embeddings compartilhado entre workers (SQLite WAL)
+        self.embedding_store: Optional[PersistentEmbeddingCache] = None
+        if system_config.rag.embedding_store_enabled:
+            try:
+                self.embedding_store = PersistentEmbeddingCache(
+                    system_config.rag.embedding_store_path,
+                    model=system_config.rag.embedding_model,
+                    flush_batch_size=system_config.rag.embedding_store_flush_batch,
+                    flush_interval=system_config.rag.embedding_store_flush_interval
+                )
+                snapshot = self.embedding_store.load_snapshot(
+                    min(system_config.rag.embedding_store_snapshot_size, system_config.rag.embedding_cache_size)
+                )
+                for normalized_query, embedding in snapshot:
+                    self.embedding_cache.set(self.embedding_cache._create_key(normalized_query), embedding)
+                logger.info(f"💾 Snapshot de embeddings carregado: {len(snapshot)} queries")
+            except Exception as e:
+                logger.warning(f"⚠️ Cache persistente de embeddings indisponível: {e}")
+                self.embedding_store = None
 
         # Validação de ambiente
         required_vars = [
@@ -448,14 +598,43 @@ class ProductionConversationalRAG:
 
         # Inicialização dos clientes
         voyageai.api_key = system_config.rag.voyage_api_key
-        self.voyage_client = voyageai.Client()
-        self.openai_client = OpenAI()
+        # Clientes instrumentados: tokens e custo por etapa (llm_usage)
+        self.voyage_client = instrument_voyage(voyageai.Client())
+        self.openai_client = instrument_openai(OpenAI())
         
         # Transformador otimizado
         self.query_transformer = ProductionQueryTransformer(self.openai_client)
         
-        # Histórico da conversa
-        self.chat_history: List[Dict[str, str]] = []
+        # Histórico da conversa por sessão (isolado entre clientes)
+        self.sessions = SessionStore(
+            max_sessions=system_config.rag.max_sessions,
+            idle_ttl=system_config.rag.session_idle_ttl,
+            max_history=system_config.rag.max_chat_history,
+            trim_to=system_config.rag.history_trim_to,
+            max_message_chars=system_config.rag.max_message_chars,
+            max_total_bytes=system_config.rag.session_max_total_bytes
+        )
+
+        # Embedding/busca especulativos durante a transformação por LLM
+        self.speculation_stats = SpeculationStats()
+        
+        # Perguntas idênticas concorrentes compartilham uma única execução do pipeline
+        self.answer_flight = SingleFlight(
+            "search_and_answer",
+            wait_timeout=system_config.rag.single_flight_timeout,
+            enabled=system_config.rag.single_flight_enabled
+        )
+
+        # Taxas de acerto de cache e execuções em andamento no /metrics
+        registry.register_collector("rag_caches", cache_collector(lambda: {
+            "embedding": self.embedding_cache.stats(),
+            "embedding_store": self.embedding_store.stats() if self.embedding_store else None,
+            "transform": self._transform_cache_stats(),
+            "response": self.response_cache.stats(),
+            "image": image_cache.stats(),
+        }))
+        register_flight_stats("search_and_answer", self.answer_flight.stats)
+        registry.register_collector("relevance_gate", relevance_gate_collector(relevance_gate.stats))
 
         # Conexão com Astra DB
         self._initialize_database()
@@ -465,6 +644,11 @@ class ProductionConversationalRAG:
         else:
             logger.info("Sistema RAG inicializado com sucesso")
 
+    def _transform_cache_stats(self) -> Dict[str, Any]:
+        """Contadores do transformador no formato esperado pelo coletor de cache"""
+        stats = self.query_transformer.get_cache_stats()
+        return {"hits": stats["cache_hits"], "misses": stats["cache_misses"], "hit_rate": stats["hit_rate"]}
+
     def _initialize_database(self):
         """Inicializa conexão com base de dados"""
         try:
@@ -495,21 +679,49 @@ class ProductionConversationalRAG:
                 logger.error(f"Falha ao conectar Astra DB: {e}")
             raise
 
-    def ask(self, user_message: str) -> str:
-        """Interface conversacional principal otimizada"""
+    @property
+    def chat_history(self) -> List[Dict[str, str]]:
+        """Histórico da sessão padrão (compatibilidade com o CLI e código legado)"""
+        return self.get_chat_history()
+
+    @traced("rag.ask")
+    def ask(self, user_message: str, session_id: Optional[str] = None,
+            filters: Optional[SearchFilters] = None) -> str:
+        """
+        Interface conversacional principal otimizada.
+        
+        Sem `session_id` o turno roda numa sessão descartável: sem histórico
+        anterior e sem disputar lock com outras requisições anônimas.
+        """
+        session = self.sessions.get(session_id) if session_id else self.sessions.ephemeral()
+        
+        # Turnos da mesma sessão são serializados; sessões distintas rodam em paralelo
+        with session.lock:
+            return self._ask_in_session(session, user_message, filters)
+
+    def _ask_in_session(self, session: ConversationSession, user_message: str,
+                        filters: Optional[SearchFilters] = None) -> str:
+        """Processa um turno de conversa dentro de uma sessão"""
         logger.info(f"[ASK] === INICIANDO PROCESSAMENTO ===")
-        logger.info(f"[ASK] Pergunta do usuário: {user_message}")
+        logger.info(f"[ASK] Sessão: {session.session_id} | Pergunta do usuário: {user_message}")
+        
+        # Métricas por turno (não compartilhadas entre requisições concorrentes)
+        metrics = ProcessingMetrics()
         
         try:
             # Adiciona mensagem do usuário ao histórico
-            self.chat_history.append({"role": "user", "content": user_message})
-            logger.debug(f"[ASK] Mensagem adicionada ao histórico. Total: {len(self.chat_history)} mensagens")
+            self.sessions.append(session, "user", user_message)
+            chat_history = session.snapshot()
+            logger.debug(f"[ASK] Mensagem adicionada ao histórico. Total: {len(chat_history)} mensagens")
+            
+            # Enquanto o LLM transforma a query, embeda (e busca) a mensagem original
+            speculation = self._start_speculation(user_message, chat_history, filters)
             
             # Transforma em query RAG com métricas
             logger.info(f"[ASK] 🔄 ETAPA 1: Transformando query com IA...")
             
-            with measure_time(self.metrics, "query_transformation"):
-                transformed_query = self.query_transformer.transform_query(self.chat_history)
+            with measure_time(metrics, "query_transformation"):
+                transformed_query = self.query_transformer.transform_query(chat_history)
             
             logger.info(f"[ASK] ✅ Query transformada: '{transformed_query}'")
             
@@ -518,8 +730,9 @@ class ProductionConversationalRAG:
             logger.info(f"[ASK] 🤔 ETAPA 2: Precisa fazer RAG? {needs_rag}")
             
             if not needs_rag:
+                self._discard_speculation(speculation)
                 logger.info(f"[ASK] 💬 Gerando resposta conversacional simples...")
-                with measure_time(self.metrics, "non_rag_response"):
+                with measure_time(metrics, "non_rag_response"):
                     response = self._generate_non_rag_response(user_message)
                 logger.info(f"[ASK] ✅ Resposta simples gerada")
             else:
@@ -528,8 +741,13 @@ class ProductionConversationalRAG:
                 logger.info(f"[ASK] 🧹 Query limpa: '{clean_query}'")
                 logger.info(f"[ASK] 🔍 ETAPA 3: Iniciando busca RAG...")
                 
-                with measure_time(self.metrics, "rag_search"):
-                    rag_result = self.search_and_answer(clean_query)
+                query_embedding, candidates = self._take_speculation(speculation, clean_query, metrics)
+                
+                with measure_time(metrics, "rag_search"):
+                    rag_result = self.search_and_answer(
+                        clean_query, filters=filters,
+                        query_embedding=query_embedding, candidates=candidates
+                    )
                 
                 if "error" in rag_result:
                     logger.warning(f"[ASK] ❌ RAG retornou erro: {rag_result['error']}")
@@ -540,18 +758,12 @@ class ProductionConversationalRAG:
                     logger.info(f"[ASK] 📚 Fonte: {rag_result.get('selected_pages', 'N/A')}")
                     response = rag_result["answer"]
             
-            # Adiciona resposta ao histórico
-            self.chat_history.append({"role": "assistant", "content": response})
+            # Adiciona resposta ao histórico (limites aplicados pelo SessionStore)
+            self.sessions.append(session, "assistant", response)
             logger.debug(f"[ASK] Resposta adicionada ao histórico")
             
-            # Limita histórico para controle de memória
-            if len(self.chat_history) > 20:
-                old_len = len(self.chat_history)
-                self.chat_history = self.chat_history[-16:]
-                logger.debug(f"[ASK] Histórico limitado: {old_len} -> {len(self.chat_history)} mensagens")
-            
             # Log de métricas
-            self.metrics.log_summary()
+            metrics.log_summary()
             logger.info(f"[ASK] ✅ === PROCESSAMENTO COMPLETO ===")
             
             return response
@@ -560,6 +772,58 @@ class ProductionConversationalRAG:
             logger.error(f"[ASK] ❌ Erro no processamento: {e}", exc_info=True)
             return "Desculpe, ocorreu um erro interno. Tente novamente."
 
+    def _start_speculation(self, user_message: str, chat_history: List[Dict[str, str]],
+                           filters: Optional[SearchFilters] = None) -> Optional[SpeculativeQuery]:
+        """Inicia embedding (e busca) especulativos se a transformação for usar o LLM"""
+        if not system_config.rag.speculation_enabled:
+            return None
+        if not self.query_transformer.will_use_llm(chat_history):
+            return None
+        
+        search_fn = None
+        if system_config.rag.speculative_search:
+            search_fn = lambda emb: self.search_candidates(
+                emb, query=user_message, include_text=False, filters=filters
+            )
+        self.speculation_stats.record("attempt")
+        logger.debug(f"[SPECULATE] Embedding especulativo iniciado: '{user_message[:50]}...'")
+        return SpeculativeQuery(_speculation_executor, user_message, self.get_query_embedding, search_fn)
+
+    def _discard_speculation(self, speculation: Optional[SpeculativeQuery]) -> None:
+        """Descarta o trabalho especulativo não aproveitado"""
+        if speculation is not None:
+            speculation.cancel()
+            self.speculation_stats.record("discarded")
+
+    def _take_speculation(self, speculation: Optional[SpeculativeQuery], final_query: str,
+                          metrics: ProcessingMetrics) -> Tuple[Optional[Embedding], Optional[List[dict]]]:
+        """
+        Reaproveita o resultado especulativo se a query final for próxima da original.
+        
+        A latência economizada é o tempo do trabalho especulativo menos o tempo
+        que ainda foi preciso esperar por ele após a transformação.
+        """
+        if speculation is None:
+            return None, None
+        
+        if not speculation.matches(final_query, system_config.rag.speculation_similarity):
+            logger.debug(f"[SPECULATE] Query transformada difere da original, descartando")
+            self._discard_speculation(speculation)
+            return None, None
+        
+        try:
+            payload, waited = speculation.result()
+        except Exception as e:
+            logger.warning(f"[SPECULATE] Trabalho especulativo falhou: {e}")
+            self.speculation_stats.record("failed")
+            return None, None
+        
+        saved = payload["duration"] - waited
+        self.speculation_stats.record("reused", saved)
+        metrics.add_step("speculation_saved", max(0.0, saved))
+        logger.info(f"[SPECULATE] ♻️ Resultado especulativo reaproveitado (~{max(0.0, saved):.2f}s economizados)")
+        return payload["embedding"], payload["candidates"]
+
     def _generate_non_rag_response(self, user_message: str) -> str:
         """Gera resposta para mensagens que não precisam de RAG"""
         greetings = ["oi", "olá", "hello", "hi", "boa tarde", "bom dia", "boa noite"]
@@ -574,30 +838,53 @@ class ProductionConversationalRAG:
         return "Como posso ajudar você com consultas sobre os documentos? Faça uma pergunta específica e eu buscarei as informações relevantes."
 
     # Métodos de RAG originais (mantidos para compatibilidade)
-    def get_query_embedding(self, query: str) -> List[float]:
-        """Gera embedding para a consulta"""
-        # Verifica cache primeiro
-        cache_key = self.embedding_cache._create_key(query)
+    def _lookup_cached_embedding(self, normalized_query: str) -> Optional[Embedding]:
+        """Busca embedding no cache do processo e, em seguida, no cache persistente"""
+        cache_key = self.embedding_cache._create_key(normalized_query)
         cached_embedding = self.embedding_cache.get(cache_key)
+        if cached_embedding is not None:
+            return cached_embedding
+        
+        if self.embedding_store is not None:
+            stored_embedding = self.embedding_store.get(normalized_query)
+            if stored_embedding is not None:
+                # Promove para o cache do processo
+                self.embedding_cache.set(cache_key, stored_embedding)
+                return stored_embedding
+        return None
+
+    def _store_embedding(self, normalized_query: str, embedding: Embedding) -> None:
+        """Armazena embedding no cache do processo e no cache persistente"""
+        self.embedding_cache.set(self.embedding_cache._create_key(normalized_query), embedding)
+        if self.embedding_store is not None:
+            self.embedding_store.put(normalized_query, embedding)
+
+    @traced("rag.embed_query")
+    def get_query_embedding(self, query: str) -> Embedding:
+        """Gera embedding para a consulta (float32 contíguo)"""
+        normalized_query = normalize_query(query)
         
+        # Verifica cache primeiro
+        cached_embedding = self._lookup_cached_embedding(normalized_query)
         if cached_embedding is not None:
             logger.debug(f"Cache hit para embedding da query: {query[:50]}...")
             return cached_embedding
         
         try:
-            res = self.voyage_client.multimodal_embed(
-                inputs=[[query]],
-                model=system_config.rag.embedding_model,
-                input_type="query"
-            )
-            embedding = res.embeddings[0]
+            with track_dependency("voyage", "embed_query"):
+                res = self.voyage_client.multimodal_embed(
+                    inputs=[[normalized_query]],
+                    model=system_config.rag.embedding_model,
+                    input_type="query"
+                )
+            embedding = to_float32(res.embeddings[0])
             
             # Valida embedding usando utils
             if not validate_embedding(embedding, 1024):
                 raise ValueError("Embedding inválido retornado pela API")
             
             # Armazena no cache
-            self.embedding_cache.set(cache_key, embedding)
+            self._store_embedding(normalized_query, embedding)
             logger.debug(f"Embedding cacheado para query: {query[:50]}...")
                 
             return embedding
@@ -605,87 +892,336 @@ class ProductionConversationalRAG:
             logger.error(f"Erro embedding consulta: {e}")
             raise
 
-    @staticmethod
-    def encode_image_to_base64(image_path: str) -> Optional[str]:
-        """Converte imagem local em base64"""
+    def get_query_embeddings(self, queries: List[str]) -> List[Embedding]:
+        """
+        Gera embeddings para várias consultas em chamadas multimodal_embed em lote.
+        
+        Consultas repetidas ou já em cache não são reenviadas à API. As demais
+        são agrupadas em blocos de `batch_embed_chunk_size` por chamada.
+        """
+        embeddings: List[Optional[Embedding]] = [None] * len(queries)
+        pending: Dict[str, List[int]] = {}
+        
+        for i, query in enumerate(queries):
+            normalized_query = normalize_query(query)
+            cached_embedding = self._lookup_cached_embedding(normalized_query)
+            if cached_embedding is not None:
+                embeddings[i] = cached_embedding
+            else:
+                pending.setdefault(normalized_query, []).append(i)
+        
+        unique_queries = list(pending.keys())
+        chunk_size = max(1, system_config.rag.batch_embed_chunk_size)
+        logger.info(f"[BATCH] Embeddings: {len(queries) - sum(len(v) for v in pending.values())} em cache, "
+                    f"{len(unique_queries)} únicos para a API em {(len(unique_queries) + chunk_size - 1) // chunk_size} chamadas")
+        
+        for start in range(0, len(unique_queries), chunk_size):
+            chunk = unique_queries[start:start + chunk_size]
+            with track_dependency("voyage", "embed_batch"):
+                res = self.voyage_client.multimodal_embed(
+                    inputs=[[query] for query in chunk],
+                    model=system_config.rag.embedding_model,
+                    input_type="query"
+                )
+            for query, embedding in zip(chunk, map(to_float32, res.embeddings)):
+                if not validate_embedding(embedding, 1024):
+                    raise ValueError(f"Embedding inválido retornado pela API para: {query[:50]}")
+                self._store_embedding(query, embedding)
+                for i in pending[query]:
+                    embeddings[i] = embedding
+        
+        return embeddings
+
+    def batch_search(self, queries: List[str], limit: int = None,
+                     include_text: bool = False,
+                     filters: Optional[SearchFilters] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Busca em lote: embeddings agrupados + buscas vetoriais concorrentes.
+        
+        Gera um resultado por consulta na ordem em que as buscas terminam
+        (o campo `index` aponta a posição original), permitindo streaming.
+        """
+        import time
+        batch_start = time.time()
+        
         try:
-            if not image_path or not os.path.exists(image_path):
-                logger.warning(f"Imagem não encontrada: {image_path}")
-                return None
-            with open(image_path, "rb") as f:
-                return base64.b64encode(f.read()).decode("utf-8")
+            embeddings = self.get_query_embeddings(queries)
         except Exception as e:
-            logger.error(f"Erro codificando {image_path}: {e}")
-            return None
+            logger.error(f"[BATCH] ❌ Embeddings em lote falharam: {e}")
+            for i, query in enumerate(queries):
+                yield {"index": i, "query": query, "error": f"Embedding falhou: {e}"}
+            return
+        
+        embedding_time = time.time() - batch_start
+        logger.info(f"[BATCH] ✅ {len(queries)} embeddings em {embedding_time:.2f}s")
+        
+        def run_search(i: int) -> Dict[str, Any]:
+            search_start = time.time()
+            candidates = self.search_candidates(
+                embeddings[i], limit=limit, query=queries[i], include_text=include_text,
+                filters=filters
+            )
+            result = {
+                "index": i,
+                "query": queries[i],
+                "total_candidates": len(candidates),
+                "candidates": [
+                    {
+                        "doc_id": c.get("doc_id"),
+                        "document": c.get("doc_source"),
+                        "page_number": c.get("page_num"),
+                        "similarity_score": c.get("similarity_score"),
+                        "image_filename": os.path.basename(c["file_path"]) if c.get("file_path") else None,
+                        **({"markdown_text": c.get("markdown_text", "")} if include_text else {})
+                    }
+                    for c in candidates
+                ],
+                "search_time": time.time() - search_start
+            }
+            return result
+        
+        futures = {_batch_executor.submit(bind_context(run_search), i): i for i in range(len(queries))}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                logger.error(f"[BATCH] ❌ Busca {i} falhou: {e}")
+                yield {"index": i, "query": queries[i], "error": str(e)}
+        
+        logger.info(f"[BATCH] 🏁 {len(queries)} consultas em {time.time() - batch_start:.2f}s")
+
+    @staticmethod
+    def encode_image_to_base64(image_path: str) -> Optional[str]:
+        """Converte imagem local em base64 (via cache LRU limitado por bytes)"""
+        return image_cache.get(image_path)
 
-    def search_candidates(self, query_embedding: List[float], limit: int = None, query: str = None) -> List[dict]:
-        """Busca candidatos no Astra DB"""
+    @staticmethod
+    async def aencode_image_to_base64(image_path: str) -> Optional[str]:
+        """Versão assíncrona: leitura de disco fora do event loop"""
+        return await image_cache.aget(image_path)
+
+    @traced("rag.search_candidates")
+    def search_candidates(self, query_embedding: Embedding, limit: int = None, query: str = None,
+                          include_text: bool = True,
+                          filters: Optional[SearchFilters] = None) -> List[dict]:
+        """
+        Busca candidatos no Astra DB (híbrida BM25 + vetorial quando há índice léxico).
+        
+        Com include_text=False a busca traz apenas ids, scores e metadados pequenos;
+        o markdown das páginas escolhidas é carregado depois com hydrate_candidates().
+        Com filters a busca fica restrita ao subconjunto (doc_source / indexed_at).
+        """
         if limit is None:
             if query:
                 # Usar MAX_CANDIDATES dinâmico baseado na complexidade
-                limit = get_dynamic_max_candidates(query)
+                limit = get_dynamic_max_candidates(query, filters)
             else:
                 # Fallback para configuração estática
                 limit = system_config.rag.max_candidates
             
         try:
-            logger.debug(f"[SEARCH] Buscando similaridade no Astra DB com limite de {limit}...")
+            if query and system_config.rag.hybrid_search_enabled and lexical_index.is_available():
+                return self._hybrid_search_candidates(query_embedding, query, limit, include_text, filters)
             
-            cursor = self.collection.find(
-                {},
-                sort={"$vector": query_embedding},
-                limit=limit,
-                include_similarity=True,
-                projection={
-                    "file_path": True,
-                    "page_num": True,
-                    "doc_source": True,
-                    "markdown_text": True,
-                    "_id": True
-                }
+            candidates = self._vector_search_candidates(
+                query_embedding, limit, filter=to_astra_filter(filters), include_text=include_text
             )
-            
-            candidates = []
-            for doc in cursor:
-                candidates.append({
-                    "file_path": doc.get("file_path"),
-                    "page_num": doc.get("page_num"),
-                    "doc_source": doc.get("doc_source"),
-                    "markdown_text": doc.get("markdown_text", ""),
-                    "similarity_score": doc.get("$similarity", 0.0),
-                })
-            
-            logger.info(f"[SEARCH] Busca retornou {len(candidates)} candidatos")
+            scope = f" (escopo: {filters.to_dict()})" if filters else ""
+            logger.info(f"[SEARCH] Busca retornou {len(candidates)} candidatos{scope}")
             return candidates
         except Exception as e:
             logger.error(f"Erro busca Astra DB: {e}")
             return []
 
+    def _vector_search_candidates(self, query_embedding: Embedding, limit: int,
+                                  filter: Optional[Dict[str, Any]] = None,
+                                  include_text: bool = True) -> List[dict]:
+        """Busca por similaridade vetorial no Astra DB"""
+        logger.debug(f"[SEARCH] Buscando similaridade no Astra DB com limite de {limit}...")
+        
+        projection = {
+            "file_path": True,
+            "page_num": True,
+            "doc_source": True,
+            "token_count": True,
+            "_id": True
+        }
+        if include_text:
+            projection["markdown_text"] = True
+        
+        # O cursor é preguiçoso: a iteração faz parte da chamada ao Astra DB
+        with track_dependency("astra", "vector_search"):
+            docs = list(self.collection.find(
+                filter or {},
+                sort={"$vector": to_list(query_embedding)},
+                limit=limit,
+                include_similarity=True,
+                projection=projection
+            ))
+        
+        candidates = []
+        for doc in docs:
+            candidate = {
+                "doc_id": doc.get("_id"),
+                "file_path": doc.get("file_path"),
+                "page_num": doc.get("page_num"),
+                "doc_source": doc.get("doc_source"),
+                "token_count": doc.get("token_count"),
+                "similarity_score": doc.get("$similarity", 0.0),
+            }
+            if include_text:
+                candidate["markdown_text"] = doc.get("markdown_text", "")
+            candidates.append(candidate)
+        return candidates
+
+    @traced("rag.hydrate_candidates")
+    def hydrate_candidates(self, candidates: List[dict]) -> List[dict]:
+        """
+        Segunda fase da busca: carrega o markdown apenas das páginas informadas.
+        
+        Candidatos que já têm texto não são buscados novamente. A lista é
+        atualizada no lugar e também retornada.
+        """
+        missing = [c for c in candidates if "markdown_text" not in c and c.get("doc_id") is not None]
+        if not missing:
+            return candidates
+        
+        try:
+            with track_dependency("astra", "hydrate"):
+                cursor = self.collection.find(
+                    {"_id": {"$in": [c["doc_id"] for c in missing]}},
+                    projection={"_id": True, "markdown_text": True}
+                )
+                texts = {doc.get("_id"): doc.get("markdown_text", "") for doc in cursor}
+            logger.debug(f"[SEARCH] Hidratadas {len(texts)}/{len(missing)} páginas")
+        except Exception as e:
+            logger.error(f"Erro ao carregar texto das páginas: {e}")
+            texts = {}
+        
+        for c in missing:
+            c["markdown_text"] = texts.get(c["doc_id"], "")
+        return candidates
+
+    def _hybrid_search_candidates(self, query_embedding: Embedding, query: str, limit: int,
+                                  include_text: bool = True,
+                                  filters: Optional[SearchFilters] = None) -> List[dict]:
+        """
+        Busca híbrida: vetorial (Astra DB) em paralelo com BM25 (índice local),
+        combinadas por Reciprocal Rank Fusion.
+        
+        O filtro de doc_source é aplicado também no BM25; a faixa de indexed_at
+        é garantida ao buscar no Astra as páginas encontradas só pelo BM25.
+        """
+        vector_future = _search_executor.submit(
+            bind_context(self._vector_search_candidates), query_embedding, limit,
+            filter=to_astra_filter(filters), include_text=include_text
+        )
+        lexical_hits = lexical_index.search(
+            query, top_k=limit, doc_filter=filters.matches_source if filters else None
+        )
+        vector_candidates = vector_future.result()
+        
+        by_id = {c["doc_id"]: c for c in vector_candidates}
+        lexical_ids = [doc_id for doc_id, _ in lexical_hits]
+        
+        # Páginas encontradas apenas pelo BM25: buscar conteúdo e similaridade real no Astra
+        missing_ids = [doc_id for doc_id in lexical_ids if doc_id not in by_id]
+        if missing_ids:
+            for c in self._vector_search_candidates(
+                query_embedding, len(missing_ids),
+                filter=filters.combine({"_id": {"$in": missing_ids}}) if filters else {"_id": {"$in": missing_ids}},
+                include_text=include_text
+            ):
+                by_id[c["doc_id"]] = c
+        
+        vector_ids = [c["doc_id"] for c in vector_candidates]
+        lexical_ranks = {doc_id: rank for rank, doc_id in enumerate(lexical_ids, start=1)}
+        fused = reciprocal_rank_fusion([vector_ids, lexical_ids], k=system_config.rag.rrf_k)
+        
+        candidates = []
+        for doc_id, rrf_score in fused:
+            candidate = by_id.get(doc_id)
+            if candidate is None:
+                # Página removida do Astra mas ainda presente no índice BM25
+                continue
+            candidate["rrf_score"] = rrf_score
+            candidate["bm25_rank"] = lexical_ranks.get(doc_id)
+            candidates.append(candidate)
+            if len(candidates) >= limit:
+                break
+        
+        vector_id_set = set(vector_ids)
+        lexical_only = sum(1 for c in candidates if c["doc_id"] not in vector_id_set)
+        logger.info(f"[SEARCH] Busca híbrida retornou {len(candidates)} candidatos "
+                    f"({lexical_only} exclusivos do BM25)")
+        return candidates
+
+    @traced("rag.verify_relevance")
     def verify_relevance(self, query: str, selected: List[dict]) -> bool:
-        """Verifica relevância do contexto selecionado"""
+        """
+        Verifica relevância do contexto selecionado.
+        
+        O maior score de similaridade decide via relevance_gate: acima do limite
+        superior aceita e abaixo do inferior rejeita sem chamar o LLM; apenas a
+        faixa incerta usa a verificação por LLM.
+        """
         if not selected:
             return False
+        
+        scores = [c["similarity_score"] for c in selected if c.get("similarity_score") is not None]
+        top_score = max(scores) if scores else None
+        decision = relevance_gate.decide(top_score)
+        
+        if decision == VERIFY:
+            return self._llm_verify_relevance(query, selected)
+        
+        logger.info(f"[RELEVANCE] Gate: {decision} sem LLM (score {top_score:.3f})")
+        if relevance_gate.should_shadow(decision):
+            # Conferência amostral em segundo plano para medir a concordância
+            _search_executor.submit(bind_context(self._shadow_verify_relevance), query, list(selected), decision)
+        return decision == ACCEPT
+
+    def _shadow_verify_relevance(self, query: str, selected: List[dict], decision: str) -> None:
+        """Confere uma decisão do gate com o LLM (não afeta a resposta)"""
+        try:
+            relevance_gate.record_shadow(decision, self._llm_verify_relevance(query, selected))
+        except Exception as e:
+            logger.debug(f"[RELEVANCE] Conferência do gate falhou: {e}")
 
+    def _llm_verify_relevance(self, query: str, selected: List[dict]) -> bool:
+        """Verificação de relevância por LLM"""
         try:
             logger.debug(f"[RELEVANCE] Verificando relevância com {len(selected)} páginas selecionadas...")
+            budget = resolve_budget(
+                system_config.rag.relevance_budget_tokens, system_config.rag.llm_model,
+                MODEL_CONTEXT_LIMITS, system_config.rag.max_tokens_query_transform
+            )
+            packed = prompt_packer.pack_pages(
+                selected, budget, include_images=False,
+                reserved_tokens=prompt_packer.estimate_text_tokens(
+                    RELEVANCE_INSTRUCTIONS + query) + 100
+            )
             context_text = "\n\n".join(
-                f"=== PÁGINA {c['page_num']} ===\n{c['markdown_text']}"
-                for c in selected
+                f"=== PÁGINA {p.page['page_num']} ===\n{p.text}"
+                for p in sorted(packed, key=_page_order)
             )
 
-            prompt = (
-                f"Analise o conteúdo para responder: \"{query}\"\n\n"
-                f"Conteúdo:\n---\n{context_text}\n---\n\n"
-                "O conteúdo contém resposta factual para a pergunta? "
-                "Responda apenas 'Sim' ou 'Não'."
+            # Instruções -> páginas -> pergunta: o prefixo se repete entre
+            # verificações das mesmas páginas (ex.: conferências do gate)
+            messages = build_cached_messages(
+                RELEVANCE_INSTRUCTIONS,
+                f"Conteúdo:\n---\n{context_text}\n---",
+                f"Pergunta: \"{query}\"\nO conteúdo contém resposta factual para a pergunta?"
             )
 
-            response = self.openai_client.chat.completions.create(
-                model=system_config.rag.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=system_config.rag.max_tokens_query_transform,
-                temperature=system_config.rag.temperature
-            )
+            with track_dependency("openai", "verify_relevance"):
+                response = self.openai_client.chat.completions.create(
+                    model=system_config.rag.llm_model,
+                    messages=messages,
+                    max_tokens=system_config.rag.max_tokens_query_transform,
+                    temperature=system_config.rag.temperature
+                )
             
             verification_result = response.choices[0].message.content or ""
             logger.debug(f"Verificação de relevância: '{verification_result}'")
@@ -696,13 +1232,16 @@ class ProductionConversationalRAG:
             logger.error(f"Erro na verificação de relevância: {e}")
             return True  # Fallback conservador
 
+    @traced("rag.select_candidates")
     def select_best_candidates(self, query: str, candidates: List[dict]) -> Tuple[List[dict], str]:
         """Seleção eficiente baseada em similaridade (substitui re-ranking)"""
         if not candidates:
             return [], "Nenhuma página disponível."
 
-        # Ordena por score de similaridade (já vêm ordenados, mas garantimos)
-        sorted_candidates = sorted(candidates, key=lambda x: x['similarity_score'], reverse=True)
+        # Ordena pelo score de fusão (busca híbrida) ou de similaridade
+        sorted_candidates = sorted(
+            candidates, key=lambda x: x.get('rrf_score', x['similarity_score']), reverse=True
+        )
         
         # Seleciona top candidatos baseado na complexidade da query
         query_complexity = determine_query_complexity(query)
@@ -714,7 +1253,10 @@ class ProductionConversationalRAG:
         
         # Limita ao número de candidatos disponíveis
         num_to_select = min(max_candidates, len(sorted_candidates))
-        selected = sorted_candidates[:num_to_select]
+        if system_config.rag.mmr_enabled and NUMPY_AVAILABLE and num_to_select > 1:
+            selected = self._select_diverse_candidates(sorted_candidates, num_to_select)
+        else:
+            selected = sorted_candidates[:num_to_select]
         
         # Cria justificativa
         doc_names = []
@@ -739,61 +1281,93 @@ class ProductionConversationalRAG:
         
         return selected, justification
 
+    def _fetch_candidate_vectors(self, candidates: List[dict]) -> Dict[Any, List[float]]:
+        """Busca os embeddings armazenados dos candidatos (apenas _id e $vector)"""
+        ids = [c["doc_id"] for c in candidates if c.get("doc_id") is not None]
+        if not ids:
+            return {}
+        with track_dependency("astra", "fetch_vectors"):
+            cursor = self.collection.find(
+                {"_id": {"$in": ids}},
+                projection={"_id": True, "$vector": True}
+            )
+            return {doc.get("_id"): doc.get("$vector") for doc in cursor if doc.get("$vector")}
+
+    def _select_diverse_candidates(self, sorted_candidates: List[dict], k: int) -> List[dict]:
+        """
+        Seleção por MMR: remove quase-duplicatas (páginas adjacentes, cópias do
+        mesmo artigo) antes da montagem do prompt. Em caso de falha, mantém a
+        seleção por score.
+        """
+        try:
+            vectors = self._fetch_candidate_vectors(sorted_candidates)
+        except Exception as e:
+            logger.warning(f"[MMR] Falha ao buscar vetores, seleção por score: {e}")
+            return sorted_candidates[:k]
+        
+        pool = [c for c in sorted_candidates if c.get("doc_id") in vectors]
+        if len(pool) < len(sorted_candidates):
+            logger.debug(f"[MMR] Vetores ausentes para {len(sorted_candidates) - len(pool)} candidatos")
+            return sorted_candidates[:k]
+        
+        # Relevância na escala do $similarity; na busca híbrida, o RRF normalizado
+        if any("rrf_score" in c for c in pool):
+            rrf = [c.get("rrf_score", 0.0) for c in pool]
+            low, high = min(rrf), max(rrf)
+            relevance = [(r - low) / (high - low) if high > low else 1.0 for r in rrf]
+        else:
+            relevance = [c["similarity_score"] for c in pool]
+        
+        chosen, duplicates = mmr_select(
+            relevance,
+            [vectors[c["doc_id"]] for c in pool],
+            k,
+            lambda_mult=system_config.rag.mmr_lambda,
+            duplicate_threshold=system_config.rag.mmr_duplicate_threshold
+        )
+        if duplicates:
+            dropped = ", ".join(f"{pool[j].get('doc_source')} p.{pool[j].get('page_num')}" for j in duplicates)
+            logger.info(f"[MMR] {len(duplicates)} quase-duplicatas descartadas: {dropped}")
+        return [pool[i] for i in chosen]
+
+    @traced("rag.generate_answer")
     def generate_conversational_answer(self, query: str, selected: List[dict]) -> str:
         """Gera resposta conversacional otimizada"""
         try:
-            no_md = "NÃO use formatação Markdown como **, _, #. Escreva texto corrido."
+            # Seleciona texto e imagens dentro do orçamento de tokens
+            budget = resolve_budget(
+                system_config.rag.answer_budget_tokens, system_config.rag.llm_model,
+                MODEL_CONTEXT_LIMITS, system_config.rag.max_tokens_answer
+            )
+            packed = prompt_packer.pack_pages(
+                selected, budget,
+                reserved_tokens=prompt_packer.estimate_text_tokens(ANSWER_INSTRUCTIONS + query) + 150
+            )
+            logger.debug(f"[ANSWER] Prompt com ~{sum(p.tokens for p in packed)} tokens de contexto "
+                         f"({len(packed)}/{len(selected)} páginas)")
             
-            if len(selected) == 1:
-                c = selected[0]
-                doc = os.path.basename(c["file_path"]).split("_page_")[0]
-                
-                prompt = (
-                    f"Assistente especializado em documentos acadêmicos.\n"
-                    f"Pergunta: {query}\n\n"
-                    f"Use APENAS a página {c['page_num']} do documento '{doc}'.\n"
-                    f"Texto da página:\n{c['markdown_text']}\n\n"
-                    f"Instruções: resposta clara e direta. Cite: documento '{doc}', página {c['page_num']}.\n"
-                    f"{no_md}"
-                )
-                content = [{"type": "text", "text": prompt}]
-                
-                b64 = self.encode_image_to_base64(c["file_path"])
+            # Contexto reutilizável em ordem estável: cada página (texto + imagem)
+            # antes da pergunta, para que o prefixo se repita entre perguntas
+            # sobre as mesmas páginas
+            context: List[dict] = []
+            for p in sorted(packed, key=_page_order):
+                doc = os.path.basename(p.page["file_path"]).split("_page_")[0]
+                context.append({"type": "text",
+                                "text": f"=== DOCUMENTO '{doc}', PÁGINA {p.page['page_num']} ===\n{p.text}"})
+                b64 = self.encode_image_to_base64(p.page["file_path"]) if p.include_image else None
                 if b64:
-                    content.append({"type": "image_url",
+                    context.append({"type": "image_url",
                                     "image_url": {"url": f"data:image/png;base64,{b64}"}})
 
-            else:
-                pages_str = " e ".join(
-                    f"{os.path.basename(c['file_path']).split('_page_')[0]} p.{c['page_num']}"
-                    for c in selected
-                )
-                combined_text = "\n\n".join(
-                    f"=== PÁGINA {c['page_num']} ===\n{c['markdown_text']}"
-                    for c in selected
-                )
-                
-                prompt = (
-                    f"Pergunta: {query}\n\n"
-                    f"Use páginas: {pages_str}\n"
-                    f"{combined_text}\n\n"
-                    f"Integre informações. Cite fontes. {no_md}"
+            messages = build_cached_messages(ANSWER_INSTRUCTIONS, context, f"Pergunta: {query}")
+
+            with track_dependency("openai", "generate_answer"):
+                response = self.openai_client.chat.completions.create(
+                    model=system_config.rag.llm_model,
+                    messages=messages,
+                    max_tokens=system_config.rag.max_tokens_answer,
+                    temperature=system_config.rag.temperature
                 )
-                content = [{"type": "text", "text": prompt}]
-                
-                for c in selected:
-                    b64 = self.encode_image_to_base64(c["file_path"])
-                    if b64:
-                        content.append({"type": "text", "text": f"\n--- PÁGINA {c['page_num']} ---"})
-                        content.append({"type": "image_url",
-                                        "image_url": {"url": f"data:image/png;base64,{b64}"}})
-
-            response = self.openai_client.chat.completions.create(
-                model=system_config.rag.llm_model,
-                messages=[{"role": "user", "content": content}],
-                max_tokens=system_config.rag.max_tokens_answer,
-                temperature=system_config.rag.temperature
-            )
             
             return response.choices[0].message.content
             
@@ -801,21 +1375,62 @@ class ProductionConversationalRAG:
             logger.error(f"Erro gerando resposta: {e}")
             return f"Erro ao processar resposta: {e}"
 
-    def search_and_answer(self, query: str) -> dict:
-        """Pipeline completo RAG"""
+    def search_and_answer(self, query: str, filters: Optional[SearchFilters] = None,
+                          query_embedding: Optional[Embedding] = None,
+                          candidates: Optional[List[dict]] = None) -> dict:
+        """
+        Pipeline completo RAG.
+        
+        Chamadas concorrentes com a mesma query (normalizada) e o mesmo escopo
+        são coalescidas: apenas uma executa o pipeline e todas recebem o mesmo
+        resultado. `filters` restringe a busca por doc_source / indexed_at.
+        `query_embedding` e `candidates` permitem reaproveitar trabalho já feito
+        (ex.: especulação durante a transformação da query).
+        
+        Respostas bem-sucedidas ficam no cache de respostas (L1 + L2
+        compartilhado, RESPONSE_CACHE_TTL): valem para todos os workers e
+        sobrevivem a reinícios. A chave inclui a geração do índice, então
+        indexar ou deletar documentos invalida as respostas anteriores.
+        """
+        key = make_flight_key(
+            query,
+            filters=filters.to_dict() if filters else None,
+            index_generation=get_index_generation()
+        )
+        cached_result = self.response_cache.get(key)
+        if cached_result is not None:
+            logger.info(f"[RAG] ⚡ Resposta em cache para: '{query}'")
+            return cached_result
+        
+        def run() -> dict:
+            result = self._search_and_answer(query, filters, query_embedding, candidates)
+            if "error" not in result:
+                self.response_cache.set(key, result)
+            return result
+        
+        return self.answer_flight.do(key, run)
+
+    @traced("rag.search_and_answer")
+    def _search_and_answer(self, query: str, filters: Optional[SearchFilters] = None,
+                           query_embedding: Optional[Embedding] = None,
+                           candidates: Optional[List[dict]] = None) -> dict:
+        """Pipeline completo RAG (execução efetiva)"""
         import time
         pipeline_start = time.time()
         
         logger.info(f"[RAG] === PIPELINE RAG INICIADO ===")
         logger.info(f"[RAG] Query: '{query}'")
+        if filters:
+            logger.info(f"[RAG] Escopo: {filters.to_dict()}")
         
         # ETAPA 1: Gerar embedding
         logger.info(f"[RAG] 🧮 ETAPA 1: Gerando embedding da query...")
         embedding_start = time.time()
         
         try:
-            embedding = self.get_query_embedding(query)
+            embedding = query_embedding if query_embedding is not None else self.get_query_embedding(query)
             embedding_time = time.time() - embedding_start
+            pipeline_stage_duration.observe(embedding_time, stage="embedding")
             logger.info(f"[RAG] ✅ Embedding gerado em {embedding_time:.2f}s (dimensão: {len(embedding)})")
         except Exception as e:
             logger.error(f"[RAG] ❌ Embedding falhou: {e}")
@@ -825,8 +1440,11 @@ class ProductionConversationalRAG:
         logger.info(f"[RAG] 🔍 ETAPA 2: Buscando candidatos no Astra DB...")
         search_start = time.time()
         
-        candidates = self.search_candidates(embedding, query=query)
+        # Fase 1: apenas ids, scores e metadados (sem markdown)
+        if not candidates:
+            candidates = self.search_candidates(embedding, query=query, include_text=False, filters=filters)
         search_time = time.time() - search_start
+        pipeline_stage_duration.observe(search_time, stage="search")
         
         if not candidates:
             logger.warning(f"[RAG] ❌ Nenhum candidato encontrado em {search_time:.2f}s")
@@ -844,11 +1462,15 @@ class ProductionConversationalRAG:
         
         selected, justification = self.select_best_candidates(query, candidates)
         rerank_time = time.time() - rerank_start
+        pipeline_stage_duration.observe(rerank_time, stage="rerank")
         
         if not selected:
             logger.error(f"[RAG] ❌ Re-ranking falhou em {rerank_time:.2f}s")
             return {"error": "Re-ranking falhou."}
         
+        # Fase 2: carregar texto completo apenas das páginas selecionadas
+        self.hydrate_candidates(selected)
+        
         logger.info(f"[RAG] ✅ Re-ranking completo em {rerank_time:.2f}s")
         logger.info(f"[RAG] 📋 {len(selected)} páginas selecionadas")
         logger.debug(f"[RAG] Justificativa: {justification}")
@@ -859,6 +1481,7 @@ class ProductionConversationalRAG:
         
         is_relevant = self.verify_relevance(query, selected)
         relevance_time = time.time() - relevance_start
+        pipeline_stage_duration.observe(relevance_time, stage="relevance")
         
         if not is_relevant:
             logger.warning(f"[RAG] ❌ Verificação de relevância falhou em {relevance_time:.2f}s")
@@ -874,10 +1497,12 @@ class ProductionConversationalRAG:
         
         answer = self.generate_conversational_answer(query, selected)
         answer_time = time.time() - answer_start
+        pipeline_stage_duration.observe(answer_time, stage="answer")
         
         logger.info(f"[RAG] ✅ Resposta gerada em {answer_time:.2f}s")
         
         total_pipeline_time = time.time() - pipeline_start
+        pipeline_stage_duration.observe(total_pipeline_time, stage="total")
         logger.info(f"[RAG] 🏁 === PIPELINE COMPLETO em {total_pipeline_time:.2f}s ===")
 
         # Prepara detalhes da resposta
@@ -917,85 +1542,78 @@ class ProductionConversationalRAG:
             "answer": answer,
             "total_candidates": len(candidates),
             "all_candidates": all_details,
+            "filters": filters.to_dict() if filters else None,
         }
 
     def extract_structured_data(self, template: dict, document_filter: Optional[str] = None) -> dict:
-        """Extração de dados estruturados"""
+        """
+        Extração de dados estruturados (map-reduce sobre o documento inteiro).
+        
+        Args:
+            template: Template JSON da extração
+            document_filter: doc_source do documento (obrigatório: a extração
+                cobre um documento, não páginas soltas da coleção)
+        """
+        if not document_filter:
+            return {
+                "status": "error",
+                "message": "Informe o documento (doc_source) para a extração"
+            }
+        
         try:
-            # Busca páginas relevantes
-            if document_filter:
-                pages_cursor = self.collection.find(
-                    {"doc_source": document_filter},
-                    limit=10,
-                    projection={
-                        "file_path": True,
-                        "page_num": True,
-                        "doc_source": True,
-                        "markdown_text": True
-                    }
-                )
-            else:
-                pages_cursor = self.collection.find(
-                    {},
-                    limit=10,
-                    projection={
-                        "file_path": True,
-                        "page_num": True,
-                        "doc_source": True,
-                        "markdown_text": True
-                    }
-                )
+            # Páginas do documento em ordem, até extraction_max_pages (+1 detecta corte)
+            max_pages = system_config.rag.extraction_max_pages
+            pages_cursor = self.collection.find(
+                {"doc_source": document_filter},
+                sort={"page_num": 1},
+                limit=max_pages + 1,
+                projection={
+                    "file_path": True,
+                    "page_num": True,
+                    "doc_source": True,
+                    "markdown_text": True
+                }
+            )
             
             pages = list(pages_cursor)
             if not pages:
-                return {"error": "Nenhuma página encontrada"}
+                return {"status": "error", "message": f"Nenhuma página encontrada para '{document_filter}'"}
             
-            # Prepara prompt de extração
-            template_str = json.dumps(template, indent=2)
+            truncated = len(pages) > max_pages
+            if truncated:
+                pages = pages[:max_pages]
+                logger.warning(
+                    f"[EXTRACT] ⚠️ '{document_filter}' tem mais de {max_pages} páginas; "
+                    f"extraindo as {max_pages} primeiras"
+                )
             
-            content = [{
-                "type": "text",
-                "text": f"""
-Extraia dados estruturados seguindo este template: {template_str}
-
-Se informação não disponível, deixe em branco.
-Responda APENAS com JSON válido.
-
-DOCUMENTOS:"""
-            }]
+            def llm_call(content: List[Dict[str, Any]]) -> str:
+                with track_dependency("openai", "extract"):
+                    response = self.openai_client.chat.completions.create(
+                        model=system_config.rag.llm_model,
+                        messages=[{"role": "user", "content": content}],
+                        response_format={"type": "json_object"},
+                        temperature=system_config.rag.temperature
+                    )
+                return response.choices[0].message.content
             
-            # Adiciona páginas (limitado para não exceder tokens)
-            for page in pages[:5]:
-                doc_name = page.get("doc_source", "documento")
-                page_num = page.get("page_num", 0)
-                content_text = page.get("markdown_text", "")[:500]
-                
-                content.append({
-                    "type": "text",
-                    "text": f"\n=== {doc_name.upper()} - PÁGINA {page_num} ===\n{content_text}\n"
-                })
-                
-                # Adiciona imagem se disponível
-                img_b64 = self.encode_image_to_base64(page.get("file_path"))
-                if img_b64:
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{img_b64}"}
-                    })
-            
-            response = self.openai_client.chat.completions.create(
-                model=system_config.rag.llm_model,
-                messages=[{"role": "user", "content": content}],
-                response_format={"type": "json_object"},
-                temperature=system_config.rag.temperature
+            extractor = MapReduceExtractor(
+                llm_call,
+                image_loader=self.encode_image_to_base64,
+                pages_per_batch=system_config.rag.extraction_pages_per_batch,
+                max_concurrency=system_config.rag.extraction_llm_concurrency,
+                max_chars_per_page=system_config.rag.extraction_max_chars_per_page,
+                include_images=system_config.rag.extraction_include_images
             )
-            
-            extracted_data = json.loads(response.choices[0].message.content)
+            result = extractor.extract(template, pages)
             
             return {
                 "status": "success",
-                "data": extracted_data,
-                "pages_analyzed": len(pages)
+                "data": result["data"],
+                "pages_analyzed": result["pages_analyzed"],
+                "batches": result["batches"],
+                "failed_batches": result["failed_batches"],
+                "truncated": truncated
             }
             
         except Exception as e:
@@ -1005,20 +1623,33 @@ DOCUMENTOS:"""
                 "message": f"Erro na extração: {e}"
             }
 
-    def clear_history(self):
+    def clear_history(self, session_id: Optional[str] = None):
         """Limpa histórico da conversa"""
-        self.chat_history = []
+        self.sessions.clear(session_id)
         logger.info("Histórico de conversa limpo")
 
-    def get_chat_history(self) -> List[Dict[str, str]]:
+    def get_chat_history(self, session_id: Optional[str] = None) -> List[Dict[str, str]]:
         """Retorna histórico atual"""
-        return self.chat_history.copy()
+        session = self.sessions.peek(session_id)
+        if session is None:
+            return []
+        with session.lock:
+            return session.snapshot()
 
     def get_system_stats(self) -> Dict[str, Any]:
         """Estatísticas do sistema para monitoramento"""
         stats = {
-            "chat_history_length": len(self.chat_history),
+            "chat_history_length": self.sessions.history_length(),
+            "session_stats": self.sessions.stats(),
             "transformer_stats": self.query_transformer.get_cache_stats(),
+            "image_cache_stats": image_cache.stats(),
+            "embedding_store_stats": self.embedding_store.stats() if self.embedding_store else None,
+            "single_flight_stats": self.answer_flight.stats(),
+            "relevance_gate_stats": relevance_gate.stats(),
+            "speculation_stats": self.speculation_stats.stats(),
+            "prompt_cache_stats": usage_ledger.prompt_cache(),
+            "llm_usage": usage_ledger.summary(),
+            "response_cache_stats": self.response_cache.stats(),
             "system_health": "operational"
         }
         
@@ -1044,17 +1675,18 @@ class SimpleRAG:
     def __init__(self):
         self.rag = ProductionConversationalRAG()
     
-    def search(self, query: str) -> str:
+    def search(self, query: str, session_id: Optional[str] = None,
+               filters: Optional[SearchFilters] = None) -> str:
         """Busca simples"""
-        return self.rag.ask(query)
+        return self.rag.ask(query, session_id=session_id, filters=filters)
     
     def extract(self, template: dict, document: str = None) -> dict:
         """Extrai dados estruturados"""
         return self.rag.extract_structured_data(template, document)
     
-    def clear_chat(self):
+    def clear_chat(self, session_id: Optional[str] = None):
         """Limpa histórico"""
-        self.rag.clear_history()
+        self.rag.clear_history(session_id)
 
 # Interface CLI otimizada
 def main() -> None:
@@ -1108,7 +1740,7 @@ def main() -> None:
                 # Resposta normal
                 print("\n🤖 Assistente: ", end="")
                 try:
-                    response = rag.ask(user_input)
+                    response = rag.ask(user_input, session_id=DEFAULT_SESSION_ID)
                     print(response)
                 except Exception as e:
                     logger.error(f"Erro no processamento: {e}")
@@ -1138,7 +1770,7 @@ def print_production_help():
 • /clear    - Limpa histórico
 • /stats    - Estatísticas do sistema
 • /extract  - Extração de dados
-  Exemplo: /extract {\"title\": \"\", \"authors\": []}
+  Exemplo: /extract 2501.13956 {\"title\": \"\", \"authors\": []}
 
 💡 RECURSOS:
 • Cache de transformações (economia de custos)
@@ -1156,16 +1788,17 @@ def print_production_help():
 def handle_production_extract_command(rag, command):
     """Manipula extração de dados do sistema"""
     try:
-        if len(command.split(" ", 1)) < 2:
-            print("💡 Uso: /extract {\"campo\": \"valor\"}")
-            print("📝 Exemplo: /extract {\"title\": \"\", \"methodology\": \"\"}")
+        parts = command.split(" ", 2)
+        if len(parts) < 3 or parts[1].startswith("{"):
+            print("💡 Uso: /extract <doc_source> {\"campo\": \"valor\"}")
+            print("📝 Exemplo: /extract 2501.13956 {\"title\": \"\", \"methodology\": \"\"}")
             return
         
-        template_str = command.split(" ", 1)[1]
+        doc_source, template_str = parts[1], parts[2]
         template = json.loads(template_str)
         
         print("🔍 Extraindo dados (produção)...")
-        result = rag.extract_structured_data(template)
+        result = rag.extract_structured_data(template, doc_source)
         
         if result.get("status") == "success":
             print("✅ Extração bem-sucedida:")
@@ -0,0 +1,136 @@
+"""
+Filtros de metadados para a busca vetorial.
+
+Restringe a busca a um subconjunto da coleção (documentos incluídos ou
+excluídos por `doc_source` e faixa de `indexed_at`), aplicado pelo Astra DB
+antes da ordenação por similaridade e, no índice BM25, antes do top-k.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+DateLike = Union[str, datetime, None]
+
+
+def _normalize_sources(sources: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Remove vazios e duplicatas, em ordem estável."""
+    if not sources:
+        return ()
+    if isinstance(sources, str):
+        sources = [sources]
+    seen = []
+    for source in sources:
+        source = (source or "").strip()
+        if source and source not in seen:
+            seen.append(source)
+    return tuple(seen)
+
+
+def _normalize_date(value: DateLike) -> Optional[str]:
+    """
+    Converte para o formato gravado pelo indexer (ISO 8601, UTC, sem fuso),
+    de modo que a comparação de strings no Astra DB respeite a ordem temporal.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Escopo de uma busca. Campos vazios não restringem nada."""
+    include_sources: Tuple[str, ...] = ()
+    exclude_sources: Tuple[str, ...] = ()
+    indexed_after: Optional[str] = None
+    indexed_before: Optional[str] = None
+
+    @classmethod
+    def create(
+        cls,
+        include_sources: Optional[Iterable[str]] = None,
+        exclude_sources: Optional[Iterable[str]] = None,
+        indexed_after: DateLike = None,
+        indexed_before: DateLike = None
+    ) -> Optional["SearchFilters"]:
+        """Cria filtros normalizados; retorna None quando nenhum critério foi informado."""
+        filters = cls(
+            include_sources=_normalize_sources(include_sources),
+            exclude_sources=_normalize_sources(exclude_sources),
+            indexed_after=_normalize_date(indexed_after),
+            indexed_before=_normalize_date(indexed_before)
+        )
+        if filters.indexed_after and filters.indexed_before and filters.indexed_after > filters.indexed_before:
+            raise ValueError("indexed_after deve ser anterior a indexed_before")
+        return None if filters.is_empty() else filters
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["SearchFilters"]:
+        """Cria a partir de um dicionário (metadados de contexto, payloads de API)."""
+        if not data:
+            return None
+        if isinstance(data, SearchFilters):
+            return data
+        return cls.create(
+            include_sources=data.get("include_sources") or data.get("doc_sources"),
+            exclude_sources=data.get("exclude_sources") or data.get("exclude_doc_sources"),
+            indexed_after=data.get("indexed_after"),
+            indexed_before=data.get("indexed_before")
+        )
+
+    def is_empty(self) -> bool:
+        return not (self.include_sources or self.exclude_sources or self.indexed_after or self.indexed_before)
+
+    def matches_source(self, doc_source: Optional[str]) -> bool:
+        """Verifica apenas o critério de documento (usado no índice BM25 local)."""
+        if self.include_sources and doc_source not in self.include_sources:
+            return False
+        return doc_source not in self.exclude_sources
+
+    def to_astra_filter(self) -> Dict[str, Any]:
+        """Filtro no formato da Data API do Astra DB."""
+        conditions = []
+        if len(self.include_sources) == 1:
+            conditions.append({"doc_source": self.include_sources[0]})
+        elif self.include_sources:
+            conditions.append({"doc_source": {"$in": list(self.include_sources)}})
+        if self.exclude_sources:
+            conditions.append({"doc_source": {"$nin": list(self.exclude_sources)}})
+        if self.indexed_after:
+            conditions.append({"indexed_at": {"$gte": self.indexed_after}})
+        if self.indexed_before:
+            conditions.append({"indexed_at": {"$lte": self.indexed_before}})
+
+        if not conditions:
+            return {}
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def combine(self, base_filter: Dict[str, Any]) -> Dict[str, Any]:
+        """Combina o escopo com outro filtro (ex.: `_id $in`)."""
+        scope = self.to_astra_filter()
+        if not scope:
+            return base_filter
+        if not base_filter:
+            return scope
+        return {"$and": [base_filter, scope]}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação serializável (logs, chaves de coalescência, respostas)."""
+        return {
+            "include_sources": list(self.include_sources),
+            "exclude_sources": list(self.exclude_sources),
+            "indexed_after": self.indexed_after,
+            "indexed_before": self.indexed_before,
+        }
+
+
+def to_astra_filter(filters: Optional[SearchFilters]) -> Dict[str, Any]:
+    """Filtro Astra para filtros opcionais ({} quando não há escopo)."""
+    return filters.to_astra_filter() if filters else {}
+
+
+__all__ = ['SearchFilters', 'to_astra_filter']
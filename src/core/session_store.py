@@ -0,0 +1,191 @@
+"""
+Armazenamento de estado conversacional por sessão.
+
+Substitui o histórico único compartilhado por todos os clientes: cada sessão
+tem seu próprio histórico limitado e seu próprio lock, sessões ociosas expiram
+e o total de memória ocupada pelos históricos tem um teto global.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ID = "default"
+
+
+@dataclass
+class ConversationSession:
+    """Estado de uma sessão de conversa."""
+    session_id: str
+    history: List[Dict[str, str]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+    size_bytes: int = 0
+    turns: int = 0
+    # Serializa turnos concorrentes da mesma sessão (RLock: ask pode reentrar)
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def snapshot(self) -> List[Dict[str, str]]:
+        """Cópia do histórico para uso fora do lock."""
+        return [dict(msg) for msg in self.history]
+
+
+class SessionStore:
+    """
+    Sessões de conversa indexadas por session_id.
+
+    - Histórico por sessão limitado (corta para `trim_to` ao passar de `max_history`)
+    - Expiração de sessões ociosas (`idle_ttl`), verificada de forma preguiçosa
+    - Teto global de sessões e de bytes; ao exceder, remove as menos usadas (LRU)
+    - Thread-safe: lock global para o índice, lock por sessão para os turnos
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        idle_ttl: float = 1800,
+        max_history: int = 20,
+        trim_to: int = 16,
+        max_message_chars: int = 8000,
+        max_total_bytes: int = 64 * 1024 * 1024
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_history = max_history
+        self.trim_to = min(trim_to, max_history)
+        self.max_message_chars = max_message_chars
+        self.max_total_bytes = max_total_bytes
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._evicted_idle = 0
+        self._evicted_capacity = 0
+
+    def get(self, session_id: Optional[str] = None) -> ConversationSession:
+        """Retorna a sessão (criando se necessário) e atualiza o último acesso."""
+        session_id = session_id or DEFAULT_SESSION_ID
+        now = time.time()
+
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ConversationSession(session_id=session_id)
+                self._sessions[session_id] = session
+                self._evict_capacity(keep=session_id)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+            return session
+
+    def ephemeral(self) -> ConversationSession:
+        """
+        Sessão descartável, fora do índice: para requisições sem session_id,
+        que não devem compartilhar histórico (nem lock) com outros clientes.
+        """
+        return ConversationSession(session_id=f"anon-{uuid.uuid4().hex[:12]}")
+
+    def history_length(self, session_id: Optional[str] = None) -> int:
+        """Tamanho do histórico sem tomar o lock da sessão (leitura para estatísticas)."""
+        session = self.peek(session_id)
+        return len(session.history) if session is not None else 0
+
+    def peek(self, session_id: Optional[str] = None) -> Optional[ConversationSession]:
+        """Retorna a sessão sem criar nem atualizar o último acesso."""
+        with self._lock:
+            return self._sessions.get(session_id or DEFAULT_SESSION_ID)
+
+    def append(self, session: ConversationSession, role: str, content: str) -> None:
+        """Adiciona mensagem ao histórico da sessão, aplicando os limites."""
+        content = (content or "")[:self.max_message_chars]
+        message_bytes = len(content.encode("utf-8"))
+
+        with session.lock:
+            session.history.append({"role": role, "content": content})
+            delta = message_bytes
+
+            if len(session.history) > self.max_history:
+                removed = session.history[:-self.trim_to]
+                session.history = session.history[-self.trim_to:]
+                delta -= sum(len(msg["content"].encode("utf-8")) for msg in removed)
+                logger.debug(f"[SESSION] Histórico de '{session.session_id}' limitado a {len(session.history)} mensagens")
+
+            session.size_bytes += delta
+            if role == "assistant":
+                session.turns += 1
+
+        with self._lock:
+            # A sessão pode ter sido removida enquanto o turno rodava
+            if self._sessions.get(session.session_id) is session:
+                self._total_bytes += delta
+                self._evict_capacity(keep=session.session_id)
+
+    def clear(self, session_id: Optional[str] = None) -> None:
+        """Limpa o histórico de uma sessão (mantendo a sessão)."""
+        session = self.peek(session_id)
+        if session is None:
+            return
+        with session.lock:
+            freed = session.size_bytes
+            session.history = []
+            session.size_bytes = 0
+        with self._lock:
+            if self._sessions.get(session.session_id) is session:
+                self._total_bytes -= freed
+
+    def delete(self, session_id: str) -> bool:
+        """Remove uma sessão."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._total_bytes -= session.size_bytes
+            return True
+
+    def _evict_idle(self, now: float) -> None:
+        """Remove sessões ociosas (chamar com lock). As mais antigas ficam no início."""
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._total_bytes -= session.size_bytes
+            self._evicted_idle += 1
+            logger.debug(f"[SESSION] Sessão ociosa removida: {session_id}")
+
+    def _evict_capacity(self, keep: str) -> None:
+        """Aplica teto de sessões e de bytes removendo as menos usadas (chamar com lock)."""
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._total_bytes > self.max_total_bytes
+        ):
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            self._sessions.popitem(last=False)
+            self._total_bytes -= session.size_bytes
+            self._evicted_capacity += 1
+            logger.debug(f"[SESSION] Sessão removida por capacidade: {session_id}")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do armazenamento de sessões."""
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "total_bytes": self._total_bytes,
+                "max_total_bytes": self.max_total_bytes,
+                "evicted_idle": self._evicted_idle,
+                "evicted_capacity": self._evicted_capacity,
+            }
+
+
+__all__ = ['ConversationSession', 'SessionStore', 'DEFAULT_SESSION_ID']
@@ -0,0 +1,116 @@
+"""
+Embedding (e busca) especulativos durante a transformação da query.
+
+Enquanto o LLM reescreve a mensagem do usuário, a mensagem original já é
+embedada (e opcionalmente buscada) em segundo plano. Se a query transformada
+for igual ou próxima da original, o resultado especulativo é reaproveitado e
+a latência do embedding/busca sai do caminho crítico; caso contrário, é
+descartado.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Executor, Future
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..utils.embedding_store import normalize_query
+from ..utils.vectors import Embedding
+from ..utils.tracing import bind_context
+
+logger = logging.getLogger(__name__)
+
+
+def query_similarity(a: str, b: str) -> float:
+    """Similaridade textual (0-1) entre duas queries normalizadas."""
+    a = normalize_query(a).lower()
+    b = normalize_query(b).lower()
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class SpeculativeQuery:
+    """
+    Trabalho especulativo para uma mensagem: embedding e, opcionalmente, busca.
+
+    Args:
+        executor: Executor dedicado (não compartilhar com o da busca híbrida)
+        raw_query: Mensagem original do usuário
+        embed_fn: Função (query) -> embedding
+        search_fn: Função (embedding) -> candidatos, opcional
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        raw_query: str,
+        embed_fn: Callable[[str], Embedding],
+        search_fn: Optional[Callable[[Embedding], List[dict]]] = None
+    ):
+        self.raw_query = raw_query
+        self._embed_fn = embed_fn
+        self._search_fn = search_fn
+        self.future: Future = executor.submit(bind_context(self._run))
+
+    def _run(self) -> Dict[str, Any]:
+        start = time.time()
+        embedding = self._embed_fn(self.raw_query)
+        candidates = self._search_fn(embedding) if self._search_fn else None
+        return {"embedding": embedding, "candidates": candidates, "duration": time.time() - start}
+
+    def matches(self, final_query: str, threshold: float) -> bool:
+        """Indica se a query final é próxima o bastante da especulada."""
+        return query_similarity(self.raw_query, final_query) >= threshold
+
+    def result(self, timeout: Optional[float] = None) -> Tuple[Dict[str, Any], float]:
+        """Aguarda o resultado; retorna (payload, tempo bloqueado esperando)."""
+        wait_start = time.time()
+        payload = self.future.result(timeout=timeout)
+        return payload, time.time() - wait_start
+
+    def cancel(self) -> None:
+        """Descarta o trabalho (cancela se ainda não começou)."""
+        self.future.cancel()
+
+
+class SpeculationStats:
+    """Contadores de especulação e latência economizada."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.reused = 0
+        self.discarded = 0
+        self.failed = 0
+        self.saved_seconds = 0.0
+
+    def record(self, outcome: str, saved: float = 0.0) -> None:
+        with self._lock:
+            if outcome == "attempt":
+                self.attempts += 1
+            elif outcome == "reused":
+                self.reused += 1
+                self.saved_seconds += max(0.0, saved)
+            elif outcome == "discarded":
+                self.discarded += 1
+            elif outcome == "failed":
+                self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "failed": self.failed,
+                "reuse_rate": self.reused / self.attempts if self.attempts else 0.0,
+                "saved_seconds_total": round(self.saved_seconds, 3),
+                "saved_seconds_avg": round(self.saved_seconds / self.reused, 3) if self.reused else 0.0,
+            }
+
+
+__all__ = ['SpeculativeQuery', 'SpeculationStats', 'query_similarity']
@@ -0,0 +1,80 @@
+"""
+Logging não bloqueante (QueueHandler + QueueListener).
+
+Com `ProductionConfig.async_logging` ativo, os loggers recebem apenas um
+QueueHandler: emitir um log só enfileira o registro. Uma thread
+QueueListener por destino faz a formatação, a escrita em disco e a
+rotação, fora do event loop.
+
+Handlers são compartilhados por chave (ex.: um arquivo): vários loggers que
+escrevem no mesmo arquivo usam a mesma fila e o mesmo handler real, sem
+rotações concorrentes. Os registros pendentes são gravados no encerramento.
+"""
+
+import atexit
+import queue
+import logging
+import threading
+import logging.handlers
+from typing import Callable, Dict, List, Tuple
+
+_lock = threading.Lock()
+_pipelines: Dict[str, Tuple[logging.handlers.QueueHandler, logging.handlers.QueueListener]] = {}
+
+
+def queued_handler(key: str, factory: Callable[[], List[logging.Handler]]) -> logging.Handler:
+    """
+    QueueHandler compartilhado pela chave; `factory` cria os handlers reais
+    (executada apenas na primeira chamada) que rodam na thread do listener.
+    """
+    with _lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, *factory(), respect_handler_level=True)
+            listener.start()
+            handler = logging.handlers.QueueHandler(log_queue)
+            # Apenas interpola a mensagem; o formato final é do handler real
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            pipeline = (handler, listener)
+            _pipelines[key] = pipeline
+        return pipeline[0]
+
+
+def create_log_handlers(key: str, factory: Callable[[], List[logging.Handler]],
+                        async_logging: bool) -> List[logging.Handler]:
+    """
+    Handlers para anexar a um logger.
+
+    Args:
+        key: Identifica o destino compartilhado (ex.: caminho do arquivo)
+        factory: Cria os handlers reais (arquivo, console)
+        async_logging: True enfileira (ProductionConfig.async_logging);
+            False retorna os handlers reais, síncronos
+
+    Returns:
+        [QueueHandler] compartilhado ou os handlers de `factory()`
+    """
+    if async_logging:
+        return [queued_handler(key, factory)]
+    return factory()
+
+
+def stop_queued_logging() -> None:
+    """Grava os registros pendentes e encerra os listeners."""
+    with _lock:
+        pipelines = list(_pipelines.values())
+        _pipelines.clear()
+    for _, listener in pipelines:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(stop_queued_logging)
+
+
+__all__ = ['queued_handler', 'create_log_handlers', 'stop_queued_logging']
@@ -1,35 +1,80 @@
 """Utilitário de cache para otimização de performance."""
+import sys
 import time
+import asyncio
 import hashlib
 import json
 import logging
-from typing import Any, Dict, Optional, Callable
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
 from dataclasses import dataclass
 from functools import wraps
 
 logger = logging.getLogger(__name__)
 
+
+def estimate_size(value: Any) -> int:
+    """Estimativa barata do tamanho em bytes de um valor (strings, bytes, listas de números)."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, array):
+        # Embeddings float32: buffer contíguo
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        # Lista de floats: objeto float (24 bytes) por elemento, além do ponteiro
+        return sys.getsizeof(value) + sum(
+            24 if isinstance(item, (int, float)) else estimate_size(item) for item in value
+        )
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
 @dataclass
 class CacheEntry:
     """Entrada do cache com timestamp."""
     value: Any
     timestamp: float
     hits: int = 0
+    size: int = 0
 
 class SimpleCache:
-    """Cache simples em memória com TTL (Time To Live)."""
+    """
+    Cache LRU em memória com TTL (Time To Live).
+
+    - get/set/evict em O(1) (OrderedDict em ordem de uso)
+    - Expiração preguiçosa: entradas vencidas são removidas ao serem lidas
+    - Limite opcional pelo total de bytes, além do número de entradas
+    - Thread-safe (usado a partir de workers de asyncio.to_thread)
+    """
     
-    def __init__(self, max_size: int = 1000, default_ttl: int = 3600):
+    def __init__(self, max_size: int = 1000, default_ttl: int = 3600,
+                 max_bytes: Optional[int] = None,
+                 size_fn: Callable[[Any], int] = estimate_size):
         """
         Inicializa o cache.
         
         Args:
             max_size: Tamanho máximo do cache
             default_ttl: TTL padrão em segundos (1 hora)
+            max_bytes: Total máximo de bytes estimados (None = sem limite)
+            size_fn: Função que estima o tamanho de um valor em bytes
         """
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self._cache: Dict[str, CacheEntry] = {}
+        self.max_bytes = max_bytes
+        self._size_fn = size_fn
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
     
     def _create_key(self, *args, **kwargs) -> str:
         """Cria chave única baseada nos argumentos."""
@@ -37,61 +82,134 @@ class SimpleCache:
         key_str = json.dumps(key_data, sort_keys=True, default=str)
         return hashlib.md5(key_str.encode()).hexdigest()
     
+    def _is_expired(self, entry: CacheEntry, ttl: Optional[int]) -> bool:
+        effective_ttl = ttl if ttl is not None else self.default_ttl
+        return time.time() - entry.timestamp > effective_ttl
+    
+    def _remove(self, key: str) -> None:
+        entry = self._cache.pop(key)
+        self._current_bytes -= entry.size
+    
     def get(self, key: str, ttl: Optional[int] = None) -> Optional[Any]:
         """Recupera valor do cache."""
-        if key not in self._cache:
-            return None
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
             
-        entry = self._cache[key]
-        effective_ttl = ttl if ttl is not None else self.default_ttl
-        
-        # Verifica se expirou
-        if time.time() - entry.timestamp > effective_ttl:
-            del self._cache[key]
-            logger.debug(f"Cache key '{key}' expirou")
-            return None
+            # Verifica se expirou
+            if self._is_expired(entry, ttl):
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                logger.debug(f"Cache key '{key}' expirou")
+                return None
+            
+            self._cache.move_to_end(key)
+            entry.hits += 1
+            self._hits += 1
+            logger.debug(f"Cache hit para key '{key}' (hits: {entry.hits})")
+            return entry.value
+    
+    def contains(self, key: str, ttl: Optional[int] = None) -> bool:
+        """Indica se há valor válido para a chave, sem afetar ordem LRU nem estatísticas."""
+        with self._lock:
+            entry = self._cache.get(key)
+            return entry is not None and not self._is_expired(entry, ttl)
+    
+    def __contains__(self, key: str) -> bool:
+        return self.contains(key)
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    def set(self, key: str, value: Any, timestamp: Optional[float] = None,
+            ttl: Optional[int] = None) -> None:
+        """
+        Armazena valor no cache.
         
-        entry.hits += 1
-        logger.debug(f"Cache hit para key '{key}' (hits: {entry.hits})")
-        return entry.value
-    
-    def set(self, key: str, value: Any) -> None:
-        """Armazena valor no cache."""
-        # Remove entradas antigas se cache está cheio
-        if len(self._cache) >= self.max_size:
-            self._evict_oldest()
+        `timestamp` permite preservar a idade original da entrada (ex.: ao
+        promover de um cache de segundo nível), para que o TTL não recomece.
+        `ttl` é a retenção desejada; aqui a validade é decidida na leitura
+        (`get(key, ttl)`), então só é usado por caches com expiração na
+        gravação (L2 do TieredCache).
+        """
+        size = self._size_fn(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.debug(f"Cache set ignorado para key '{key}': {size} bytes excede o limite")
+            return
         
-        self._cache[key] = CacheEntry(
-            value=value,
-            timestamp=time.time()
-        )
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = CacheEntry(
+                value=value, timestamp=timestamp if timestamp is not None else time.time(), size=size
+            )
+            self._current_bytes += size
+            
+            # Remove entradas menos usadas se o cache está cheio
+            while len(self._cache) > self.max_size or (
+                self.max_bytes is not None and self._current_bytes > self.max_bytes
+            ):
+                self._evict_oldest()
         logger.debug(f"Cache set para key '{key}'")
     
+    def delete(self, key: str) -> bool:
+        """Remove uma chave; retorna se ela existia."""
+        with self._lock:
+            if key not in self._cache:
+                return False
+            self._remove(key)
+            return True
+    
     def _evict_oldest(self) -> None:
-        """Remove entrada mais antiga do cache."""
+        """Remove a entrada menos recentemente usada (O(1)); chamar com o lock."""
         if not self._cache:
             return
-            
-        oldest_key = min(self._cache.keys(), 
-                        key=lambda k: self._cache[k].timestamp)
-        del self._cache[oldest_key]
+        
+        oldest_key, entry = self._cache.popitem(last=False)
+        self._current_bytes -= entry.size
+        self._evictions += 1
         logger.debug(f"Cache evict: removido key '{oldest_key}'")
     
     def clear(self) -> None:
         """Limpa todo o cache."""
-        count = len(self._cache)
-        self._cache.clear()
+        with self._lock:
+            count = len(self._cache)
+            self._cache.clear()
+            self._current_bytes = 0
         logger.info(f"Cache limpo: {count} entradas removidas")
     
     def stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do cache."""
-        total_hits = sum(entry.hits for entry in self._cache.values())
-        return {
-            "size": len(self._cache),
-            "max_size": self.max_size,
-            "total_hits": total_hits,
-            "hit_rate": total_hits / max(1, len(self._cache))
-        }
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "bytes": self._current_bytes if self.max_bytes is not None else None,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "total_hits": self._hits,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
+
+# Envelope gravado pelos decorators: distingue um resultado None de um miss
+# e guarda o instante da gravação (stale-while-revalidate, cache negativo)
+_ENVELOPE = "__cache_entry__"
+
+
+def _wrap(value: Any, negative: bool = False) -> Dict[str, Any]:
+    return {_ENVELOPE: True, "value": value, "stored_at": time.time(), "negative": negative}
+
+
+def _unwrap(entry: Any) -> Optional[Dict[str, Any]]:
+    return entry if isinstance(entry, dict) and entry.get(_ENVELOPE) else None
+
 
 def cached(cache: SimpleCache, ttl: Optional[int] = None):
     """
@@ -108,14 +226,14 @@ def cached(cache: SimpleCache, ttl: Optional[int] = None):
             key = f"{func.__name__}:{cache._create_key(*args, **kwargs)}"
             
             # Tenta recuperar do cache com TTL específico
-            result = cache.get(key, ttl)
-            if result is not None:
-                return result
+            entry = _unwrap(cache.get(key, ttl))
+            if entry is not None:
+                return entry["value"]
             
-            # Executa função e armazena resultado
+            # Executa função e armazena resultado (inclusive None)
             logger.debug(f"Cache miss para função '{func.__name__}', executando...")
             result = func(*args, **kwargs)
-            cache.set(key, result)
+            cache.set(key, _wrap(result))
             
             return result
         
@@ -126,6 +244,105 @@ def cached(cache: SimpleCache, ttl: Optional[int] = None):
         return wrapper
     return decorator
 
+
+def acached(
+    cache: SimpleCache,
+    ttl: Optional[int] = None,
+    stale_ttl: int = 0,
+    negative_ttl: int = 0,
+    flight_timeout: Optional[float] = None
+):
+    """
+    Decorator de cache para funções assíncronas (chamadas de LLM, embeddings).
+    
+    - Single-flight por chave: chamadas concorrentes com a mesma chave
+      aguardam uma única execução
+    - Stale-while-revalidate: por `stale_ttl` segundos após expirar, o valor
+      antigo é servido enquanto uma única atualização roda em segundo plano
+    - Cache negativo: resultados None ficam em cache por `negative_ttl`
+      segundos (0 = não cachear None)
+    - Caches com L2 (TieredCache: SQLite/Redis) são lidos e gravados em
+      threads (`asyncio.to_thread`), sem bloquear o event loop
+    
+    Args:
+        cache: Instância do cache a ser usado (SimpleCache ou TieredCache)
+        ttl: Validade do valor (padrão: default_ttl do cache)
+        stale_ttl: Janela em que o valor expirado ainda é servido
+        negative_ttl: Validade de resultados None
+        flight_timeout: Espera máxima de uma duplicata pela execução líder
+    """
+    from .single_flight import SingleFlight
+
+    def decorator(func: Callable) -> Callable:
+        fresh_ttl = ttl if ttl is not None else cache.default_ttl
+        lookup_ttl = max(fresh_ttl + stale_ttl, negative_ttl)
+        flight = SingleFlight(func.__name__, wait_timeout=flight_timeout)
+        refreshing: Dict[str, asyncio.Task] = {}
+        counters = {"fresh_hits": 0, "stale_hits": 0, "negative_hits": 0, "refreshes": 0, "refresh_errors": 0}
+        # L1 em memória não bloqueia; L2 faz I/O (disco, socket, lock entre workers)
+        blocking = getattr(cache, "l2", None) is not None
+
+        async def cache_get(key: str) -> Any:
+            if blocking:
+                return await asyncio.to_thread(cache.get, key, lookup_ttl)
+            return cache.get(key, lookup_ttl)
+
+        async def cache_set(key: str, value: Any) -> None:
+            if blocking:
+                await asyncio.to_thread(cache.set, key, value, ttl=lookup_ttl)
+            else:
+                cache.set(key, value, ttl=lookup_ttl)
+
+        async def compute(key: str, args, kwargs) -> Any:
+            result = await func(*args, **kwargs)
+            # Retenção = janela inteira de leitura (fresco + stale): um L2 com
+            # expiração na gravação (Redis `ex`) não pode descartar o valor stale
+            if result is not None:
+                await cache_set(key, _wrap(result))
+            elif negative_ttl > 0:
+                await cache_set(key, _wrap(None, negative=True))
+            return result
+
+        async def refresh(key: str, args, kwargs) -> None:
+            try:
+                await flight.ado(key, lambda: compute(key, args, kwargs))
+            except Exception as e:
+                counters["refresh_errors"] += 1
+                logger.warning(f"Atualização em segundo plano de '{func.__name__}' falhou: {e}")
+            finally:
+                refreshing.pop(key, None)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = f"{func.__name__}:{cache._create_key(*args, **kwargs)}"
+            entry = _unwrap(await cache_get(key))
+            
+            if entry is not None:
+                age = time.time() - entry["stored_at"]
+                if entry["negative"]:
+                    if age <= negative_ttl:
+                        counters["negative_hits"] += 1
+                        return None
+                elif age <= fresh_ttl:
+                    counters["fresh_hits"] += 1
+                    return entry["value"]
+                else:
+                    # Expirado mas dentro da janela: serve o antigo e atualiza uma vez
+                    counters["stale_hits"] += 1
+                    if key not in refreshing:
+                        counters["refreshes"] += 1
+                        refreshing[key] = asyncio.create_task(refresh(key, args, kwargs))
+                    return entry["value"]
+            
+            logger.debug(f"Cache miss para função '{func.__name__}', executando...")
+            return await flight.ado(key, lambda: compute(key, args, kwargs))
+        
+        wrapper.clear_cache = lambda: cache.clear()
+        wrapper.cache_stats = lambda: {**cache.stats(), **counters, "single_flight": flight.stats()}
+        
+        return wrapper
+    return decorator
+
 # Cache global para uso simples
 global_cache = SimpleCache()
 
@@ -0,0 +1,218 @@
+"""
+Cache persistente de embeddings de query compartilhado entre workers.
+
+Arquivo SQLite em modo WAL: vários processos (workers do uvicorn) leem e
+escrevem o mesmo arquivo sem bloquear leitores. Vetores são armazenados como
+float32 compactos, indexados por texto normalizado da query + modelo.
+Escritas são acumuladas e gravadas em lote numa única transação. Leituras
+retornam `array('f')`, sem conversão para lista.
+"""
+
+import os
+import re
+import time
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from .vectors import Embedding, to_float32
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza texto da query para uso como chave (NFKC + espaços colapsados)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", query or "")).strip()
+
+
+def _pack(vector: Embedding) -> bytes:
+    """Serializa vetor como float32 contíguo."""
+    return to_float32(vector).tobytes()
+
+
+def _unpack(blob: bytes) -> array:
+    """Desserializa vetor float32 (sem cópia para lista)."""
+    return to_float32(blob)
+
+
+class PersistentEmbeddingCache:
+    """
+    Cache de embeddings em SQLite (WAL) compartilhado por todos os workers.
+
+    - Chave: sha1(modelo + query normalizada)
+    - Valor: float32 (4 bytes por dimensão)
+    - Escritas em lote: flush ao atingir `flush_batch_size` ou `flush_interval`
+    - Snapshot: as entradas mais recentes podem ser carregadas na inicialização
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model: str,
+        flush_batch_size: int = 32,
+        flush_interval: float = 5.0,
+        timeout: float = 5.0
+    ):
+        self.path = path
+        self.model = model
+        self.flush_batch_size = flush_batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pending: Dict[str, Tuple[str, bytes, int]] = {}
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.time()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+        atexit.register(self.flush)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        self._connection().execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                query TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_embeddings_recent ON query_embeddings (model, updated_at)"
+        )
+
+    def _key(self, normalized_query: str) -> str:
+        return hashlib.sha1(f"{self.model}\x00{normalized_query}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str) -> Optional[array]:
+        """Busca embedding (pendentes deste processo primeiro, depois o arquivo)."""
+        key = self._key(normalize_query(query))
+
+        with self._pending_lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            self._hits += 1
+            return _unpack(pending[1])
+
+        try:
+            row = self._connection().execute(
+                "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Erro lendo cache persistente de embeddings: {e}")
+            return None
+
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return _unpack(row[0])
+
+    def put(self, query: str, embedding: Embedding) -> None:
+        """Agenda gravação do embedding (gravado em lote)."""
+        normalized = normalize_query(query)
+        key = self._key(normalized)
+        with self._pending_lock:
+            self._pending[key] = (normalized, _pack(embedding), len(embedding))
+            should_flush = (
+                len(self._pending) >= self.flush_batch_size
+                or time.time() - self._last_flush >= self.flush_interval
+            )
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Grava entradas pendentes numa única transação."""
+        with self._pending_lock:
+            if not self._pending:
+                self._last_flush = time.time()
+                return 0
+            batch = self._pending
+            self._pending = {}
+            self._last_flush = time.time()
+
+        now = time.time()
+        rows = [
+            (key, self.model, normalized, dim, blob, now)
+            for key, (normalized, blob, dim) in batch.items()
+        ]
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (key, model, query, dim, vector, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+            self._writes += len(rows)
+            logger.debug(f"Cache persistente de embeddings: {len(rows)} entradas gravadas")
+            return len(rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Erro gravando cache persistente de embeddings: {e}")
+            try:
+                self._connection().execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            # Devolve ao buffer para nova tentativa no próximo flush
+            with self._pending_lock:
+                for key, value in batch.items():
+                    self._pending.setdefault(key, value)
+            return 0
+
+    def load_snapshot(self, limit: int = 5000) -> List[Tuple[str, array]]:
+        """Retorna as `limit` entradas mais recentes do modelo: [(query_normalizada, vetor)]."""
+        if limit <= 0:
+            return []
+        try:
+            rows = self._connection().execute(
+                "SELECT query, vector FROM query_embeddings WHERE model = ? "
+                "ORDER BY updated_at DESC LIMIT ?",
+                (self.model, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Erro carregando snapshot de embeddings: {e}")
+            return []
+        return [(query, _unpack(blob)) for query, blob in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache persistente."""
+        lookups = self._hits + self._misses
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "path": self.path,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "writes": self._writes,
+            "pending": pending,
+        }
+
+
+__all__ = ['PersistentEmbeddingCache', 'normalize_query']
@@ -0,0 +1,194 @@
+"""Cache LRU de imagens de página codificadas em base64, limitado por bytes."""
+import os
+import time
+import base64
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Extensão do arquivo pré-codificado gravado ao lado do PNG no momento da indexação
+ENCODED_SUFFIX = ".b64"
+
+
+def encoded_sidecar_path(image_path: str) -> str:
+    """Caminho do arquivo base64 pré-codificado correspondente à imagem."""
+    return f"{image_path}{ENCODED_SUFFIX}"
+
+
+def write_encoded_sidecar(image_path: str) -> Optional[str]:
+    """
+    Grava a versão base64 da imagem ao lado do PNG (usado pelo indexer).
+
+    A escrita é atômica (arquivo temporário + rename) para que leitores
+    concorrentes nunca vejam um arquivo parcial.
+
+    Returns:
+        Caminho do arquivo gravado ou None em caso de erro
+    """
+    sidecar_path = encoded_sidecar_path(image_path)
+    tmp_path = f"{sidecar_path}.tmp"
+    try:
+        with open(image_path, "rb") as f:
+            encoded = base64.b64encode(f.read())
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+        os.replace(tmp_path, sidecar_path)
+        return sidecar_path
+    except Exception as e:
+        logger.warning(f"Erro ao gravar imagem pré-codificada para {image_path}: {e}")
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except OSError:
+            pass
+        return None
+
+
+class ImageCache:
+    """
+    Cache LRU de imagens codificadas em base64.
+
+    - Limite pelo total de bytes das strings armazenadas (não por número de entradas)
+    - Entradas invalidadas quando o PNG muda no disco (mtime/tamanho)
+    - Usa o arquivo `.b64` pré-codificado pelo indexer quando disponível
+    - Thread-safe, com caminho assíncrono que não bloqueia o event loop
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, use_encoded_sidecar: bool = True):
+        """
+        Inicializa o cache.
+
+        Args:
+            max_bytes: Total máximo de bytes de base64 mantidos em memória
+            use_encoded_sidecar: Se deve ler arquivos `.b64` gravados na indexação
+        """
+        self.max_bytes = max_bytes
+        self.use_encoded_sidecar = use_encoded_sidecar
+        self._entries: "OrderedDict[str, Tuple[Tuple[float, int], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._sidecar_reads = 0
+        self._encode_time = 0.0
+
+    def get(self, image_path: str) -> Optional[str]:
+        """Retorna a imagem em base64, usando o cache quando possível."""
+        if not image_path:
+            logger.warning(f"Imagem não encontrada: {image_path}")
+            return None
+
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            logger.warning(f"Imagem não encontrada: {image_path}")
+            return None
+
+        signature = (stat.st_mtime, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(image_path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(image_path)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        # Leitura e codificação fora do lock para não serializar I/O
+        start = time.time()
+        encoded = self._load_encoded(image_path, stat.st_mtime)
+        if encoded is None:
+            return None
+
+        with self._lock:
+            self._encode_time += time.time() - start
+            self._store(image_path, signature, encoded)
+        return encoded
+
+    async def aget(self, image_path: str) -> Optional[str]:
+        """Versão assíncrona de get(): hits em memória não saem do event loop."""
+        with self._lock:
+            entry = self._entries.get(image_path) if image_path else None
+        if entry is not None:
+            # Hit provável: a validação de mtime é um stat barato
+            return self.get(image_path)
+        return await asyncio.to_thread(self.get, image_path)
+
+    def _load_encoded(self, image_path: str, image_mtime: float) -> Optional[str]:
+        """Lê o `.b64` pré-codificado (se atualizado) ou codifica o PNG."""
+        if self.use_encoded_sidecar:
+            sidecar_path = encoded_sidecar_path(image_path)
+            try:
+                if os.stat(sidecar_path).st_mtime >= image_mtime:
+                    with open(sidecar_path, "rb") as f:
+                        encoded = f.read().decode("ascii")
+                    with self._lock:
+                        self._sidecar_reads += 1
+                    return encoded
+            except OSError:
+                pass
+            except Exception as e:
+                logger.debug(f"Arquivo pré-codificado inválido {sidecar_path}: {e}")
+
+        try:
+            with open(image_path, "rb") as f:
+                return base64.b64encode(f.read()).decode("utf-8")
+        except Exception as e:
+            logger.error(f"Erro codificando {image_path}: {e}")
+            return None
+
+    def _store(self, image_path: str, signature: Tuple[float, int], encoded: str) -> None:
+        """Armazena entrada e aplica o limite de bytes (chamar com lock)."""
+        size = len(encoded)
+        if size > self.max_bytes:
+            # Imagem maior que o orçamento inteiro: não cacheia
+            return
+
+        previous = self._entries.pop(image_path, None)
+        if previous is not None:
+            self._current_bytes -= len(previous[1])
+
+        while self._entries and self._current_bytes + size > self.max_bytes:
+            evicted_path, (_, evicted_value) = self._entries.popitem(last=False)
+            self._current_bytes -= len(evicted_value)
+            self._evictions += 1
+            logger.debug(f"Image cache evict: {evicted_path}")
+
+        self._entries[image_path] = (signature, encoded)
+        self._current_bytes += size
+
+    def invalidate(self, image_path: str) -> None:
+        """Remove uma imagem do cache."""
+        with self._lock:
+            entry = self._entries.pop(image_path, None)
+            if entry is not None:
+                self._current_bytes -= len(entry[1])
+
+    def clear(self) -> None:
+        """Limpa todo o cache."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._current_bytes = 0
+        logger.info(f"Image cache limpo: {count} entradas removidas")
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "sidecar_reads": self._sidecar_reads,
+                "encode_time_total": self._encode_time,
+            }
@@ -0,0 +1,128 @@
+"""
+Percentis de latência em memória fixa (histograma de buckets logarítmicos).
+
+Cada valor cai num bucket de largura relativa constante (`growth`), como no
+HDR Histogram: atualização O(1), memória fixa e erro relativo limitado
+(~growth/2) nos percentis. Janelas deslizantes são formadas por fatias de
+tempo (`slot_seconds`) num anel; a leitura soma as fatias da janela.
+
+Sem locks: pensado para acumulação por worker no event loop (as atualizações
+não têm `await`, logo são atômicas em relação às demais corrotinas).
+"""
+
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+class LogHistogram:
+    """
+    Histograma de buckets logarítmicos entre `min_value` e `max_value`.
+
+    Args:
+        min_value: Menor valor distinguível (abaixo vai para o primeiro bucket)
+        max_value: Maior valor distinguível (acima vai para o último bucket)
+        growth: Razão entre limites de buckets consecutivos (1.05 = ~2.5% de erro)
+    """
+
+    def __init__(self, min_value: float = 1e-4, max_value: float = 3600.0, growth: float = 1.05):
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_growth = math.log(growth)
+        self.growth = growth
+        self.num_buckets = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 1
+
+    def new_counts(self) -> List[int]:
+        return [0] * self.num_buckets
+
+    def index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        i = int(math.log(value / self.min_value) / self._log_growth) + 1
+        return i if i < self.num_buckets else self.num_buckets - 1
+
+    def upper_bound(self, index: int) -> float:
+        return self.min_value * self.growth ** index
+
+    def quantiles(self, counts: Sequence[int], qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        """Percentis (média geométrica dos limites do bucket) a partir das contagens."""
+        total = sum(counts)
+        qs = sorted(qs)
+        result: Dict[float, Optional[float]] = {q: None for q in qs}
+        if total == 0:
+            return result
+
+        targets = [(q, max(1, math.ceil(q * total))) for q in qs]
+        cumulative = 0
+        t = 0
+        for i, count in enumerate(counts):
+            if not count:
+                continue
+            cumulative += count
+            while t < len(targets) and cumulative >= targets[t][1]:
+                low = self.upper_bound(i - 1) if i > 0 else 0.0
+                high = self.upper_bound(i)
+                result[targets[t][0]] = math.sqrt(low * high) if low > 0 else high
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+
+class RollingLatency:
+    """
+    Latências em janelas deslizantes: anel de `slots` fatias de `slot_seconds`.
+
+    Cada fatia guarda contagens por bucket, soma e número de observações;
+    fatias vencidas são zeradas preguiçosamente ao serem reutilizadas.
+    """
+
+    def __init__(self, histogram: LogHistogram, slot_seconds: int = 10, slots: int = 30):
+        self.histogram = histogram
+        self.slot_seconds = slot_seconds
+        self.slots = slots
+        self._epochs = [-1] * slots
+        self._counts = [histogram.new_counts() for _ in range(slots)]
+        self._sums = [0.0] * slots
+        self._totals = [0] * slots
+
+    def record(self, value: float, now: Optional[float] = None) -> None:
+        epoch = int((now if now is not None else time.time()) // self.slot_seconds)
+        slot = epoch % self.slots
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = self.histogram.new_counts()
+            self._sums[slot] = 0.0
+            self._totals[slot] = 0
+        self._counts[slot][self.histogram.index(value)] += 1
+        self._sums[slot] += value
+        self._totals[slot] += 1
+
+    def window(self, seconds: int, qs: Sequence[float] = (0.5, 0.9, 0.99),
+               now: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """Contagem, média e percentis dos últimos `seconds` (limitado ao anel)."""
+        current = int((now if now is not None else time.time()) // self.slot_seconds)
+        span = min(self.slots, max(1, math.ceil(seconds / self.slot_seconds)))
+        merged = self.histogram.new_counts()
+        total = 0
+        value_sum = 0.0
+        for epoch in range(current - span + 1, current + 1):
+            slot = epoch % self.slots
+            if self._epochs[slot] != epoch:
+                continue
+            total += self._totals[slot]
+            value_sum += self._sums[slot]
+            for i, count in enumerate(self._counts[slot]):
+                if count:
+                    merged[i] += count
+
+        stats: Dict[str, Optional[float]] = {
+            "count": total,
+            "mean": value_sum / total if total else None,
+        }
+        for q, value in self.histogram.quantiles(merged, qs).items():
+            stats[f"p{round(q * 100):g}"] = value
+        return stats
+
+
+__all__ = ['LogHistogram', 'RollingLatency']
@@ -0,0 +1,248 @@
+"""
+Contabilidade de tokens e custo das chamadas de LLM e embedding.
+
+Os clientes OpenAI e Voyage são instrumentados na criação
+(`instrument_openai` / `instrument_voyage`): cada chamada registra tokens de
+prompt, de saída e do cache de prompts, latência e custo estimado
+(MODEL_PRICING). A etapa é a operação do `track_dependency` ativo
+(ex.: 'generate_answer', 'evaluate_relevance').
+
+Os totais são agregados por etapa e por modelo:
+- no ledger global do processo (`usage_ledger`, exposto em /metrics)
+- no ledger da requisição, quando aberto com `track_usage()` (segue o
+  contexto: `await`, tasks e threads ligadas com `bind_context`)
+"""
+
+import time
+import inspect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from ..core.constants import MODEL_PRICING
+from .prometheus import llm_tokens, llm_cost, current_operation
+
+logger = logging.getLogger(__name__)
+
+UNATTRIBUTED_STAGE = "unattributed"
+
+_request_ledger: contextvars.ContextVar[Optional["UsageLedger"]] = contextvars.ContextVar("rag_usage_ledger", default=None)
+
+
+def _field(obj: Any, name: str) -> Any:
+    """Lê um campo de objeto da API ou de dict."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int = 0,
+                  cached_tokens: int = 0) -> float:
+    """Custo estimado em USD (0.0 para modelos fora de MODEL_PRICING)."""
+    if not model:
+        return 0.0
+    # Prefixo mais longo primeiro (ex.: 'gpt-4.1-mini' antes de 'gpt-4.1')
+    for prefix in sorted(MODEL_PRICING, key=len, reverse=True):
+        if model.startswith(prefix):
+            price = MODEL_PRICING[prefix]
+            uncached = max(0, prompt_tokens - cached_tokens)
+            return (
+                uncached * price['input']
+                + cached_tokens * price.get('cached_input', price['input'])
+                + completion_tokens * price['output']
+            ) / 1_000_000
+    return 0.0
+
+
+def _empty_entry() -> Dict[str, Any]:
+    return {
+        "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+        "total_tokens": 0, "latency_seconds": 0.0, "cost_usd": 0.0
+    }
+
+
+def _rounded(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: round(v, 6) if isinstance(v, float) else v for k, v in entry.items()}
+
+
+def _cache_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    prompt_tokens, cached_tokens = entry["prompt_tokens"], entry["cached_tokens"]
+    return {
+        "calls": entry["calls"],
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "cached_rate": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+    }
+
+
+class UsageLedger:
+    """Totais de uso agregados por etapa e por modelo (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total = _empty_entry()
+        self._by_stage: Dict[str, Dict[str, Any]] = {}
+        self._by_model: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, stage: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+               cached_tokens: int = 0, latency: float = 0.0, cost: float = 0.0) -> None:
+        with self._lock:
+            for entry in (
+                self._total,
+                self._by_stage.setdefault(stage, _empty_entry()),
+                self._by_model.setdefault(model, _empty_entry()),
+            ):
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["cached_tokens"] += cached_tokens
+                entry["total_tokens"] += prompt_tokens + completion_tokens
+                entry["latency_seconds"] += latency
+                entry["cost_usd"] += cost
+
+    def summary(self) -> Dict[str, Any]:
+        """Totais, por etapa (mais cara primeiro) e por modelo."""
+        with self._lock:
+            by_stage = sorted(self._by_stage.items(), key=lambda item: item[1]["cost_usd"], reverse=True)
+            return {
+                **_rounded(self._total),
+                "by_stage": {name: _rounded(entry) for name, entry in by_stage},
+                "by_model": {name: _rounded(entry) for name, entry in self._by_model.items()},
+            }
+
+    def prompt_cache(self) -> Dict[str, Any]:
+        """
+        Aproveitamento do cache de prompts do provedor: tokens de prompt
+        servidos do cache, no total e por etapa (ponto de chamada).
+        """
+        with self._lock:
+            return {
+                **_cache_entry(self._total),
+                "by_call_site": {
+                    name: _cache_entry(entry)
+                    for name, entry in self._by_stage.items()
+                    if entry["prompt_tokens"]
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._total = _empty_entry()
+            self._by_stage.clear()
+            self._by_model.clear()
+
+
+# Ledger global do processo
+usage_ledger = UsageLedger()
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageLedger]:
+    """Abre um ledger para a requisição atual; chamadas feitas no contexto são somadas a ele."""
+    ledger = UsageLedger()
+    token = _request_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _request_ledger.reset(token)
+
+
+def record_usage(provider: str, model: Optional[str], prompt_tokens: int = 0, completion_tokens: int = 0,
+                 cached_tokens: int = 0, latency: float = 0.0, stage: Optional[str] = None) -> float:
+    """
+    Registra uma chamada no ledger global, no da requisição e no Prometheus.
+
+    Returns:
+        Custo estimado (USD)
+    """
+    model = model or "unknown"
+    stage = stage or current_operation() or UNATTRIBUTED_STAGE
+    cost = estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+
+    usage_ledger.record(stage, model, prompt_tokens, completion_tokens, cached_tokens, latency, cost)
+    request_ledger = _request_ledger.get()
+    if request_ledger is not None:
+        request_ledger.record(stage, model, prompt_tokens, completion_tokens, cached_tokens, latency, cost)
+
+    labels = {"provider": provider, "model": model, "stage": stage}
+    for kind, value in (("prompt", prompt_tokens), ("completion", completion_tokens), ("cached", cached_tokens)):
+        if value:
+            llm_tokens.inc(value, kind=kind, **labels)
+    if cost:
+        llm_cost.inc(cost, **labels)
+
+    logger.debug(
+        f"[USAGE] {provider}/{model} {stage}: {prompt_tokens}+{completion_tokens} tokens "
+        f"({cached_tokens} do cache), {latency:.2f}s, ${cost:.6f}"
+    )
+    return cost
+
+
+def _record_chat_completion(model: Optional[str], response: Any, latency: float) -> None:
+    usage = _field(response, "usage")
+    record_usage(
+        "openai",
+        model or _field(response, "model"),
+        prompt_tokens=int(_field(usage, "prompt_tokens") or 0),
+        completion_tokens=int(_field(usage, "completion_tokens") or 0),
+        cached_tokens=int(_field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0),
+        latency=latency,
+    )
+
+
+def _record_embedding(model: Optional[str], result: Any, latency: float) -> None:
+    record_usage("voyage", model, prompt_tokens=int(_field(result, "total_tokens") or 0), latency=latency)
+
+
+def _wrap(original, on_result):
+    """Envolve um método síncrono ou assíncrono registrando o resultado."""
+    if inspect.iscoroutinefunction(original):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = await original(*args, **kwargs)
+            on_result(kwargs.get("model"), result, time.perf_counter() - start)
+            return result
+    else:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = original(*args, **kwargs)
+            if inspect.isawaitable(result):
+                # Métodos assíncronos expostos por decorators síncronos (ex.: AsyncOpenAI)
+                async def finish():
+                    value = await result
+                    on_result(kwargs.get("model"), value, time.perf_counter() - start)
+                    return value
+                return finish()
+            on_result(kwargs.get("model"), result, time.perf_counter() - start)
+            return result
+
+    wrapper.__wrapped__ = original
+    wrapper._usage_instrumented = True
+    return wrapper
+
+
+def instrument_openai(client: Any) -> Any:
+    """Instrumenta `chat.completions.create` (OpenAI ou AsyncOpenAI); idempotente."""
+    completions = client.chat.completions
+    if not getattr(completions.create, "_usage_instrumented", False):
+        completions.create = _wrap(completions.create, _record_chat_completion)
+    return client
+
+
+def instrument_voyage(client: Any) -> Any:
+    """Instrumenta `multimodal_embed`/`embed` (voyageai.Client ou AsyncClient); idempotente."""
+    for method in ("multimodal_embed", "embed"):
+        original = getattr(client, method, None)
+        if original is not None and not getattr(original, "_usage_instrumented", False):
+            setattr(client, method, _wrap(original, _record_embedding))
+    return client
+
+
+__all__ = [
+    'UsageLedger', 'usage_ledger', 'track_usage', 'record_usage', 'estimate_cost',
+    'instrument_openai', 'instrument_voyage'
+]
@@ -12,6 +12,7 @@ from datetime import datetime
 # Importar configuração centralizada
 from ..core.config import SystemConfig
 from ..core.constants import LOGGING_CONFIG, DEV_CONFIG
+from .async_logging import create_log_handlers
 
 
 def setup_production_logging() -> Dict[str, Any]:
@@ -21,10 +22,11 @@ def setup_production_logging() -> Dict[str, Any]:
     Returns:
         Dict com informações da configuração aplicada
     """
+    config = SystemConfig()
     config_info = {
         "configured": False,
         "log_level": LOGGING_CONFIG['DEFAULT_LEVEL'],
-        "async_enabled": LOGGING_CONFIG.get('ASYNC_LOGGING', False),
+        "async_enabled": config.production.async_logging,
         "structured_enabled": LOGGING_CONFIG.get('ENABLE_STRUCTURED_LOGGING', False)
     }
     
@@ -38,33 +40,33 @@ def setup_production_logging() -> Dict[str, Any]:
         else:
             log_format = LOGGING_CONFIG['LOG_FORMAT']
         
-        # Configurar logger raiz
-        logging.basicConfig(
-            level=log_level,
-            format=log_format,
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        formatter = logging.Formatter(log_format, datefmt='%Y-%m-%d %H:%M:%S')
         
-        # Configurar rotação de arquivos se não em debug
-        if not DEV_CONFIG.get('DEBUG_MODE', False):
-            config = SystemConfig()
-            log_dir = config.rag.logs_dir
-            os.makedirs(log_dir, exist_ok=True)
-            
-            # Handler com rotação
-            handler = logging.handlers.RotatingFileHandler(
-                filename=os.path.join(log_dir, 'rag_production.log'),
-                maxBytes=LOGGING_CONFIG['MAX_LOG_FILE_SIZE'] * 1024 * 1024,  # MB para bytes
-                backupCount=LOGGING_CONFIG['LOG_ROTATION_COUNT'],
-                encoding='utf-8'
-            )
+        def build_handlers():
+            handlers = [logging.StreamHandler()]
             
-            # Formatter
-            formatter = logging.Formatter(log_format, datefmt='%Y-%m-%d %H:%M:%S')
-            handler.setFormatter(formatter)
+            # Configurar rotação de arquivos se não em debug
+            if not DEV_CONFIG.get('DEBUG_MODE', False):
+                log_dir = config.rag.logs_dir
+                os.makedirs(log_dir, exist_ok=True)
+                
+                # Handler com rotação
+                handlers.append(logging.handlers.RotatingFileHandler(
+                    filename=os.path.join(log_dir, 'rag_production.log'),
+                    maxBytes=LOGGING_CONFIG['MAX_LOG_FILE_SIZE'] * 1024 * 1024,  # MB para bytes
+                    backupCount=LOGGING_CONFIG['LOG_ROTATION_COUNT'],
+                    encoding='utf-8'
+                ))
             
-            # Adicionar handler ao logger raiz
-            logging.getLogger().addHandler(handler)
+            for handler in handlers:
+                handler.setFormatter(formatter)
+            return handlers
+        
+        # Configurar logger raiz (com ASYNC_LOGGING, via fila + QueueListener)
+        logging.basicConfig(
+            level=log_level,
+            handlers=create_log_handlers("production", build_handlers, config.production.async_logging)
+        )
         
         # Configurar loggers específicos
         configure_module_loggers()
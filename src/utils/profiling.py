@@ -0,0 +1,209 @@
+"""
+Profiling sob demanda por amostragem de pilhas (sem dependências externas).
+
+Uma thread amostra `sys._current_frames()` a cada `interval` segundos e
+acumula as pilhas de todas as threads (event loop e executores) no formato
+"collapsed stacks" do flamegraph.pl / speedscope / inferno:
+
+    MainThread;run (asyncio/runners.py);...;create (openai/_base_client.py) 42
+
+Cada linha é uma pilha (raiz -> folha, prefixada pelo nome da thread) e o
+número de amostras; com a amostragem em tempo de parede, threads ociosas
+aparecem esperando (select/Condition.wait), o que mostra onde a requisição
+aguardou I/O.
+
+A amostragem cobre o processo inteiro: requisições concorrentes aparecem
+juntas no mesmo perfil. Apenas um perfil é capturado por vez.
+"""
+
+import os
+import sys
+import time
+import uuid
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    filename = code.co_filename
+    parent = os.path.basename(os.path.dirname(filename))
+    return f"{name} ({parent}/{os.path.basename(filename)})"
+
+
+class SamplingProfiler:
+    """
+    Amostrador de pilhas de todas as threads do processo.
+
+    Args:
+        interval: Intervalo entre amostras (s)
+        max_seconds: Tempo máximo de amostragem (protege contra perfis esquecidos)
+    """
+
+    def __init__(self, interval: float = 0.005, max_seconds: float = 120.0):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.started_at is not None:
+            self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._stop.wait(self.interval):
+            if time.perf_counter() > deadline:
+                logger.warning(f"⚠️ [PROFILING] Amostragem interrompida após {self.max_seconds:.0f}s")
+                return
+            self._sample(own_id)
+
+    def _sample(self, own_id: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """Pilhas no formato collapsed (uma por linha, mais frequentes primeiro)."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+class RequestProfiler:
+    """
+    Perfis de requisições individuais: pedidos pelo header privilegiado ou
+    armados para as próximas N requisições (`arm`). Mantém os `max_profiles`
+    mais recentes em memória.
+    """
+
+    def __init__(self, interval: float = 0.005, max_seconds: float = 120.0, max_profiles: int = 20):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._active = False
+        self._armed = 0
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.skipped_busy = 0
+
+    def arm(self, count: int) -> int:
+        """Perfila as próximas `count` requisições (0 desarma); retorna o total armado."""
+        with self._lock:
+            self._armed = max(0, count)
+            return self._armed
+
+    @property
+    def armed(self) -> int:
+        return self._armed
+
+    def begin(self, requested: bool = False) -> Optional[SamplingProfiler]:
+        """
+        Inicia um perfil se pedido (header) ou armado; None se não for o caso
+        ou se outro perfil já estiver em andamento.
+        """
+        with self._lock:
+            if not requested and self._armed <= 0:
+                return None
+            if self._active:
+                self.skipped_busy += 1
+                return None
+            if not requested:
+                self._armed -= 1
+            self._active = True
+        return SamplingProfiler(self.interval, self.max_seconds).start()
+
+    def finish(self, profiler: SamplingProfiler, **info: Any) -> str:
+        """Encerra a amostragem, guarda o perfil e retorna seu ID."""
+        profiler.stop()
+        profile_id = uuid.uuid4().hex[:12]
+        profile = {
+            "profile_id": profile_id,
+            "created_at": datetime.utcnow().isoformat(),
+            "duration_seconds": round(profiler.duration, 3),
+            "samples": profiler.samples,
+            "interval_ms": round(self.interval * 1000, 2),
+            "collapsed": profiler.collapsed(),
+            **info,
+        }
+        with self._lock:
+            self._active = False
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        logger.info(
+            f"🔬 [PROFILING] Perfil {profile_id}: {profiler.samples} amostras em {profiler.duration:.2f}s"
+        )
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Resumo dos perfis guardados (mais recentes primeiro), sem as pilhas."""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [
+            {k: v for k, v in profile.items() if k != "collapsed"}
+            for profile in reversed(profiles)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "armed": self._armed,
+            "stored_profiles": len(self._profiles),
+            "skipped_busy": self.skipped_busy,
+        }
+
+
+_request_profiler: Optional[RequestProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_request_profiler() -> RequestProfiler:
+    """Profiler global do processo, criado a partir do SystemConfig no primeiro uso."""
+    global _request_profiler
+    if _request_profiler is None:
+        with _profiler_lock:
+            if _request_profiler is None:
+                from ..core.config import SystemConfig
+
+                production = SystemConfig().production
+                _request_profiler = RequestProfiler(
+                    interval=max(1, production.profiling_sample_interval_ms) / 1000,
+                    max_seconds=production.profiling_max_seconds,
+                    max_profiles=production.profiling_max_profiles,
+                )
+    return _request_profiler
+
+
+__all__ = ['SamplingProfiler', 'RequestProfiler', 'get_request_profiler']
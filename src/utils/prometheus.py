@@ -0,0 +1,378 @@
+"""
+Registro de métricas no formato de exposição de texto do Prometheus.
+
+Implementação enxuta (sem dependência de prometheus_client): contadores,
+gauges e histogramas com labels, mais coletores chamados no momento do
+scrape para valores derivados (taxas de acerto de cache, execuções em
+andamento). Cada processo (worker) mantém seu próprio registro.
+"""
+
+import math
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .tracing import start_span, SPAN_KIND_CLIENT
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets de latência (segundos): de 5 ms a 2 min
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base: nome, ajuda, nomes de labels e valores por combinação de labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Labels de '{self.name}' devem ser {self.labelnames}, recebido {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    @property
+    def family_name(self) -> str:
+        return self.name
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    @property
+    def family_name(self) -> str:
+        # Formato de texto 0.0.4: o nome da família é o da amostra (sufixo _total)
+        return f"{self.name}_total"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(f"{self.name}_total", self._labels(k), v) for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self._labels(k), v) for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de labels: [contagem por bucket..., soma, contagem total]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        out: List[Sample] = []
+        for key, state in items:
+            labels = self._labels(key)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                out.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            out.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, state[-1]))
+            out.append((f"{self.name}_sum", labels, state[-2]))
+            out.append((f"{self.name}_count", labels, state[-1]))
+        return out
+
+
+# Coletor: função chamada no scrape que retorna [(nome, tipo, ajuda, [(labels, valor)])]
+Collector = Callable[[], Iterable[Tuple[str, str, str, Iterable[Tuple[Dict[str, str], float]]]]]
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo com renderização no formato Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Collector] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Registra (ou substitui) um coletor chamado a cada scrape."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.family_name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.family_name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector_name, collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning(f"[METRICS] Coletor '{collector_name}' falhou: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Registro global do processo
+registry = MetricsRegistry()
+
+# Métricas compartilhadas pela API e pelo pipeline RAG
+http_request_duration = registry.histogram(
+    "rag_http_request_duration_seconds", "Latência das requisições HTTP por rota", ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge(
+    "rag_http_requests_in_flight", "Requisições HTTP em andamento", ("method",)
+)
+pipeline_stage_duration = registry.histogram(
+    "rag_pipeline_stage_duration_seconds", "Latência de cada etapa do pipeline RAG", ("stage",)
+)
+dependency_calls = registry.counter(
+    "rag_dependency_calls", "Chamadas a dependências externas", ("dependency", "operation", "outcome")
+)
+dependency_duration = registry.histogram(
+    "rag_dependency_call_duration_seconds", "Latência das chamadas a dependências externas",
+    ("dependency", "operation")
+)
+
+llm_tokens = registry.counter(
+    "rag_llm_tokens", "Tokens consumidos em chamadas de LLM e embedding",
+    ("provider", "model", "stage", "kind")
+)
+llm_cost = registry.counter(
+    "rag_llm_cost_usd", "Custo estimado (USD) das chamadas de LLM e embedding", ("provider", "model", "stage")
+)
+
+# Operação (etapa) da chamada externa em andamento, lida pela contabilidade de uso
+_current_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("rag_dependency_operation", default=None)
+
+
+def current_operation() -> Optional[str]:
+    """Operação do `track_dependency` mais interno ativo (None fora de um)."""
+    return _current_operation.get()
+
+
+@contextmanager
+def track_dependency(dependency: str, operation: str) -> Iterator[None]:
+    """Conta, cronometra e registra em span uma chamada externa (voyage, openai, astra)."""
+    start = time.perf_counter()
+    outcome = "success"
+    token = _current_operation.set(operation)
+    try:
+        with start_span(f"{dependency}.{operation}", kind=SPAN_KIND_CLIENT,
+                        **{"peer.service": dependency, "operation": operation}):
+            yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        _current_operation.reset(token)
+        dependency_duration.observe(time.perf_counter() - start, dependency=dependency, operation=operation)
+        dependency_calls.inc(dependency=dependency, operation=operation, outcome=outcome)
+
+
+def cache_collector(caches: Callable[[], Dict[str, Optional[Dict]]]) -> Collector:
+    """
+    Coletor de taxa de acerto a partir de `stats()` de caches.
+
+    `caches` retorna {nome: stats}; usa as chaves hits/misses (ou hit_rate).
+    """
+    def collect():
+        hits, misses, ratio = [], [], []
+        for name, stats in caches().items():
+            if not stats:
+                continue
+            # Cache em dois níveis: usa as estatísticas do L1 e expõe o L2 à parte
+            tiers = {name: stats} if "l1" not in stats else {name: stats["l1"], f"{name}_l2": stats["l2"]}
+            for cache_name, tier in tiers.items():
+                labels = {"cache": cache_name}
+                if "hits" in tier:
+                    hits.append((labels, tier["hits"]))
+                if "misses" in tier:
+                    misses.append((labels, tier["misses"]))
+                if "hit_rate" in tier:
+                    ratio.append((labels, tier["hit_rate"]))
+        return [
+            ("rag_cache_hits_total", "counter", "Acertos de cache", hits),
+            ("rag_cache_misses_total", "counter", "Falhas de cache", misses),
+            ("rag_cache_hit_ratio", "gauge", "Taxa de acerto de cache", ratio),
+        ]
+    return collect
+
+
+_flight_sources: Dict[str, Callable[[], Dict]] = {}
+_flight_lock = threading.Lock()
+
+
+def register_flight_stats(name: str, stats_fn: Callable[[], Dict]) -> None:
+    """Expõe execuções em andamento e coalescidas de um SingleFlight (via `stats()`)."""
+    with _flight_lock:
+        _flight_sources[name] = stats_fn
+
+
+def _collect_flights():
+    with _flight_lock:
+        sources = list(_flight_sources.items())
+    in_flight, coalesced = [], []
+    for name, stats_fn in sources:
+        stats = stats_fn()
+        in_flight.append(({"flight": name}, stats["in_flight"]))
+        coalesced.append(({"flight": name}, stats["coalesced"]))
+    return [
+        ("rag_single_flight_in_flight", "gauge", "Execuções coalescíveis em andamento", in_flight),
+        ("rag_single_flight_coalesced_total", "counter", "Chamadas atendidas por execução em andamento", coalesced),
+    ]
+
+
+registry.register_collector("single_flight", _collect_flights)
+
+
+def relevance_gate_collector(stats_fn: Callable[[], Dict]) -> Collector:
+    """
+    Coletor das decisões do gate de relevância (via `RelevanceGate.stats()`):
+    aceitas/rejeitadas sem LLM, verificadas pelo LLM e conferências por
+    amostragem (shadow) com as concordâncias.
+    """
+    def collect():
+        stats = stats_fn()
+        decisions = [
+            ({"decision": "accept"}, stats["accepted_without_llm"]),
+            ({"decision": "reject"}, stats["rejected_without_llm"]),
+            ({"decision": "verify"}, stats["llm_verifications"]),
+        ]
+        return [
+            ("rag_relevance_gate_decisions_total", "counter", "Decisões do gate de relevância", decisions),
+            ("rag_relevance_gate_shadow_checks_total", "counter",
+             "Decisões sem LLM conferidas pelo LLM (amostragem)", [({}, stats["shadow_checks"])]),
+            ("rag_relevance_gate_shadow_agreements_total", "counter",
+             "Conferências em que o LLM concordou com o gate", [({}, stats["shadow_agreements"])]),
+        ]
+    return collect
+
+
+__all__ = [
+    'MetricsRegistry', 'Counter', 'Gauge', 'Histogram', 'registry', 'CONTENT_TYPE',
+    'LATENCY_BUCKETS', 'http_request_duration', 'http_requests_in_flight',
+    'pipeline_stage_duration', 'dependency_calls', 'dependency_duration',
+    'llm_tokens', 'llm_cost', 'track_dependency', 'current_operation',
+    'cache_collector', 'register_flight_stats', 'relevance_gate_collector'
+]
@@ -0,0 +1,192 @@
+"""
+Coalescência de requisições idênticas em andamento (single-flight).
+
+Quando a mesma pergunta chega várias vezes ao mesmo tempo (refresh de
+dashboard, tempestade de retries), apenas a primeira chamada executa o
+pipeline; as duplicatas concorrentes aguardam e recebem o mesmo resultado
+(ou a mesma exceção). Nada é guardado depois que a execução termina.
+"""
+
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .embedding_store import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+def make_flight_key(query: str, **options: Any) -> str:
+    """Chave de coalescência: query normalizada (sem caixa) + opções que alteram o resultado."""
+    payload = json.dumps(
+        {"q": normalize_query(query).lower(), "o": options},
+        sort_keys=True, default=str, ensure_ascii=False
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """Execução em andamento compartilhada pelas chamadas síncronas."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _AsyncCall:
+    """Execução assíncrona em andamento: task destacada + duplicatas aguardando."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave numa única execução.
+
+    - `do(key, fn)`: para código síncrono (threads)
+    - `ado(key, coro_fn)`: para código assíncrono (mesmo event loop)
+
+    Args:
+        name: Nome usado em logs e estatísticas
+        wait_timeout: Tempo máximo (s) que uma duplicata aguarda a execução líder
+        enabled: Se desabilitado, todas as chamadas executam normalmente
+    """
+
+    def __init__(self, name: str, wait_timeout: Optional[float] = None, enabled: bool = True):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, _AsyncCall] = {}
+        self._calls_total = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._timeouts = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Executa `fn` ou aguarda a execução em andamento com a mesma chave."""
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            self._calls_total += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+
+        if not leader:
+            logger.debug(f"[SINGLE-FLIGHT] {self.name}: aguardando execução em andamento")
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self._timeouts += 1
+                logger.warning(f"[SINGLE-FLIGHT] {self.name}: espera excedeu {self.wait_timeout}s, executando")
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+            if call.waiters:
+                logger.info(f"[SINGLE-FLIGHT] {self.name}: {call.waiters} chamadas duplicadas atendidas por uma execução")
+
+    async def ado(self, key: str, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Versão assíncrona de `do`.
+
+        A execução roda numa task destacada que o líder e as duplicatas aguardam
+        via `shield`: cancelar qualquer um deles (cliente desconectou, timeout
+        externo) não cancela os demais. A task só é cancelada quando o líder é
+        cancelado sem nenhuma duplicata aguardando.
+        """
+        if not self.enabled:
+            return await coro_fn()
+
+        with self._lock:
+            self._calls_total += 1
+            call = self._async_calls.get(key)
+            leader = call is None
+            if leader:
+                call = _AsyncCall(asyncio.get_running_loop().create_task(coro_fn()))
+                self._async_calls[key] = call
+                self._executions += 1
+                call.task.add_done_callback(lambda task: self._finish_async(key, call))
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+
+        if not leader:
+            logger.debug(f"[SINGLE-FLIGHT] {self.name}: aguardando execução em andamento")
+            try:
+                return await asyncio.wait_for(asyncio.shield(call.task), self.wait_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._timeouts += 1
+                logger.warning(f"[SINGLE-FLIGHT] {self.name}: espera excedeu {self.wait_timeout}s, executando")
+                return await coro_fn()
+            finally:
+                with self._lock:
+                    call.waiters -= 1
+
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                orphan = call.waiters == 0 and not call.task.done()
+                if orphan:
+                    # Ninguém mais aguarda: libera a chave e interrompe a execução
+                    self._async_calls.pop(key, None)
+            if orphan:
+                call.task.cancel()
+            raise
+
+    def _finish_async(self, key: str, call: _AsyncCall) -> None:
+        """Libera a chave ao fim da task e consome a exceção (evita aviso de não recuperada)."""
+        with self._lock:
+            if self._async_calls.get(key) is call:
+                self._async_calls.pop(key, None)
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de coalescência."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "enabled": self.enabled,
+                "calls": self._calls_total,
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "coalesced_rate": self._coalesced / self._calls_total if self._calls_total else 0.0,
+                "wait_timeouts": self._timeouts,
+                "in_flight": len(self._calls) + len(self._async_calls),
+            }
+
+
+__all__ = ['SingleFlight', 'make_flight_key']
@@ -0,0 +1,421 @@
+"""
+Cache em dois níveis: L1 em memória (por processo) + L2 compartilhado.
+
+- L1: SimpleCache (LRU + TTL), rápido e local ao worker
+- L2: SQLite em modo WAL (arquivo local, compartilhado pelos workers da
+  máquina) ou Redis (compartilhado entre nós); sobrevive a reinícios
+- Leitura: L1 -> L2; um hit no L2 é promovido ao L1 mantendo a idade original
+- Escrita: write-through (L1 e L2)
+- Geração do índice: caches cujo valor depende do conteúdo indexado
+  (respostas) incluem `get_index_generation()` na chave; indexar ou deletar
+  documentos chama `bump_index_generation()` e invalida essas entradas em
+  todos os workers, inclusive as persistidas no L2
+
+Valores são serializados em JSON (strings, números, listas e dicts).
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .cache import SimpleCache
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCacheBackend:
+    """
+    L2 em arquivo SQLite (WAL), compartilhado por todos os workers da máquina.
+
+    Entradas por namespace, limitadas a `max_entries` (as menos acessadas são
+    removidas numa poda periódica, não a cada escrita).
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 5000, timeout: float = 5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (namespace, accessed_at)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, ttl: int) -> Optional[Tuple[Any, float]]:
+        """Retorna (valor, created_at) ou None se ausente/expirado."""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if now - row[1] > ttl:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+            return None
+
+        conn.execute(
+            "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, namespace, key)
+        )
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: int) -> None:
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), now, now)
+        )
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.PRUNE_EVERY == 0
+        if should_prune:
+            self.prune(namespace)
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def clear(self, namespace: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def prune(self, namespace: str) -> int:
+        """Mantém apenas as `max_entries` entradas mais recentemente acessadas."""
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key NOT IN ("
+            "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT ?)",
+            (namespace, namespace, self.max_entries)
+        )
+        if cursor.rowcount:
+            logger.debug(f"Cache L2 '{namespace}': {cursor.rowcount} entradas podadas")
+        return cursor.rowcount
+
+    def size(self, namespace: str) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+
+class RedisCacheBackend:
+    """
+    L2 em Redis, compartilhado entre nós.
+
+    A expiração usa o TTL nativo do Redis; o limite de tamanho fica a cargo
+    da política de memória do servidor (maxmemory-policy). Aceita um cliente
+    já construído (qualquer implementação compatível com o protocolo Redis).
+    """
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 5.0,
+                 prefix: str = "rag:cache", client: Any = None):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("Pacote redis não instalado")
+            client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str, ttl: int) -> Optional[Tuple[Any, float]]:
+        raw = self.client.get(self._key(namespace, key))
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        if time.time() - payload["created_at"] > ttl:
+            return None
+        return payload["value"], payload["created_at"]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: int) -> None:
+        payload = json.dumps({"value": value, "created_at": time.time()})
+        self.client.set(self._key(namespace, key), payload, ex=max(1, int(ttl)))
+
+    def delete(self, namespace: str, key: str) -> None:
+        self.client.delete(self._key(namespace, key))
+
+    def clear(self, namespace: str) -> None:
+        keys = list(self.client.scan_iter(match=self._key(namespace, "*")))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self, namespace: str) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self._key(namespace, "*")))
+
+
+class TieredCache:
+    """
+    Cache L1 (memória) + L2 (SQLite/Redis) com a mesma interface do SimpleCache.
+
+    Falhas do L2 nunca propagam: o cache degrada para apenas L1.
+
+    Args:
+        namespace: Separa caches diferentes no mesmo L2
+        l1: Cache em memória do processo
+        l2: Backend compartilhado (SQLiteCacheBackend ou RedisCacheBackend)
+    """
+
+    def __init__(self, namespace: str, l1: SimpleCache, l2: Any):
+        self.namespace = namespace
+        self.l1 = l1
+        self.l2 = l2
+        self.max_size = l1.max_size
+        self.default_ttl = l1.default_ttl
+        self._lock = threading.Lock()
+        self._l2_hits = 0
+        self._l2_misses = 0
+        self._l2_errors = 0
+
+    def _create_key(self, *args, **kwargs) -> str:
+        return self.l1._create_key(*args, **kwargs)
+
+    def _record(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: str, ttl: Optional[int] = None) -> Optional[Any]:
+        value = self.l1.get(key, ttl)
+        if value is not None:
+            return value
+
+        effective_ttl = ttl if ttl is not None else self.default_ttl
+        try:
+            found = self.l2.get(self.namespace, key, effective_ttl)
+        except Exception as e:
+            self._record("_l2_errors")
+            logger.warning(f"Cache L2 '{self.namespace}' indisponível na leitura: {e}")
+            return None
+
+        if found is None:
+            self._record("_l2_misses")
+            return None
+
+        # Promove ao L1 mantendo a idade original (o TTL não recomeça)
+        value, created_at = found
+        self._record("_l2_hits")
+        self.l1.set(key, value, timestamp=created_at)
+        return value
+
+    def contains(self, key: str, ttl: Optional[int] = None) -> bool:
+        """Verifica apenas o L1 (sem I/O)."""
+        return self.l1.contains(key, ttl)
+
+    def __contains__(self, key: str) -> bool:
+        return self.contains(key)
+
+    def __len__(self) -> int:
+        return len(self.l1)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Write-through; `ttl` é a retenção no L2 (padrão: default_ttl)."""
+        self.l1.set(key, value)
+        try:
+            self.l2.set(self.namespace, key, value, ttl if ttl is not None else self.default_ttl)
+        except Exception as e:
+            self._record("_l2_errors")
+            logger.warning(f"Cache L2 '{self.namespace}' indisponível na escrita: {e}")
+
+    def delete(self, key: str) -> bool:
+        existed = self.l1.delete(key)
+        try:
+            self.l2.delete(self.namespace, key)
+        except Exception as e:
+            self._record("_l2_errors")
+            logger.warning(f"Cache L2 '{self.namespace}' indisponível na remoção: {e}")
+        return existed
+
+    def clear(self) -> None:
+        self.l1.clear()
+        try:
+            self.l2.clear(self.namespace)
+        except Exception as e:
+            self._record("_l2_errors")
+            logger.warning(f"Cache L2 '{self.namespace}' indisponível na limpeza: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            l2_lookups = self._l2_hits + self._l2_misses
+            l2 = {
+                "backend": type(self.l2).__name__,
+                "hits": self._l2_hits,
+                "misses": self._l2_misses,
+                "hit_rate": self._l2_hits / l2_lookups if l2_lookups else 0.0,
+                "errors": self._l2_errors,
+            }
+        return {"namespace": self.namespace, "l1": self.l1.stats(), "l2": l2}
+
+
+def create_l2_backend(backend: str, path: str, url: Optional[str] = None,
+                      max_entries: int = 5000, timeout: float = 5.0) -> Optional[Any]:
+    """
+    Cria o backend L2 configurado ('sqlite', 'redis' ou 'none').
+
+    Returns:
+        Backend ou None (desabilitado ou indisponível: os caches ficam só em L1)
+    """
+    backend = (backend or "none").lower()
+    try:
+        if backend == "sqlite":
+            return SQLiteCacheBackend(path, max_entries=max_entries, timeout=timeout)
+        if backend == "redis":
+            return RedisCacheBackend(url, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"⚠️ Cache L2 '{backend}' indisponível, usando apenas memória: {e}")
+        return None
+    if backend != "none":
+        logger.warning(f"⚠️ Backend de cache L2 desconhecido: '{backend}'")
+    return None
+
+
+_shared_l2: Any = None
+_shared_l2_ready = False
+_global_cache: Optional[Any] = None
+_shared_lock = threading.Lock()
+
+# Geração do índice, guardada no L2 para ser vista por todos os workers
+INDEX_NAMESPACE = "index"
+INDEX_DEPENDENT_NAMESPACES = ("response",)
+_GENERATION_KEY = "generation"
+_GENERATION_TTL = 10 * 365 * 24 * 3600
+_local_generation = "0"
+
+
+def get_shared_l2() -> Optional[Any]:
+    """Backend L2 do processo (MemoryConfig), criado no primeiro uso e compartilhado pelos caches."""
+    global _shared_l2, _shared_l2_ready
+    if not _shared_l2_ready:
+        with _shared_lock:
+            if not _shared_l2_ready:
+                from ..core.config import SystemConfig
+
+                memory = SystemConfig().memory
+                _shared_l2 = create_l2_backend(
+                    memory.l2_cache_backend,
+                    memory.l2_cache_path,
+                    url=memory.l2_cache_url,
+                    max_entries=memory.l2_cache_max_size,
+                    timeout=memory.l2_cache_timeout
+                )
+                _shared_l2_ready = True
+    return _shared_l2
+
+
+def create_cache(namespace: str, max_size: int, default_ttl: int):
+    """Cache L1 em memória (limitado por L1_CACHE_MAX_SIZE) + L2 compartilhado, se configurado."""
+    from ..core.config import SystemConfig
+
+    l1 = SimpleCache(max_size=min(max_size, SystemConfig().memory.l1_cache_max_size), default_ttl=default_ttl)
+    l2 = get_shared_l2()
+    return TieredCache(namespace, l1, l2) if l2 is not None else l1
+
+
+def get_global_cache():
+    """
+    Cache 'global' de uso geral (GLOBAL_CACHE_SIZE / GLOBAL_CACHE_TTL) no L2
+    compartilhado: resultados memoizados que valem para todos os workers.
+    """
+    global _global_cache
+    if _global_cache is None:
+        from ..core.config import SystemConfig
+
+        memory = SystemConfig().memory
+        cache = create_cache("global", memory.global_cache_size, memory.global_cache_ttl)
+        with _shared_lock:
+            if _global_cache is None:
+                _global_cache = cache
+    return _global_cache
+
+
+def get_index_generation() -> str:
+    """
+    Geração atual do conteúdo indexado (lida do L2 compartilhado; sem L2,
+    vale a geração local do processo).
+    """
+    l2 = get_shared_l2()
+    if l2 is not None:
+        try:
+            found = l2.get(INDEX_NAMESPACE, _GENERATION_KEY, _GENERATION_TTL)
+            return found[0] if found is not None else "0"
+        except Exception as e:
+            logger.warning(f"Cache L2 indisponível ao ler a geração do índice: {e}")
+    return _local_generation
+
+
+def bump_index_generation() -> str:
+    """
+    Inicia uma nova geração do índice (após indexar ou deletar documentos).
+
+    Entradas com a geração anterior na chave deixam de ser encontradas em
+    todos os workers; os namespaces de INDEX_DEPENDENT_NAMESPACES são
+    esvaziados no L2 para liberar o espaço.
+
+    Returns:
+        Nova geração
+    """
+    global _local_generation
+    generation = uuid.uuid4().hex[:12]
+    _local_generation = generation
+
+    l2 = get_shared_l2()
+    if l2 is not None:
+        try:
+            l2.set(INDEX_NAMESPACE, _GENERATION_KEY, generation, _GENERATION_TTL)
+            for namespace in INDEX_DEPENDENT_NAMESPACES:
+                l2.clear(namespace)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache L2 indisponível ao invalidar a geração do índice: {e}")
+
+    logger.info(f"🔄 Nova geração do índice: {generation} (caches de respostas invalidados)")
+    return generation
+
+
+__all__ = [
+    'TieredCache', 'SQLiteCacheBackend', 'RedisCacheBackend',
+    'create_l2_backend', 'get_shared_l2', 'create_cache', 'get_global_cache',
+    'get_index_generation', 'bump_index_generation', 'INDEX_DEPENDENT_NAMESPACES', 'REDIS_AVAILABLE'
+]
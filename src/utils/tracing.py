@@ -0,0 +1,456 @@
+"""
+Tracing por spans com exportação OTLP/JSON.
+
+Cada requisição abre um span raiz (middleware HTTP) e cada etapa, subagente,
+ferramenta e chamada externa abre um span filho. O span atual é propagado por
+`contextvars`: segue automaticamente `await`, `asyncio.gather` e
+`asyncio.to_thread`; para executores de threads use `bind_context`.
+
+Todo span herda o `request_id` do span pai (atributo `request.id`), então os
+spans de uma requisição podem ser filtrados mesmo fora do mesmo trace.
+
+Exportação em lote numa thread de fundo, no formato OTLP/JSON
+(`ExportTraceServiceRequest`):
+- 'file': uma linha JSON por lote (compatível com o file exporter do Collector)
+- 'otlp': POST em um coletor OTLP/HTTP (ex.: http://localhost:4318/v1/traces)
+- 'none': tracing desabilitado (spans viram no-op)
+
+`collect_spans()` guarda os spans concluídos no contexto (mesmo sem
+exportador), para o tempo por etapa de uma requisição.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import inspect
+import secrets
+import logging
+import functools
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tipos de span do OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("rag_current_span", default=None)
+_span_collector: contextvars.ContextVar[Optional[List["Span"]]] = contextvars.ContextVar("rag_span_collector", default=None)
+
+
+class Span:
+    """Span em andamento ou concluído (tempos em nanossegundos desde a época)."""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_span_id", "kind", "request_id",
+        "start_ns", "end_ns", "attributes", "status_code", "status_message"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 kind: int = SPAN_KIND_INTERNAL, request_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.request_id = request_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        if request_id:
+            self.attributes["request.id"] = request_id
+        self.status_code = 0
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_name(self, name: str) -> None:
+        self.name = name
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status_code = _STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+        self.attributes["exception.type"] = type(exc).__name__
+
+    @property
+    def duration(self) -> float:
+        """Duração em segundos (até agora, se ainda aberto)."""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    @property
+    def traceparent(self) -> str:
+        """Cabeçalho W3C `traceparent` para propagar o contexto."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        "status": {"code": span.status_code, "message": span.status_message} if span.status_code else {"code": span.status_code},
+    }
+    if span.parent_span_id:
+        encoded["parentSpanId"] = span.parent_span_id
+    return encoded
+
+
+def encode_spans(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Lote de spans no formato OTLP/JSON (`ExportTraceServiceRequest`)."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": service_name}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "rag.tracing"},
+                "spans": [_otlp_span(span) for span in spans],
+            }],
+        }]
+    }
+
+
+class OTLPFileExporter:
+    """Anexa cada lote como uma linha JSON; rotaciona ao atingir `max_bytes`."""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class OTLPHttpExporter:
+    """Envia cada lote a um coletor OTLP/HTTP (JSON)."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    """
+    Cria spans e os exporta em lote numa thread de fundo.
+
+    A fila é limitada: se o exportador não acompanhar, spans são descartados
+    (contados em `dropped_spans`) em vez de bloquear as requisições.
+
+    Args:
+        service_name: Valor de `service.name` no recurso OTLP
+        exporter: OTLPFileExporter/OTLPHttpExporter (None desabilita)
+        max_queue: Spans pendentes aceitos
+        max_batch: Spans por lote exportado
+        export_interval: Intervalo máximo (s) entre exportações
+    """
+
+    def __init__(self, service_name: str = "rag", exporter: Any = None, max_queue: int = 10000,
+                 max_batch: int = 512, export_interval: float = 2.0):
+        self.service_name = service_name
+        self.exporter = exporter
+        self.enabled = exporter is not None
+        self.max_batch = max_batch
+        self.export_interval = export_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._flush_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self.exported_spans = 0
+        self.dropped_spans = 0
+        self.export_errors = 0
+
+    # ------------------------------------------------------------------
+    # Criação de spans
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, request_id: Optional[str] = None,
+                   traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        Abre um span filho do span atual (ou raiz, se não houver).
+
+        Args:
+            name: Nome do span (ex.: 'lead_researcher.plan', 'openai.generate_answer')
+            kind: SPAN_KIND_INTERNAL, SPAN_KIND_SERVER ou SPAN_KIND_CLIENT
+            request_id: ID da requisição (herdado do pai quando omitido)
+            traceparent: Cabeçalho W3C de entrada (apenas para spans raiz)
+            **attributes: Atributos do span (valores None são ignorados)
+
+        Yields:
+            Span aberto, ou None com o tracing desabilitado (e fora de `collect_spans`)
+        """
+        if not self.enabled and _span_collector.get() is None:
+            yield None
+            return
+
+        parent = _current_span.get()
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+            request_id = request_id or parent.request_id
+        else:
+            trace_id, parent_id = _parse_traceparent(traceparent) or (secrets.token_hex(16), None)
+
+        span = Span(name, trace_id, parent_id, kind, request_id,
+                    {k: v for k, v in attributes.items() if v is not None})
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        collector = _span_collector.get()
+        if collector is not None:
+            collector.append(span)
+        if not self.enabled:
+            return
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped_spans += 1
+            return
+        self._ensure_worker()
+        if self._queue.qsize() >= self.max_batch:
+            self._flush_event.set()
+
+    # ------------------------------------------------------------------
+    # Exportação
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            self._flush_event.wait(self.export_interval)
+            self._flush_event.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Exporta os spans pendentes; retorna quantos foram exportados."""
+        exported = 0
+        while True:
+            batch: List[Span] = []
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return exported
+            try:
+                self.exporter.export(encode_spans(batch, self.service_name))
+                self.exported_spans += len(batch)
+                exported += len(batch)
+            except Exception as e:
+                self.export_errors += 1
+                logger.warning(f"[TRACING] Falha ao exportar {len(batch)} spans: {e}")
+                return exported
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "exporter": type(self.exporter).__name__ if self.exporter else None,
+            "pending_spans": self._queue.qsize(),
+            "exported_spans": self.exported_spans,
+            "dropped_spans": self.dropped_spans,
+            "export_errors": self.export_errors,
+        }
+
+
+def _parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """(trace_id, parent_span_id) de um cabeçalho W3C válido, senão None."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2]
+
+
+def create_tracer(exporter: str, service_name: str = "rag", file_path: Optional[str] = None,
+                  endpoint: Optional[str] = None, timeout: float = 5.0,
+                  max_file_bytes: int = 50 * 1024 * 1024) -> Tracer:
+    """Cria o tracer para o exportador configurado ('file', 'otlp' ou 'none')."""
+    exporter = (exporter or "none").lower()
+    if exporter == "file" and file_path:
+        return Tracer(service_name, OTLPFileExporter(file_path, max_bytes=max_file_bytes))
+    if exporter == "otlp" and endpoint:
+        return Tracer(service_name, OTLPHttpExporter(endpoint, timeout=timeout))
+    if exporter != "none":
+        logger.warning(f"⚠️ Exportador de tracing inválido ou incompleto: '{exporter}' (tracing desabilitado)")
+    return Tracer(service_name, None)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Tracer global do processo, criado a partir do SystemConfig no primeiro uso."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                from ..core.config import SystemConfig
+
+                config = SystemConfig()
+                production = config.production
+                file_path = production.tracing_file
+                if file_path and not os.path.isabs(file_path):
+                    file_path = os.path.join(config.rag.logs_dir, file_path)
+                _tracer = create_tracer(
+                    production.tracing_exporter if production.tracing_enabled else "none",
+                    service_name=production.tracing_service_name,
+                    file_path=file_path,
+                    endpoint=production.tracing_endpoint,
+                    timeout=production.tracing_timeout,
+                    max_file_bytes=production.max_log_file_size * 1024 * 1024,
+                )
+                if _tracer.enabled:
+                    atexit.register(_tracer.flush)
+    return _tracer
+
+
+def start_span(name: str, **kwargs: Any):
+    """Atalho para `get_tracer().start_span`."""
+    return get_tracer().start_span(name, **kwargs)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def collect_spans() -> Iterator[List[Span]]:
+    """
+    Coleta os spans concluídos no contexto atual (inclusive tasks e threads
+    ligadas com `bind_context`), com ou sem exportador configurado.
+    """
+    spans: List[Span] = []
+    token = _span_collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _span_collector.reset(token)
+
+
+def stage_breakdown(spans: List[Span], limit: int = 15) -> List[Dict[str, Any]]:
+    """Tempo por etapa (nome do span): chamadas, total e máximo, mais lentas primeiro."""
+    stages: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        entry = stages.setdefault(span.name, {"stage": span.name, "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        entry["calls"] += 1
+        entry["total_seconds"] += span.duration
+        entry["max_seconds"] = max(entry["max_seconds"], span.duration)
+    ordered = sorted(stages.values(), key=lambda entry: entry["total_seconds"], reverse=True)[:limit]
+    for entry in ordered:
+        entry["total_seconds"] = round(entry["total_seconds"], 3)
+        entry["max_seconds"] = round(entry["max_seconds"], 3)
+    return ordered
+
+
+def traced(name: Optional[str] = None, **attributes: Any) -> Callable:
+    """Decorator que envolve a função (síncrona ou assíncrona) em um span."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_context(func: Callable) -> Callable:
+    """
+    Liga `func` a uma cópia do contexto atual (span pai) para rodar em outra thread.
+
+    Chame uma vez por submissão: a mesma cópia não pode rodar em duas threads.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
+
+
+__all__ = [
+    'Span', 'Tracer', 'OTLPFileExporter', 'OTLPHttpExporter', 'encode_spans',
+    'create_tracer', 'get_tracer', 'start_span', 'current_span', 'traced', 'bind_context',
+    'collect_spans', 'stage_breakdown',
+    'SPAN_KIND_INTERNAL', 'SPAN_KIND_SERVER', 'SPAN_KIND_CLIENT'
+]
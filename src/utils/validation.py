@@ -3,6 +3,8 @@ import logging
 import re
 from typing import Dict, List, Any, Optional
 
+from .vectors import all_finite, to_float32
+
 logger = logging.getLogger(__name__)
 
 def validate_document(doc: Dict) -> bool:
@@ -10,18 +12,24 @@ def validate_document(doc: Dict) -> bool:
     required_fields = ['id', 'page_num', 'markdown_text', 'image_path', 'doc_source']
     return all(field in doc for field in required_fields)
 
-def validate_embedding(embedding: list, expected_dim: int) -> bool:
-    """Valida se um embedding tem a dimensão esperada."""
-    if not isinstance(embedding, list):
-        logger.error(f"Embedding deve ser uma lista, recebido {type(embedding)}")
+def validate_embedding(embedding: Any, expected_dim: int) -> bool:
+    """
+    Valida dimensão e valores de um embedding (float32 ou sequência de números).
+    
+    A conversão para float32 rejeita valores não numéricos; NaN/inf são
+    verificados de forma vetorizada.
+    """
+    try:
+        vector = to_float32(embedding)
+    except (TypeError, ValueError):
+        logger.error(f"Embedding contém valores não numéricos ({type(embedding).__name__})")
         return False
-    if len(embedding) != expected_dim:
-        logger.error(f"Dimensão incorreta: esperado {expected_dim}, recebido {len(embedding)}")
+    if len(vector) != expected_dim:
+        logger.error(f"Dimensão incorreta: esperado {expected_dim}, recebido {len(vector)}")
         return False
     
-    # Valida se todos os valores são numéricos
-    if not all(isinstance(x, (int, float)) for x in embedding):
-        logger.error("Embedding contém valores não numéricos")
+    if not all_finite(vector):
+        logger.error("Embedding contém valores NaN ou infinitos")
         return False
         
     return True
@@ -0,0 +1,63 @@
+"""
+Representação compacta de embeddings.
+
+Embeddings circulam como `array('f')`: float32 contíguo (4 bytes por dimensão,
+~4 KB para 1024 dimensões, contra ~32 KB de uma lista de floats Python).
+Listas só são geradas na fronteira com o Astra DB (`to_list`).
+"""
+
+import math
+from array import array
+from typing import Any, List, Sequence, Union
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+EMBEDDING_TYPECODE = "f"
+
+# Tipo aceito pelas funções que recebem embeddings (float32 ou sequência de números)
+Embedding = Union[array, Sequence[float]]
+
+
+def to_float32(values: Any) -> array:
+    """
+    Converte para float32 contíguo (sem cópia se já estiver no formato).
+
+    Aceita array('f'), listas/tuplas de números, arrays NumPy e buffers
+    (bytes/memoryview) de float32.
+
+    Raises:
+        TypeError: se houver valores não numéricos
+    """
+    if isinstance(values, array) and values.typecode == EMBEDDING_TYPECODE:
+        return values
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        vector = array(EMBEDDING_TYPECODE)
+        vector.frombytes(values)
+        return vector
+    if NUMPY_AVAILABLE and isinstance(values, np.ndarray):
+        return array(EMBEDDING_TYPECODE, values.astype(np.float32, copy=False).tobytes())
+    return array(EMBEDDING_TYPECODE, values)
+
+
+def to_list(vector: Embedding) -> List[float]:
+    """Lista de floats para serialização (ex.: `$vector` no Astra DB)."""
+    if isinstance(vector, list):
+        return vector
+    if hasattr(vector, "tolist"):
+        return vector.tolist()
+    return list(vector)
+
+
+def all_finite(vector: array) -> bool:
+    """Verifica NaN/inf (vetorizado com NumPy quando disponível)."""
+    if NUMPY_AVAILABLE:
+        return bool(np.isfinite(np.frombuffer(vector, dtype=np.float32)).all())
+    return all(map(math.isfinite, vector))
+
+
+__all__ = ['Embedding', 'EMBEDDING_TYPECODE', 'to_float32', 'to_list', 'all_finite', 'NUMPY_AVAILABLE']
@@ -0,0 +1,59 @@
+"""
+Dublês compartilhados pelos testes (sem rede nem serviços externos).
+
+Importe a partir da raiz do repositório (`from tests.helpers import ...`);
+os módulos de teste já colocam a raiz no sys.path.
+"""
+
+import time
+import fnmatch
+
+
+class LocalRedis:
+    """
+    Stand-in local do Redis: strings com expiração (`ex`) num dict, com o
+    subconjunto do protocolo usado pelo RedisCacheBackend (get/set com ex,
+    delete, scan_iter, ttl).
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.data = {}
+
+    def _alive(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and self.clock() >= expires_at:
+            del self.data[key]
+            return None
+        return value
+
+    def get(self, key):
+        value = self._alive(key)
+        return value.encode("utf-8") if isinstance(value, str) else value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, self.clock() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self.data) if self._alive(key) is not None and fnmatch.fnmatch(key, match)]
+
+    def ttl(self, key):
+        item = self.data.get(key)
+        return None if item is None or item[1] is None else item[1] - self.clock()
+
+
+class FakeClock:
+    """Relógio controlado pelos testes (substitui time.time)."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,165 @@
+"""
+Testes do decorator assíncrono `acached` (single-flight, stale-while-revalidate
+e cache negativo).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.utils.cache import SimpleCache, acached
+from src.utils.tiered_cache import TieredCache, RedisCacheBackend
+
+from tests.helpers import FakeClock, LocalRedis
+
+
+class AcachedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("time.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = 0
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def counting(self, result=lambda n: f"v{n}", delay=0.01):
+        async def fetch(query):
+            self.calls += 1
+            call = self.calls
+            await asyncio.sleep(delay)
+            return result(call)
+        return fetch
+
+    def test_concurrent_misses_share_one_execution(self):
+        fetch = acached(SimpleCache(), ttl=60)(self.counting())
+
+        async def scenario():
+            return await asyncio.gather(*(fetch("q") for _ in range(10)))
+
+        self.assertEqual(self.run_async(scenario()), ["v1"] * 10)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(fetch.cache_stats()["single_flight"]["coalesced"], 9)
+
+    def test_fresh_hit_does_not_call(self):
+        fetch = acached(SimpleCache(), ttl=60)(self.counting())
+
+        async def scenario():
+            await fetch("q")
+            self.clock.now += 30
+            return await fetch("q")
+
+        self.assertEqual(self.run_async(scenario()), "v1")
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_one_refresh_runs(self):
+        fetch = acached(SimpleCache(), ttl=60, stale_ttl=30)(self.counting())
+
+        async def scenario():
+            await fetch("q")
+            self.clock.now += 70
+            stale = await asyncio.gather(*(fetch("q") for _ in range(5)))
+            # Deixa a atualização em segundo plano terminar
+            await asyncio.sleep(0.05)
+            return stale, await fetch("q")
+
+        stale, refreshed = self.run_async(scenario())
+        self.assertEqual(stale, ["v1"] * 5)
+        self.assertEqual(refreshed, "v2")
+        self.assertEqual(self.calls, 2)
+        stats = fetch.cache_stats()
+        self.assertEqual(stats["stale_hits"], 5)
+        self.assertEqual(stats["refreshes"], 1)
+
+    def test_past_stale_window_recomputes_inline(self):
+        fetch = acached(SimpleCache(), ttl=60, stale_ttl=30)(self.counting())
+
+        async def scenario():
+            await fetch("q")
+            self.clock.now += 91
+            return await fetch("q")
+
+        self.assertEqual(self.run_async(scenario()), "v2")
+        self.assertEqual(fetch.cache_stats()["stale_hits"], 0)
+
+    def test_negative_results_cached_until_negative_ttl(self):
+        fetch = acached(SimpleCache(), ttl=60, negative_ttl=10)(self.counting(result=lambda n: None))
+
+        async def scenario():
+            results = [await fetch("q")]
+            self.clock.now += 5
+            results.append(await fetch("q"))
+            calls_within_ttl = self.calls
+            self.clock.now += 6
+            results.append(await fetch("q"))
+            return results, calls_within_ttl
+
+        results, calls_within_ttl = self.run_async(scenario())
+        self.assertEqual(results, [None, None, None])
+        self.assertEqual(calls_within_ttl, 1)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(fetch.cache_stats()["negative_hits"], 1)
+
+    def test_none_not_cached_without_negative_ttl(self):
+        fetch = acached(SimpleCache(), ttl=60)(self.counting(result=lambda n: None))
+
+        async def scenario():
+            await fetch("q")
+            await fetch("q")
+
+        self.run_async(scenario())
+        self.assertEqual(self.calls, 2)
+
+    def test_tiered_l2_keeps_stale_window(self):
+        redis = LocalRedis(clock=self.clock)
+        l2 = RedisCacheBackend(client=redis)
+        fetch = acached(TieredCache("t", SimpleCache(default_ttl=60), l2), ttl=60, stale_ttl=30)(self.counting())
+
+        self.run_async(fetch("q"))
+        (key,) = redis.data
+        self.assertEqual(redis.ttl(key), 90)
+
+        # Outro worker (L1 vazio) após o TTL fresco: o valor stale ainda vem do L2
+        other = acached(TieredCache("t", SimpleCache(default_ttl=60), l2), ttl=60, stale_ttl=30)(self.counting())
+        self.clock.now += 70
+
+        async def scenario():
+            value = await other("q")
+            await asyncio.sleep(0.05)
+            return value
+
+        self.assertEqual(self.run_async(scenario()), "v1")
+        self.assertEqual(other.cache_stats()["stale_hits"], 1)
+
+    def test_l2_io_runs_outside_event_loop_thread(self):
+        loop_thread = threading.get_ident()
+        io_threads = []
+        redis = LocalRedis(clock=self.clock)
+
+        class RecordingRedis:
+            def __getattr__(self, name):
+                method = getattr(redis, name)
+
+                def call(*args, **kwargs):
+                    io_threads.append(threading.get_ident())
+                    return method(*args, **kwargs)
+                return call
+
+        fetch = acached(TieredCache("t", SimpleCache(), RedisCacheBackend(client=RecordingRedis())), ttl=60)(self.counting())
+
+        self.assertEqual(self.run_async(fetch("q")), "v1")
+        self.assertGreaterEqual(len(io_threads), 2)  # get (miss) + set
+        self.assertNotIn(loop_thread, io_threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Testes da seleção com diversidade (MMR) e descarte de quase-duplicatas.
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.diversity import mmr_select, NUMPY_AVAILABLE
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "numpy não instalado")
+class MMRSelectTest(unittest.TestCase):
+
+    def test_empty_or_zero_k(self):
+        self.assertEqual(mmr_select([], [], k=3), ([], []))
+        self.assertEqual(mmr_select([0.9], [[1.0, 0.0]], k=0), ([], []))
+
+    def test_near_duplicates_dropped(self):
+        selected, duplicates = mmr_select(
+            [0.9, 0.89, 0.5],
+            [[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]],
+            k=3
+        )
+        self.assertEqual(selected, [0, 2])
+        self.assertEqual(duplicates, [1])
+
+    def test_lambda_one_keeps_relevance_order(self):
+        vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        selected, duplicates = mmr_select([0.2, 0.9, 0.5], vectors, k=3, lambda_mult=1.0)
+        self.assertEqual(selected, [1, 2, 0])
+        self.assertEqual(duplicates, [])
+
+    def test_prefers_dissimilar_candidate(self):
+        # O segundo mais relevante é parecido (cos ~0.89) com o primeiro
+        vectors = [[1.0, 0.0], [1.0, 0.5], [0.0, 1.0]]
+        selected, _ = mmr_select([0.9, 0.85, 0.8], vectors, k=2, lambda_mult=0.5)
+        self.assertEqual(selected, [0, 2])
+
+        by_relevance, _ = mmr_select([0.9, 0.85, 0.8], vectors, k=2, lambda_mult=1.0)
+        self.assertEqual(by_relevance, [0, 1])
+
+    def test_respects_k_and_zero_vectors(self):
+        vectors = [[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [-1.0, 0.0]]
+        selected, _ = mmr_select([0.4, 0.9, 0.7, 0.6], vectors, k=2)
+        self.assertEqual(len(selected), 2)
+        self.assertEqual(selected[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
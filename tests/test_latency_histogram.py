@@ -0,0 +1,98 @@
+"""
+Testes dos histogramas de latência (buckets logarítmicos e janelas deslizantes).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import math
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.utils.latency_histogram import LogHistogram, RollingLatency
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+class LogHistogramTest(unittest.TestCase):
+
+    def test_value_falls_inside_its_bucket(self):
+        histogram = LogHistogram()
+        for value in (0.00015, 0.003, 0.25, 1.0, 17.3, 900.0):
+            i = histogram.index(value)
+            self.assertLessEqual(histogram.upper_bound(i - 1), value)
+            self.assertLess(value, histogram.upper_bound(i))
+
+    def test_out_of_range_values_clamped(self):
+        histogram = LogHistogram(min_value=0.001, max_value=10.0)
+        self.assertEqual(histogram.index(0.0), 0)
+        self.assertEqual(histogram.index(-1.0), 0)
+        self.assertEqual(histogram.index(1e6), histogram.num_buckets - 1)
+
+    def test_quantiles_within_relative_error(self):
+        histogram = LogHistogram(growth=1.05)
+        rng = random.Random(3)
+        values = [rng.lognormvariate(math.log(0.2), 0.8) for _ in range(5000)]
+        counts = histogram.new_counts()
+        for value in values:
+            counts[histogram.index(value)] += 1
+
+        estimates = histogram.quantiles(counts, (0.5, 0.9, 0.99))
+        for q, estimate in estimates.items():
+            exact = exact_quantile(values, q)
+            with self.subTest(q=q):
+                self.assertLess(abs(estimate - exact) / exact, 0.05)
+
+    def test_empty_counts_have_no_quantiles(self):
+        histogram = LogHistogram()
+        self.assertEqual(histogram.quantiles(histogram.new_counts(), (0.5, 0.99)), {0.5: None, 0.99: None})
+
+
+class RollingLatencyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.latency = RollingLatency(LogHistogram(), slot_seconds=10, slots=30)
+        self.now = 1_000_000.0
+
+    def test_window_counts_and_mean(self):
+        for value in (0.1, 0.2, 0.3):
+            self.latency.record(value, now=self.now)
+
+        stats = self.latency.window(60, now=self.now)
+        self.assertEqual(stats["count"], 3)
+        self.assertAlmostEqual(stats["mean"], 0.2)
+        self.assertEqual(set(stats), {"count", "mean", "p50", "p90", "p99"})
+        self.assertLess(abs(stats["p50"] - 0.2) / 0.2, 0.05)
+
+    def test_old_slots_leave_the_window(self):
+        self.latency.record(5.0, now=self.now - 120)
+        self.latency.record(0.1, now=self.now)
+
+        self.assertEqual(self.latency.window(60, now=self.now)["count"], 1)
+        self.assertEqual(self.latency.window(300, now=self.now)["count"], 2)
+
+    def test_reused_slot_is_reset(self):
+        self.latency.record(5.0, now=self.now)
+        # Uma volta inteira do anel depois: mesma fatia, época diferente
+        later = self.now + 10 * 30
+        self.latency.record(0.1, now=later)
+
+        stats = self.latency.window(300, now=later)
+        self.assertEqual(stats["count"], 1)
+        self.assertAlmostEqual(stats["mean"], 0.1)
+
+    def test_empty_window(self):
+        stats = self.latency.window(60, now=self.now)
+        self.assertEqual(stats["count"], 0)
+        self.assertIsNone(stats["mean"])
+        self.assertIsNone(stats["p99"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Testes do índice BM25, da persistência e da fusão de rankings (RRF).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.lexical_index import BM25Index, LexicalIndexStore, reciprocal_rank_fusion, tokenize
+
+
+def sample_index():
+    index = BM25Index()
+    index.add_document("a1", "a.pdf", 1, "Zep supera o MemGPT no benchmark LongMemEval")
+    index.add_document("a2", "a.pdf", 2, "Tabela 2 mostra a latência do gpt-4o")
+    index.add_document("b1", "b.pdf", 1, "O artigo 2501.13956 descreve o grafo temporal do Zep")
+    index.add_document("b2", "b.pdf", 2, "Resultados gerais e discussão")
+    return index
+
+
+class TokenizeTest(unittest.TestCase):
+
+    def test_identifiers_kept_whole(self):
+        self.assertEqual(tokenize("Ver 2501.13956 e GPT-4o, table_2."), ["ver", "2501.13956", "e", "gpt-4o", "table_2"])
+        self.assertEqual(tokenize(""), [])
+
+
+class BM25IndexTest(unittest.TestCase):
+
+    def test_exact_terms_rank_first(self):
+        index = sample_index()
+        self.assertEqual(index.search("2501.13956")[0][0], "b1")
+        self.assertEqual(index.search("gpt-4o latência")[0][0], "a2")
+        self.assertEqual(index.search("termo inexistente"), [])
+
+    def test_rarer_terms_weigh_more(self):
+        index = sample_index()
+        ranked = [doc_id for doc_id, _ in index.search("zep longmemeval")]
+        self.assertEqual(ranked[0], "a1")
+        self.assertIn("b1", ranked)
+
+    def test_top_k_and_doc_filter(self):
+        index = sample_index()
+        self.assertEqual(len(index.search("o", top_k=1)), 1)
+        results = index.search("zep", doc_filter=lambda source: source == "b.pdf")
+        self.assertEqual([doc_id for doc_id, _ in results], ["b1"])
+
+    def test_remove_doc_source_reindexes_postings(self):
+        index = sample_index()
+        self.assertEqual(index.remove_doc_source("a.pdf"), 2)
+        self.assertEqual(index.remove_doc_source("a.pdf"), 0)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual([doc_id for doc_id, _ in index.search("zep")], ["b1"])
+        self.assertEqual(index.search("gpt-4o"), [])
+        self.assertNotIn("memgpt", index.postings)
+
+    def test_serialization_round_trip(self):
+        index = sample_index()
+        restored = BM25Index.from_dict(index.to_dict())
+        self.assertEqual(restored.docs, index.docs)
+        self.assertEqual(restored.postings, index.postings)
+        self.assertEqual(restored.search("zep"), index.search("zep"))
+
+    def test_unknown_format_version_rejected(self):
+        with self.assertRaises(ValueError):
+            BM25Index.from_dict({"version": 999})
+
+
+class LexicalIndexStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "bm25.json.gz")
+
+    def test_missing_index_searches_empty(self):
+        store = LexicalIndexStore(self.path)
+        self.assertFalse(store.is_available())
+        self.assertEqual(store.search("zep"), [])
+
+    def test_update_and_remove_persist_across_stores(self):
+        writer = LexicalIndexStore(self.path)
+        self.assertEqual(writer.update_doc_source("a.pdf", [("a1", 1, "Zep e LongMemEval")]), 1)
+        # Outro processo grava sob o lock relendo o arquivo: nada se perde
+        other = LexicalIndexStore(self.path)
+        other.update_doc_source("b.pdf", [("b1", 1, "Zep e grafo temporal")])
+
+        reader = LexicalIndexStore(self.path)
+        self.assertEqual(sorted(doc_id for doc_id, _ in reader.search("zep")), ["a1", "b1"])
+
+        self.assertEqual(writer.remove_doc_source("a.pdf"), 1)
+        self.assertEqual([doc_id for doc_id, _ in LexicalIndexStore(self.path).search("zep")], ["b1"])
+
+    def test_update_replaces_previous_pages(self):
+        store = LexicalIndexStore(self.path)
+        store.update_doc_source("a.pdf", [("a1", 1, "versão antiga"), ("a2", 2, "antiga")])
+        store.update_doc_source("a.pdf", [("a1", 1, "versão nova")])
+
+        self.assertEqual(store.search("antiga"), [])
+        self.assertEqual([doc_id for doc_id, _ in store.search("nova")], ["a1"])
+
+    def test_clear_empties_index(self):
+        store = LexicalIndexStore(self.path)
+        store.update_doc_source("a.pdf", [("a1", 1, "Zep")])
+        store.clear()
+        self.assertFalse(LexicalIndexStore(self.path).is_available())
+
+
+class ReciprocalRankFusionTest(unittest.TestCase):
+
+    def test_agreement_across_rankings_wins(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+        ids = [doc_id for doc_id, _ in fused]
+        self.assertEqual(ids[:2], ["b", "a"])
+        self.assertEqual(set(ids), {"a", "b", "c", "d"})
+
+    def test_scores_follow_formula(self):
+        fused = dict(reciprocal_rank_fusion([["a", "b"], ["a"]], k=10))
+        self.assertAlmostEqual(fused["a"], 2 / 11)
+        self.assertAlmostEqual(fused["b"], 1 / 12)
+
+    def test_empty_rankings(self):
+        self.assertEqual(reciprocal_rank_fusion([]), [])
+        self.assertEqual(reciprocal_rank_fusion([[], []]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Testes da contabilidade de tokens e custo das chamadas de LLM.
+
+Os clientes OpenAI são substituídos por objetos locais com a mesma forma
+(`chat.completions.create` síncrono ou assíncrono).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.utils.llm_usage import (
+    UsageLedger, estimate_cost, instrument_openai, record_usage, track_usage, UNATTRIBUTED_STAGE
+)
+from src.utils.prometheus import track_dependency
+
+
+def completion(prompt=1000, output=200, cached=400, model="gpt-4.1-mini"):
+    return SimpleNamespace(
+        model=model,
+        usage=SimpleNamespace(
+            prompt_tokens=prompt,
+            completion_tokens=output,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached)
+        )
+    )
+
+
+def fake_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class EstimateCostTest(unittest.TestCase):
+
+    def test_cached_tokens_billed_at_cached_price(self):
+        # gpt-4.1-mini: 0.40 entrada, 0.10 cache, 1.60 saída (USD / 1M tokens)
+        cost = estimate_cost("gpt-4.1-mini", prompt_tokens=1000, completion_tokens=200, cached_tokens=400)
+        self.assertAlmostEqual(cost, (600 * 0.40 + 400 * 0.10 + 200 * 1.60) / 1_000_000)
+
+    def test_longest_prefix_wins(self):
+        self.assertAlmostEqual(estimate_cost("gpt-4.1-mini-2025-04-14", 1_000_000), 0.40)
+        self.assertAlmostEqual(estimate_cost("gpt-4.1-2025-04-14", 1_000_000), 2.00)
+
+    def test_unknown_model_costs_nothing(self):
+        self.assertEqual(estimate_cost("modelo-local", 1000, 1000), 0.0)
+        self.assertEqual(estimate_cost(None, 1000), 0.0)
+
+
+class UsageLedgerTest(unittest.TestCase):
+
+    def test_totals_by_stage_and_model(self):
+        ledger = UsageLedger()
+        ledger.record("answer", "gpt-4.1-mini", 100, 20, 40, latency=0.5, cost=0.01)
+        ledger.record("answer", "gpt-4.1-mini", 100, 20, 0, latency=0.5, cost=0.01)
+        ledger.record("plan", "gpt-4o", 50, 10, 0, latency=0.2, cost=0.05)
+
+        summary = ledger.summary()
+        self.assertEqual(summary["calls"], 3)
+        self.assertEqual(summary["total_tokens"], 300)
+        self.assertEqual(list(summary["by_stage"]), ["plan", "answer"])  # mais caro primeiro
+        self.assertEqual(summary["by_model"]["gpt-4.1-mini"]["cached_tokens"], 40)
+
+    def test_prompt_cache_rates_by_call_site(self):
+        ledger = UsageLedger()
+        ledger.record("answer", "gpt-4.1-mini", 1000, cached_tokens=750)
+        ledger.record("plan", "gpt-4.1-mini", 1000, cached_tokens=0)
+        ledger.record("embed", "voyage-multimodal-3", 0)
+
+        cache = ledger.prompt_cache()
+        self.assertEqual(cache["cached_rate"], 0.375)
+        self.assertEqual(cache["by_call_site"]["answer"]["cached_rate"], 0.75)
+        self.assertEqual(cache["by_call_site"]["plan"]["cached_rate"], 0.0)
+        self.assertNotIn("embed", cache["by_call_site"])
+
+
+class InstrumentOpenAITest(unittest.TestCase):
+
+    def test_sync_create_recorded_under_dependency_stage(self):
+        client = instrument_openai(fake_client(lambda **kwargs: completion()))
+
+        with track_usage() as ledger:
+            with track_dependency("openai", "generate_answer"):
+                response = client.chat.completions.create(model="gpt-4.1-mini", messages=[])
+
+        self.assertEqual(response.usage.prompt_tokens, 1000)
+        stage = ledger.summary()["by_stage"]["generate_answer"]
+        self.assertEqual((stage["calls"], stage["prompt_tokens"], stage["cached_tokens"]), (1, 1000, 400))
+        self.assertAlmostEqual(stage["cost_usd"], estimate_cost("gpt-4.1-mini", 1000, 200, 400))
+
+    def test_async_create_recorded(self):
+        async def create(**kwargs):
+            await asyncio.sleep(0)
+            return completion(model="gpt-4o")
+
+        client = instrument_openai(fake_client(create))
+
+        async def scenario():
+            with track_usage() as ledger:
+                await client.chat.completions.create(model=None, messages=[])
+            return ledger.summary()
+
+        summary = asyncio.run(scenario())
+        self.assertIn("gpt-4o", summary["by_model"])
+        self.assertIn(UNATTRIBUTED_STAGE, summary["by_stage"])
+
+    def test_sync_method_returning_awaitable_recorded_after_await(self):
+        async def finish():
+            return completion()
+
+        client = instrument_openai(fake_client(lambda **kwargs: finish()))
+
+        async def scenario():
+            with track_usage() as ledger:
+                pending = client.chat.completions.create(model="gpt-4.1-mini", messages=[])
+                before = ledger.summary()["calls"]
+                await pending
+            return before, ledger.summary()["calls"]
+
+        self.assertEqual(asyncio.run(scenario()), (0, 1))
+
+    def test_instrumentation_is_idempotent(self):
+        client = instrument_openai(fake_client(lambda **kwargs: completion()))
+        wrapped = client.chat.completions.create
+        instrument_openai(client)
+        self.assertIs(client.chat.completions.create, wrapped)
+
+        with track_usage() as ledger:
+            client.chat.completions.create(model="gpt-4.1-mini", messages=[])
+        self.assertEqual(ledger.summary()["calls"], 1)
+
+    def test_request_ledger_only_inside_track_usage(self):
+        with track_usage() as ledger:
+            pass
+        record_usage("openai", "gpt-4.1-mini", prompt_tokens=10)
+        self.assertEqual(ledger.summary()["calls"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Testes do gate de relevância por score e da calibração dos limites.
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.relevance_gate import RelevanceGate, calibrate_thresholds, ACCEPT, REJECT, VERIFY
+from src.utils.prometheus import MetricsRegistry, relevance_gate_collector
+
+
+def synthetic_samples(n=300, seed=7):
+    """Scores com alta precisão nos extremos e sobreposição no meio."""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n):
+        relevant = rng.random() < 0.5
+        score = rng.gauss(0.72 if relevant else 0.58, 0.07)
+        samples.append((score, relevant))
+    return samples
+
+
+def gate_outcome(gate, samples):
+    decisions = [(gate.decide(score), relevant) for score, relevant in samples]
+    accepted = [relevant for decision, relevant in decisions if decision == ACCEPT]
+    rejected = [relevant for decision, relevant in decisions if decision == REJECT]
+    return accepted, rejected
+
+
+class CalibrateThresholdsTest(unittest.TestCase):
+
+    def test_bounds_hold_targets_on_calibration_set(self):
+        for seed in range(20):
+            samples = synthetic_samples(seed=seed)
+            result = calibrate_thresholds(samples, target_precision=0.98, target_npv=0.98)
+            gate = RelevanceGate(result["lower_bound"], result["upper_bound"])
+
+            accepted, rejected = gate_outcome(gate, samples)
+
+            with self.subTest(seed=seed):
+                if accepted:
+                    self.assertGreaterEqual(sum(accepted) / len(accepted), 0.98)
+                if rejected:
+                    self.assertGreaterEqual(rejected.count(False) / len(rejected), 0.98)
+                self.assertAlmostEqual(len(accepted) / len(samples), result["expected_accept_rate"])
+                self.assertAlmostEqual(len(rejected) / len(samples), result["expected_reject_rate"])
+
+    def test_bounds_are_sample_scores(self):
+        samples = synthetic_samples()
+        result = calibrate_thresholds(samples)
+        scores = {score for score, _ in samples}
+        self.assertIn(result["upper_bound"], scores)
+        self.assertIn(result["lower_bound"], scores)
+
+    def test_without_support_gate_skips_nothing(self):
+        result = calibrate_thresholds([(0.9, True), (0.1, False)], min_support=10)
+        self.assertEqual((result["lower_bound"], result["upper_bound"]), (0.0, 1.0))
+        self.assertEqual(result["expected_skip_rate"], 0.0)
+
+    def test_overlapping_bands_keep_only_accept(self):
+        samples = [(0.1 + i / 100, False) for i in range(20)] + [(0.8 + i / 100, True) for i in range(20)]
+        result = calibrate_thresholds(samples)
+        accepted, rejected = gate_outcome(RelevanceGate(result["lower_bound"], result["upper_bound"]), samples)
+        self.assertEqual(result["lower_bound"], 0.0)
+        self.assertEqual(accepted, [True] * 20)
+        self.assertEqual(rejected, [])
+
+
+class RelevanceGateTest(unittest.TestCase):
+
+    def test_decisions_by_band(self):
+        gate = RelevanceGate(lower_bound=0.4, upper_bound=0.8)
+        self.assertEqual(gate.decide(0.9), ACCEPT)
+        self.assertEqual(gate.decide(0.8), VERIFY)
+        self.assertEqual(gate.decide(0.5), VERIFY)
+        self.assertEqual(gate.decide(0.3), REJECT)
+        self.assertEqual(gate.decide(None), VERIFY)
+
+    def test_disabled_always_verifies(self):
+        gate = RelevanceGate(0.4, 0.8, enabled=False)
+        self.assertEqual(gate.decide(0.99), VERIFY)
+        self.assertEqual(gate.decide(0.01), VERIFY)
+
+    def test_rejects_inverted_bounds(self):
+        with self.assertRaises(ValueError):
+            RelevanceGate(lower_bound=0.9, upper_bound=0.1)
+
+    def test_stats_skip_and_agree_rates(self):
+        gate = RelevanceGate(0.4, 0.8, shadow_rate=1.0)
+        for score in (0.9, 0.3, 0.5, 0.6):
+            gate.decide(score)
+        self.assertTrue(gate.should_shadow(ACCEPT))
+        self.assertFalse(gate.should_shadow(VERIFY))
+        gate.record_shadow(ACCEPT, llm_relevant=True)
+        gate.record_shadow(REJECT, llm_relevant=True)
+
+        stats = gate.stats()
+        self.assertEqual(stats["decisions"], 4)
+        self.assertEqual(stats["skip_rate"], 0.5)
+        self.assertEqual(stats["shadow_checks"], 2)
+        self.assertEqual(stats["agree_rate"], 0.5)
+
+    def test_exported_as_prometheus_counters(self):
+        gate = RelevanceGate(0.4, 0.8)
+        for score in (0.9, 0.95, 0.3, 0.5):
+            gate.decide(score)
+        gate.record_shadow(ACCEPT, llm_relevant=True)
+        registry = MetricsRegistry()
+        registry.register_collector("relevance_gate", relevance_gate_collector(gate.stats))
+
+        text = registry.render()
+
+        self.assertIn("# TYPE rag_relevance_gate_decisions_total counter", text)
+        self.assertIn('rag_relevance_gate_decisions_total{decision="accept"} 2', text)
+        self.assertIn('rag_relevance_gate_decisions_total{decision="reject"} 1', text)
+        self.assertIn('rag_relevance_gate_decisions_total{decision="verify"} 1', text)
+        self.assertIn("rag_relevance_gate_shadow_checks_total 1", text)
+        self.assertIn("rag_relevance_gate_shadow_agreements_total 1", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
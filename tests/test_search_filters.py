@@ -0,0 +1,120 @@
+"""
+Testes dos filtros de escopo da busca (doc_source e faixa de indexed_at).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.search_filters import SearchFilters, to_astra_filter
+
+try:
+    from pydantic import ValidationError
+    from api.models.schemas import ResearchQuery
+    PYDANTIC_AVAILABLE = True
+except ImportError:
+    PYDANTIC_AVAILABLE = False
+
+
+class SearchFiltersCreateTest(unittest.TestCase):
+
+    def test_empty_criteria_return_none(self):
+        self.assertIsNone(SearchFilters.create())
+        self.assertIsNone(SearchFilters.create(include_sources=["", "  "], indexed_after=""))
+        self.assertIsNone(SearchFilters.from_dict({}))
+
+    def test_sources_deduplicated_in_order(self):
+        filters = SearchFilters.create(include_sources=[" b.pdf", "a.pdf", "b.pdf"], exclude_sources="c.pdf")
+        self.assertEqual(filters.include_sources, ("b.pdf", "a.pdf"))
+        self.assertEqual(filters.exclude_sources, ("c.pdf",))
+
+    def test_dates_normalized_to_naive_utc(self):
+        filters = SearchFilters.create(
+            indexed_after="2024-01-01T03:00:00+03:00",
+            indexed_before=datetime(2024, 6, 1, tzinfo=timezone(timedelta(hours=-3)))
+        )
+        self.assertEqual(filters.indexed_after, "2024-01-01T00:00:00")
+        self.assertEqual(filters.indexed_before, "2024-06-01T03:00:00")
+
+    def test_mixed_aware_and_naive_dates_compare(self):
+        filters = SearchFilters.create(indexed_after="2024-01-01T00:00:00Z", indexed_before=datetime(2024, 6, 1))
+        self.assertEqual(filters.indexed_after, "2024-01-01T00:00:00")
+
+        with self.assertRaises(ValueError):
+            SearchFilters.create(indexed_after=datetime(2024, 6, 1), indexed_before="2024-01-01T00:00:00Z")
+
+    def test_from_dict_accepts_api_aliases(self):
+        filters = SearchFilters.from_dict({"doc_sources": ["a.pdf"], "exclude_doc_sources": ["b.pdf"]})
+        self.assertEqual(filters, SearchFilters.create(include_sources=["a.pdf"], exclude_sources=["b.pdf"]))
+
+
+class SearchFiltersAstraTest(unittest.TestCase):
+
+    def test_single_condition_is_not_wrapped(self):
+        filters = SearchFilters.create(include_sources=["a.pdf"])
+        self.assertEqual(filters.to_astra_filter(), {"doc_source": "a.pdf"})
+
+    def test_all_conditions_combined_with_and(self):
+        filters = SearchFilters.create(
+            include_sources=["a.pdf", "b.pdf"],
+            exclude_sources=["c.pdf"],
+            indexed_after="2024-01-01",
+            indexed_before="2024-02-01"
+        )
+        self.assertEqual(filters.to_astra_filter(), {"$and": [
+            {"doc_source": {"$in": ["a.pdf", "b.pdf"]}},
+            {"doc_source": {"$nin": ["c.pdf"]}},
+            {"indexed_at": {"$gte": "2024-01-01T00:00:00"}},
+            {"indexed_at": {"$lte": "2024-02-01T00:00:00"}},
+        ]})
+
+    def test_combine_with_base_filter(self):
+        filters = SearchFilters.create(include_sources=["a.pdf"])
+        base = {"_id": {"$in": ["1", "2"]}}
+        self.assertEqual(filters.combine(base), {"$and": [base, {"doc_source": "a.pdf"}]})
+        self.assertEqual(filters.combine({}), {"doc_source": "a.pdf"})
+        self.assertEqual(to_astra_filter(None), {})
+
+
+class SearchFiltersMatchesSourceTest(unittest.TestCase):
+
+    def test_include_and_exclude(self):
+        filters = SearchFilters.create(include_sources=["a.pdf", "b.pdf"], exclude_sources=["b.pdf"])
+        self.assertTrue(filters.matches_source("a.pdf"))
+        self.assertFalse(filters.matches_source("b.pdf"))
+        self.assertFalse(filters.matches_source("c.pdf"))
+        self.assertFalse(filters.matches_source(None))
+
+    def test_date_only_filter_matches_any_source(self):
+        filters = SearchFilters.create(indexed_after="2024-01-01")
+        self.assertTrue(filters.matches_source("a.pdf"))
+        self.assertTrue(filters.matches_source(None))
+
+
+@unittest.skipUnless(PYDANTIC_AVAILABLE, "pydantic não instalado")
+class ResearchQueryScopeTest(unittest.TestCase):
+
+    def test_mixed_offsets_validate(self):
+        request = ResearchQuery(
+            query="O que é o Zep?",
+            indexed_after="2024-01-01T00:00:00Z",
+            indexed_before="2024-06-01T00:00:00"
+        )
+        self.assertEqual(request.to_search_filters().indexed_after, "2024-01-01T00:00:00")
+
+    def test_inverted_range_is_validation_error(self):
+        with self.assertRaises(ValidationError):
+            ResearchQuery(
+                query="O que é o Zep?",
+                indexed_after="2024-07-01T00:00:00Z",
+                indexed_before="2024-06-01T00:00:00"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Testes do armazenamento de sessões de conversa (limites, expiração e bytes).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.session_store import SessionStore, DEFAULT_SESSION_ID
+
+from tests.helpers import FakeClock
+
+
+def history_bytes(session):
+    return sum(len(msg["content"].encode("utf-8")) for msg in session.history)
+
+
+class SessionStoreTest(unittest.TestCase):
+
+    def test_get_creates_and_reuses(self):
+        store = SessionStore()
+        session = store.get("a")
+        self.assertIs(store.get("a"), session)
+        self.assertEqual(store.get().session_id, DEFAULT_SESSION_ID)
+        self.assertEqual(len(store), 2)
+
+    def test_ephemeral_sessions_are_isolated(self):
+        store = SessionStore()
+        first, second = store.ephemeral(), store.ephemeral()
+        store.append(first, "user", "olá")
+
+        self.assertNotEqual(first.session_id, second.session_id)
+        self.assertIsNot(first.lock, second.lock)
+        self.assertEqual(second.history, [])
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.stats()["total_bytes"], 0)
+
+    def test_history_trimmed_and_bytes_tracked(self):
+        store = SessionStore(max_history=4, trim_to=2)
+        session = store.get("a")
+        for i in range(5):
+            store.append(session, "user" if i % 2 == 0 else "assistant", f"mensagem ção {i}")
+
+        self.assertEqual([m["content"] for m in session.history], ["mensagem ção 3", "mensagem ção 4"])
+        self.assertEqual(session.size_bytes, history_bytes(session))
+        self.assertEqual(store.stats()["total_bytes"], session.size_bytes)
+        self.assertEqual(session.turns, 2)
+
+    def test_long_messages_truncated(self):
+        store = SessionStore(max_message_chars=5)
+        session = store.get("a")
+        store.append(session, "user", "abcdefghij")
+        self.assertEqual(session.history[0]["content"], "abcde")
+        self.assertEqual(session.size_bytes, 5)
+
+    def test_idle_sessions_expire(self):
+        clock = FakeClock()
+        with mock.patch("time.time", clock):
+            store = SessionStore(idle_ttl=60)
+            store.append(store.get("old"), "user", "abc")
+            clock.now += 30
+            store.get("recent")
+            clock.now += 40
+            store.get("new")
+
+        self.assertIsNone(store.peek("old"))
+        self.assertIsNotNone(store.peek("recent"))
+        self.assertEqual(store.stats()["evicted_idle"], 1)
+        self.assertEqual(store.stats()["total_bytes"], 0)
+
+    def test_session_cap_evicts_least_recently_used(self):
+        store = SessionStore(max_sessions=2)
+        store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+
+        self.assertIsNotNone(store.peek("a"))
+        self.assertIsNone(store.peek("b"))
+        self.assertEqual(store.stats()["evicted_capacity"], 1)
+
+    def test_byte_cap_evicts_least_recently_used(self):
+        store = SessionStore(max_total_bytes=10)
+        store.append(store.get("a"), "user", "123456")
+        store.append(store.get("b"), "user", "123456")
+
+        self.assertIsNone(store.peek("a"))
+        self.assertEqual(store.stats()["total_bytes"], 6)
+
+    def test_clear_and_delete_release_bytes(self):
+        store = SessionStore()
+        store.append(store.get("a"), "user", "1234")
+        store.append(store.get("b"), "user", "12")
+
+        store.clear("a")
+        self.assertEqual(store.history_length("a"), 0)
+        self.assertEqual(store.stats()["total_bytes"], 2)
+
+        self.assertTrue(store.delete("b"))
+        self.assertFalse(store.delete("b"))
+        self.assertEqual(store.stats()["total_bytes"], 0)
+
+    def test_history_length_does_not_wait_for_session_lock(self):
+        store = SessionStore()
+        session = store.get()
+        store.append(session, "user", "olá")
+        result = []
+
+        with session.lock:
+            reader = threading.Thread(target=lambda: result.append(store.history_length()))
+            reader.start()
+            reader.join(1)
+
+        self.assertEqual(result, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""
+Testes da coalescência de chamadas idênticas em andamento (single-flight).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.utils.single_flight import SingleFlight, make_flight_key
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condição não atingida")
+        time.sleep(0.001)
+
+
+class MakeFlightKeyTest(unittest.TestCase):
+
+    def test_normalizes_case_and_whitespace(self):
+        self.assertEqual(make_flight_key("  O que é o  Zep? "), make_flight_key("o que é o zep?"))
+
+    def test_options_change_key(self):
+        self.assertNotEqual(make_flight_key("q", filters=None), make_flight_key("q", filters={"a": 1}))
+        self.assertEqual(make_flight_key("q", a=1, b=2), make_flight_key("q", b=2, a=1))
+
+
+class SingleFlightSyncTest(unittest.TestCase):
+
+    def run_duplicates(self, flight, fn, duplicates=4):
+        """Inicia o líder, espera ele entrar em execução e dispara as duplicatas."""
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(flight.do("k", fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call)]
+        threads[0].start()
+        wait_until(lambda: flight.stats()["in_flight"] == 1)
+        for _ in range(duplicates):
+            threads.append(threading.Thread(target=call))
+            threads[-1].start()
+        wait_until(lambda: flight.stats()["coalesced"] == duplicates)
+        return threads, results, errors
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+        executions = []
+
+        def fn():
+            executions.append(1)
+            release.wait(2)
+            return 42
+
+        threads, results, errors = self.run_duplicates(flight, fn)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual((len(executions), errors), (1, []))
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_exception_propagates_to_duplicates(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+
+        def fn():
+            release.wait(2)
+            raise ValueError("falhou")
+
+        threads, results, errors = self.run_duplicates(flight, fn, duplicates=2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+    def test_wait_timeout_falls_back_to_own_execution(self):
+        flight = SingleFlight("test", wait_timeout=0.05)
+        release = threading.Event()
+        executions = []
+
+        def fn():
+            executions.append(1)
+            if len(executions) == 1:
+                release.wait(2)
+            return len(executions)
+
+        threads, results, _ = self.run_duplicates(flight, fn, duplicates=1)
+        threads[1].join()
+        release.set()
+        threads[0].join()
+
+        self.assertEqual(sorted(results), [2, 2])
+        self.assertEqual(flight.stats()["wait_timeouts"], 1)
+
+    def test_sequential_calls_not_cached(self):
+        flight = SingleFlight("test")
+        counter = iter(range(10))
+        self.assertEqual(flight.do("k", lambda: next(counter)), 0)
+        self.assertEqual(flight.do("k", lambda: next(counter)), 1)
+        self.assertEqual(flight.stats()["executions"], 2)
+
+    def test_disabled_always_executes(self):
+        flight = SingleFlight("test", enabled=False)
+        self.assertEqual(flight.do("k", lambda: 1), 1)
+        self.assertEqual(flight.stats()["calls"], 0)
+
+
+class SingleFlightAsyncTest(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight("test")
+        executions = []
+
+        async def fn():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        async def scenario():
+            return await asyncio.gather(*(flight.ado("k", fn) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(scenario()), [42] * 5)
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_leader_cancel_keeps_waiters(self):
+        flight = SingleFlight("test")
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def scenario():
+            leader = asyncio.create_task(flight.ado("k", fn))
+            await asyncio.sleep(0)
+            waiters = [asyncio.create_task(flight.ado("k", fn)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            return leader.cancelled(), results
+
+        leader_cancelled, results = asyncio.run(scenario())
+        self.assertTrue(leader_cancelled)
+        self.assertEqual(results, [42] * 3)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_leader_cancel_without_waiters_cancels_execution(self):
+        flight = SingleFlight("test")
+        finished = []
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        async def scenario():
+            leader = asyncio.create_task(flight.ado("k", fn))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.sleep(0.1)
+            return flight.stats()["in_flight"]
+
+        self.assertEqual(asyncio.run(scenario()), 0)
+        self.assertEqual(finished, [])
+
+    def test_waiter_timeout_falls_back_to_own_execution(self):
+        flight = SingleFlight("test", wait_timeout=0.02)
+        executions = []
+
+        async def fn():
+            executions.append(1)
+            await asyncio.sleep(0.1 if len(executions) == 1 else 0)
+            return len(executions)
+
+        async def scenario():
+            leader = asyncio.create_task(flight.ado("k", fn))
+            await asyncio.sleep(0)
+            waiter = await flight.ado("k", fn)
+            return waiter, await leader
+
+        self.assertEqual(asyncio.run(scenario()), (2, 2))
+        self.assertEqual(flight.stats()["wait_timeouts"], 1)
+
+    def test_exception_propagates_to_all(self):
+        flight = SingleFlight("test")
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError("falhou")
+
+        async def scenario():
+            return await asyncio.gather(*(flight.ado("k", fn) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flight.stats()["executions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
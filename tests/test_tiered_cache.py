@@ -0,0 +1,151 @@
+"""
+Testes do cache em dois níveis (L1 + L2 SQLite/Redis).
+
+O backend Redis é exercitado com o stand-in em memória de tests/helpers.py,
+com expiração controlada por um relógio falso.
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.utils.cache import SimpleCache
+from src.utils import tiered_cache
+from src.utils.tiered_cache import TieredCache, SQLiteCacheBackend, RedisCacheBackend
+
+from tests.helpers import FakeClock, LocalRedis
+
+
+class TieredCacheContract:
+    """Comportamento comum aos backends L2."""
+
+    def make_l2(self):
+        raise NotImplementedError
+
+    def make_cache(self, l2, ttl=60):
+        return TieredCache("test", SimpleCache(max_size=10, default_ttl=ttl), l2)
+
+    def test_write_through_and_shared_between_workers(self):
+        l2 = self.make_l2()
+        worker_a, worker_b = self.make_cache(l2), self.make_cache(l2)
+
+        worker_a.set("k", {"answer": 42})
+
+        self.assertEqual(worker_b.get("k"), {"answer": 42})
+        self.assertEqual(worker_b.stats()["l2"]["hits"], 1)
+
+    def test_l1_miss_promotes_from_l2(self):
+        l2 = self.make_l2()
+        self.make_cache(l2).set("k", "v")
+        cache = self.make_cache(l2)
+
+        self.assertFalse(cache.contains("k"))
+        self.assertEqual(cache.get("k"), "v")
+        self.assertTrue(cache.contains("k"))
+        self.assertEqual(cache.get("k"), "v")
+        self.assertEqual(cache.stats()["l2"]["hits"], 1)
+
+    def test_promotion_keeps_original_age(self):
+        clock = FakeClock()
+        with mock.patch("time.time", clock):
+            l2 = self.make_l2()
+            self.make_cache(l2, ttl=60).set("k", "v")
+            clock.now += 50
+            cache = self.make_cache(l2, ttl=60)
+            self.assertEqual(cache.get("k"), "v")
+            # Promovida com a idade original: expira no L1 aos 60s da gravação
+            clock.now += 11
+            self.assertIsNone(cache.l1.get("k"))
+            self.assertIsNone(cache.get("k"))
+
+    def test_l2_failure_degrades_to_l1(self):
+        l2 = mock.Mock()
+        l2.get.side_effect = ConnectionError("down")
+        l2.set.side_effect = ConnectionError("down")
+        cache = self.make_cache(l2)
+
+        cache.set("k", "v")
+        self.assertEqual(cache.get("k"), "v")
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(cache.stats()["l2"]["errors"], 2)
+
+
+class SQLiteTieredCacheTest(TieredCacheContract, unittest.TestCase):
+
+    def make_l2(self):
+        directory = tempfile.mkdtemp()
+        return SQLiteCacheBackend(os.path.join(directory, "l2.sqlite3"))
+
+
+class RedisTieredCacheTest(TieredCacheContract, unittest.TestCase):
+
+    def make_l2(self):
+        # Relógio do stand-in segue time.time (inclusive quando mockado)
+        self.redis = LocalRedis(clock=lambda: time.time())
+        return RedisCacheBackend(client=self.redis)
+
+    def test_entries_expire_with_ttl(self):
+        clock = FakeClock()
+        with mock.patch("time.time", clock):
+            l2 = self.make_l2()
+            self.make_cache(l2, ttl=60).set("k", "v")
+            clock.now += 61
+            self.assertIsNone(self.make_cache(l2, ttl=60).get("k"))
+            self.assertEqual(self.redis.data, {})
+
+    def test_clear_only_touches_namespace(self):
+        l2 = self.make_l2()
+        TieredCache("a", SimpleCache(), l2).set("k", 1)
+        other = TieredCache("b", SimpleCache(), l2)
+        other.set("k", 2)
+
+        TieredCache("a", SimpleCache(), l2).clear()
+
+        self.assertEqual(l2.size("a"), 0)
+        self.assertEqual(TieredCache("b", SimpleCache(), l2).get("k"), 2)
+
+
+class IndexGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.l2 = RedisCacheBackend(client=LocalRedis())
+        patcher = mock.patch.object(tiered_cache, "get_shared_l2", return_value=self.l2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_generation_stable_until_bumped(self):
+        first = tiered_cache.get_index_generation()
+        self.assertEqual(tiered_cache.get_index_generation(), first)
+
+        bumped = tiered_cache.bump_index_generation()
+
+        self.assertNotEqual(bumped, first)
+        self.assertEqual(tiered_cache.get_index_generation(), bumped)
+
+    def test_bump_seen_by_other_workers_and_clears_answers(self):
+        worker = TieredCache("response", SimpleCache(), self.l2)
+        worker.set("k", {"answer": 42})
+        before = tiered_cache.get_index_generation()
+
+        # Outro processo (indexer/management) grava a nova geração no L2
+        with mock.patch.object(tiered_cache, "_local_generation", "0"):
+            tiered_cache.bump_index_generation()
+
+        self.assertNotEqual(tiered_cache.get_index_generation(), before)
+        self.assertEqual(self.l2.size("response"), 0)
+
+    def test_without_l2_generation_is_local(self):
+        with mock.patch.object(tiered_cache, "get_shared_l2", return_value=None):
+            bumped = tiered_cache.bump_index_generation()
+            self.assertEqual(tiered_cache.get_index_generation(), bumped)
+
+
+if __name__ == "__main__":
+    unittest.main()